@@ -0,0 +1,132 @@
+# src/application/config_reloader.py
+import asyncio
+import signal
+from typing import Callable, List, Optional
+
+import structlog
+
+from config import settings
+from config.settings import CONFIG_FILE, HotReloadSettings, Settings, config_version, load_settings
+
+logger = structlog.get_logger(__name__)
+
+ReloadSubscriber = Callable[[Settings], None]
+
+
+class ConfigReloader:
+    """
+    Перечитує config.yaml у працюючому live-процесі: за сигналом SIGHUP
+    або коли змінюється mtime файлу. Нові налаштування передаються
+    підписникам (конвеєр, Listener-и), які синхронно підміняють свої
+    скомпільовані об'єкти — без перепідключення до Discord.
+    """
+
+    def __init__(self, config: HotReloadSettings):
+        self._config = config
+        self._subscribers: List[ReloadSubscriber] = []
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup = asyncio.Event()
+        self._last_mtime = self._mtime()
+        self.version = config_version()
+        self.reloads = 0
+
+    def subscribe(self, callback: ReloadSubscriber) -> None:
+        self._subscribers.append(callback)
+
+    @staticmethod
+    def _mtime() -> Optional[float]:
+        try:
+            return CONFIG_FILE.stat().st_mtime
+        except OSError:
+            return None
+
+    # --- Життєвий цикл ---
+
+    def start(self) -> None:
+        # Обробник ставимо завжди: без нього SIGHUP за замовчуванням завершує процес
+        try:
+            asyncio.get_running_loop().add_signal_handler(signal.SIGHUP, self._on_signal)
+        except (AttributeError, NotImplementedError, RuntimeError):
+            # Windows: SIGHUP немає, лишається лише опитування mtime
+            logger.debug("SIGHUP is not available, relying on config file polling.")
+
+        if not self._config.enabled:
+            logger.info("Config hot-reload disabled.", config_version=self.version)
+            return
+        self._task = asyncio.create_task(self._watch(), name="config-reloader")
+        logger.info("Config hot-reload enabled.", config_version=self.version,
+                    poll_interval=self._config.poll_interval_seconds)
+
+    def _on_signal(self):
+        if not self._config.enabled:
+            logger.warning("SIGHUP received but config hot-reload is disabled, ignoring.")
+            return
+        self._wakeup.set()
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        try:
+            asyncio.get_running_loop().remove_signal_handler(signal.SIGHUP)
+        except (AttributeError, NotImplementedError, RuntimeError):
+            pass
+
+    async def _watch(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self._config.poll_interval_seconds)
+                reason = "signal"
+            except asyncio.TimeoutError:
+                reason = "file_changed"
+                if self._mtime() == self._last_mtime:
+                    continue
+            self._wakeup.clear()
+            self.reload(reason)
+
+    # --- Перезавантаження ---
+
+    def reload(self, reason: str = "manual") -> bool:
+        """
+        Читає та валідує конфіг і застосовує його. При помилці лишається
+        попередня версія — зламаний YAML не повинен зупиняти ботів.
+        """
+        self._last_mtime = self._mtime()
+        version = config_version()
+        try:
+            new_settings = load_settings()
+        except Exception:
+            logger.exception("Config reload failed, keeping previous configuration.",
+                             reason=reason, config_version=self.version)
+            return False
+
+        if version == self.version and reason == "file_changed":
+            return False
+
+        # Оновлюємо глобальний об'єкт для коду, що читає settings напряму
+        settings.keywords = new_settings.keywords
+        settings.keyword_engine = new_settings.keyword_engine
+        settings.openai.stage_one = new_settings.openai.stage_one
+        settings.openai.stage_two = new_settings.openai.stage_two
+        settings.discord.track_all_channels = new_settings.discord.track_all_channels
+        settings.discord.channel_whitelist = new_settings.discord.channel_whitelist
+
+        for callback in self._subscribers:
+            try:
+                callback(new_settings)
+            except Exception:
+                logger.exception("Config reload subscriber failed.", subscriber=getattr(callback, "__qualname__", repr(callback)))
+
+        previous, self.version = self.version, version
+        self.reloads += 1
+        logger.info(
+            "✅ Configuration reloaded.",
+            reason=reason,
+            config_version=version,
+            previous_version=previous,
+            keyword_count=len(new_settings.keywords),
+            stage_one_model=new_settings.openai.stage_one.model,
+            stage_two_model=new_settings.openai.stage_two.model,
+        )
+        return True
@@ -0,0 +1,304 @@
+# src/application/ingestion_queue.py
+import asyncio
+import json
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, List, Optional
+
+import structlog
+
+from config.settings import IngestionSettings
+from domain.models import Message
+
+logger = structlog.get_logger(__name__)
+
+# Той самий контракт, що й у MessagePipeline.process_message
+MessageHandler = Callable[..., Awaitable[None]]
+
+
+@dataclass
+class _QueueItem:
+    message: Message
+    bot_id: int
+    bot_name: str
+    source_mode: str
+    enqueued_at: float = field(default_factory=time.time)
+
+    def to_json(self) -> str:
+        return json.dumps({
+            "message": self.message.model_dump(mode="json"),
+            "bot_id": self.bot_id,
+            "bot_name": self.bot_name,
+            "source_mode": self.source_mode,
+            "enqueued_at": self.enqueued_at,
+        }, ensure_ascii=False)
+
+    @classmethod
+    def from_json(cls, line: str) -> "_QueueItem":
+        data = json.loads(line)
+        return cls(
+            message=Message.model_validate(data["message"]),
+            bot_id=data["bot_id"],
+            bot_name=data["bot_name"],
+            source_mode=data["source_mode"],
+            enqueued_at=data["enqueued_at"],
+        )
+
+
+class IngestionQueue:
+    """
+    Обмежена черга між Listener-ами та конвеєром обробки.
+    Повідомлення обробляє фіксований пул воркерів, тому кількість одночасних
+    викликів OpenAI та пам'ять не ростуть під час сплесків трафіку.
+
+    Політики переповнення:
+      - block:       продюсер чекає, поки у черзі з'явиться місце; очікувачів не більше
+                     max_blocked_producers — решта пишеться на диск, як у spill;
+      - drop_oldest: найстаріше повідомлення відкидається;
+      - spill:       надлишок пишеться на диск (JSONL) і дочитується, коли черга звільниться.
+    """
+
+    def __init__(self, handler: MessageHandler, config: IngestionSettings,
+                 extra_stats: Optional[Callable[[], dict]] = None):
+        self._handler = handler
+        self._config = config
+        # Метрики споживача (конвеєра), які логуються разом зі статистикою черги
+        self._extra_stats = extra_stats
+        self._queue: asyncio.Queue[_QueueItem] = asyncio.Queue(maxsize=config.queue_size)
+        self._workers: List[asyncio.Task] = []
+        self._reporter: Optional[asyncio.Task] = None
+        self._spill_path = config.spill_path
+        self._spill_offset = 0
+        self._spill_pending = 0
+        self._blocked = 0
+
+        # --- Метрики ---
+        self.enqueued = 0
+        self.processed = 0
+        self.failed = 0
+        self.dropped = 0
+        self.spilled = 0
+        self.in_flight = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._wait_count = 0
+
+    @property
+    def depth(self) -> int:
+        return self._queue.qsize()
+
+    @property
+    def _uses_spill(self) -> bool:
+        # block теж скидає надлишок на диск, коли очікувачів забагато
+        return self._config.overflow_policy in ('block', 'spill')
+
+    def start(self) -> None:
+        if self._workers:
+            return
+        if self._uses_spill:
+            self._restore_spill()
+            self._refill_from_spill()
+        self._workers = [
+            asyncio.create_task(self._worker(i), name=f"ingestion-worker-{i}")
+            for i in range(self._config.workers)
+        ]
+        if self._config.stats_interval_seconds > 0:
+            self._reporter = asyncio.create_task(self._report_stats(), name="ingestion-stats")
+        logger.info(
+            "Ingestion queue started",
+            workers=self._config.workers,
+            queue_size=self._config.queue_size,
+            overflow_policy=self._config.overflow_policy,
+            spill_pending=self._spill_pending,
+        )
+
+    async def stop(self) -> None:
+        tasks = [*self._workers, *([self._reporter] if self._reporter else [])]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._workers, self._reporter = [], None
+
+        # Не втрачаємо те, що лишилось у пам'яті, якщо є куди це скинути
+        if self._uses_spill:
+            leftover = []
+            while not self._queue.empty():
+                leftover.append(self._queue.get_nowait())
+            if leftover or self._spill_pending:
+                self._rewrite_spill(leftover)
+            if leftover:
+                logger.info("Ingestion queue leftovers spilled to disk", count=len(leftover))
+        logger.info("Ingestion queue stopped", **self.stats())
+
+    async def put(self, message: Message, bot_id: int, bot_name: str, source_mode: str) -> None:
+        """
+        Ставить повідомлення в чергу. Сигнатура збігається з PipelineCallback,
+        тож черга підключається до Listener замість самого конвеєра.
+        """
+        item = _QueueItem(message=message, bot_id=bot_id, bot_name=bot_name, source_mode=source_mode)
+        policy = self._config.overflow_policy
+        self.enqueued += 1
+
+        if policy == 'block':
+            # Кожен очікувач тримає повідомлення в пам'яті, тож їх кількість обмежена;
+            # поки на диску щось є, нові теж ідуть туди — порядок зберігається
+            if self._spill_pending or self._blocked >= self._config.max_blocked_producers:
+                self._spill([item])
+                return
+            self._blocked += 1
+            try:
+                await self._queue.put(item)
+            finally:
+                self._blocked -= 1
+            return
+
+        if policy == 'drop_oldest':
+            if self._queue.full():
+                dropped = self._queue.get_nowait()
+                self._queue.task_done()
+                self.dropped += 1
+                logger.warning(
+                    "Ingestion queue full, dropping oldest message",
+                    dropped_msg_id=dropped.message.message_id,
+                    dropped_total=self.dropped,
+                )
+            self._queue.put_nowait(item)
+            return
+
+        # spill: зберігаємо порядок — поки на диску щось є, нові повідомлення теж ідуть туди
+        if self._queue.full() or self._spill_pending:
+            self._spill([item])
+            return
+        self._queue.put_nowait(item)
+
+    def stats(self) -> dict:
+        wait_avg = self._wait_total / self._wait_count if self._wait_count else 0.0
+        return {
+            "depth": self.depth,
+            "in_flight": self.in_flight,
+            "blocked_producers": self._blocked,
+            "spill_pending": self._spill_pending,
+            "enqueued": self.enqueued,
+            "processed": self.processed,
+            "failed": self.failed,
+            "dropped": self.dropped,
+            "spilled": self.spilled,
+            "wait_avg_ms": round(wait_avg * 1000, 1),
+            "wait_max_ms": round(self._wait_max * 1000, 1),
+        }
+
+    async def _worker(self, worker_id: int) -> None:
+        while True:
+            item = await self._queue.get()
+            if self._spill_pending:
+                self._refill_from_spill()
+
+            wait = max(0.0, time.time() - item.enqueued_at)
+            self._wait_total += wait
+            self._wait_count += 1
+            self._wait_max = max(self._wait_max, wait)
+
+            self.in_flight += 1
+            try:
+                await self._handler(
+                    message=item.message,
+                    bot_id=item.bot_id,
+                    bot_name=item.bot_name,
+                    source_mode=item.source_mode,
+                )
+                self.processed += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                self.failed += 1
+                logger.exception(
+                    "Error in message processing pipeline",
+                    msg_id=item.message.message_id,
+                    worker=worker_id,
+                )
+            finally:
+                self.in_flight -= 1
+                self._queue.task_done()
+
+    async def _report_stats(self) -> None:
+        while True:
+            await asyncio.sleep(self._config.stats_interval_seconds)
+            logger.info("Ingestion queue stats", **self.stats())
+            if self._extra_stats:
+                logger.info("Pipeline stats", **self._extra_stats())
+            # Максимум рахуємо в межах інтервалу звіту
+            self._wait_max = 0.0
+
+    # --- Spill на диск ---
+
+    def _spill(self, items: List[_QueueItem]) -> None:
+        self._append_to_spill(items)
+        self.spilled += len(items)
+        self._refill_from_spill()
+
+    def _append_to_spill(self, items: List[_QueueItem]) -> None:
+        self._spill_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self._spill_path, "a", encoding="utf-8") as f:
+            for item in items:
+                f.write(item.to_json() + "\n")
+        self._spill_pending += len(items)
+
+    def _rewrite_spill(self, leftover: List[_QueueItem]) -> None:
+        """
+        Переписує spill-файл як leftover + ще не прочитаний хвіст (з _spill_offset).
+        Вже оброблені рядки викидаються, а порядок зберігається: повідомлення з пам'яті
+        були поставлені в чергу раніше за ті, що лежать на диску.
+        Запис через тимчасовий файл і os.replace — збій посередині не зіпсує файл.
+        """
+        self._spill_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self._spill_path.with_name(self._spill_path.name + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as out:
+            for item in leftover:
+                out.write(item.to_json() + "\n")
+            if self._spill_pending and self._spill_path.is_file():
+                with open(self._spill_path, "r", encoding="utf-8") as f:
+                    f.seek(self._spill_offset)
+                    for line in f:
+                        out.write(line)
+            out.flush()
+            os.fsync(out.fileno())
+        os.replace(tmp_path, self._spill_path)
+        self._spill_pending += len(leftover)
+        self._spill_offset = 0
+
+    def _restore_spill(self) -> None:
+        if not self._spill_path.is_file():
+            return
+        with open(self._spill_path, "r", encoding="utf-8") as f:
+            self._spill_pending = sum(1 for line in f if line.strip())
+        self._spill_offset = 0
+        if self._spill_pending:
+            logger.info("Found spilled messages from previous run", count=self._spill_pending)
+
+    def _refill_from_spill(self) -> None:
+        # Без await усередині — тому атомарно відносно інших корутин.
+        # Очікувачі block старші за все, що на диску, — спершу місце їм
+        if not self._spill_pending or self._queue.full() or self._blocked:
+            return
+        with open(self._spill_path, "r", encoding="utf-8") as f:
+            f.seek(self._spill_offset)
+            while not self._queue.full():
+                line = f.readline()
+                if not line:
+                    break
+                self._spill_offset = f.tell()
+                if not line.strip():
+                    continue
+                self._spill_pending -= 1
+                try:
+                    self._queue.put_nowait(_QueueItem.from_json(line))
+                except Exception:
+                    self.failed += 1
+                    logger.exception("Corrupted spill record, skipping")
+
+        if self._spill_pending <= 0:
+            # Усе дочитали — обнуляємо файл
+            self._spill_pending = 0
+            self._spill_offset = 0
+            self._spill_path.unlink(missing_ok=True)
@@ -1,11 +1,19 @@
 # src/application/message_pipeline.py
+import asyncio
+import time
+from typing import List, Optional, Set, Tuple
+
 import structlog
-from typing import Optional
 
 from config import settings
+from config.settings import Settings
 from application.services.ai_agent_service import AIAgentService
+from application.services.message_deduplicator import MessageDeduplicator
 from application.services.message_filter import MessageFilter
 from application.services.message_recorder import MessageRecorder
+from application.services.speculative_stage_two import SpeculationPolicy
+from application.services.stage_zero_classifier import STAGE_ZERO_REASON, StageZeroClassifier
+from application.services.verdict_cache import VerdictCache
 from domain.models import Message, MessageOpportunity, ValidationStatus, ValidationResult
 
 logger = structlog.get_logger(__name__)
@@ -18,8 +26,34 @@ class MessagePipeline:
 
     def __init__(self, recorder: MessageRecorder):
         self.recorder = recorder
-        self._agent = AIAgentService()
-        self._filter = MessageFilter(keywords=settings.keywords)
+        self._agent = AIAgentService(unlinked_calls_sink=recorder.record_unlinked_ai_calls)
+        self._filter = MessageFilter(keywords=settings.keywords, engine=settings.keyword_engine)
+        self._cache = VerdictCache(settings.openai.verdict_cache)
+        self._stage_zero = StageZeroClassifier.load_from_settings(settings.stage_zero)
+        self._dedupe = MessageDeduplicator(
+            ttl_seconds=settings.ingestion.dedupe_ttl_seconds,
+            max_entries=settings.ingestion.dedupe_max_entries,
+        )
+        self._speculation = SpeculationPolicy(settings.openai.speculative)
+        # Відкинуті спекулятивні Stage 2, що ще дочікуються відповіді для обліку витрат
+        self._discarded_tasks: Set[asyncio.Task] = set()
+
+    def apply_settings(self, new_settings: Settings):
+        """
+        Hot-reload: компілює новий фільтр заздалегідь і підміняє його одним присвоєнням,
+        тож повідомлення в обробці бачать або стару, або нову версію — ніколи проміжну.
+        """
+        new_filter = MessageFilter(keywords=new_settings.keywords, engine=new_settings.keyword_engine)
+        self._filter = new_filter
+        self._agent.apply_stage_configs(new_settings.openai.stage_one, new_settings.openai.stage_two)
+        self._speculation.apply_config(new_settings.openai.speculative)
+
+    def stats(self) -> dict:
+        """Зведені метрики конвеєра для періодичного звіту в live-режимі."""
+        stats = {**self._dedupe.stats(), **self._cache.stats(), **self._speculation.stats(), **self.recorder.stats()}
+        if self._stage_zero:
+            stats.update(self._stage_zero.stats())
+        return stats
 
     async def process_message(self, message: Message, bot_id: int, bot_name: str, source_mode: str):
         """
@@ -27,7 +61,15 @@ class MessagePipeline:
         """
         logger.debug("Processing message", msg_id=message.message_id)
 
-        opportunity = await self.validate_and_get_opportunity(message)
+        # Кілька акаунтів можуть бачити одне й те саме повідомлення:
+        # класифікуємо та записуємо його лише один раз.
+        live = source_mode == "live"
+        opportunity, is_owner = await self._dedupe.run_once(
+            message.message_id, lambda: self.validate_and_get_opportunity(message, live=live)
+        )
+        if not is_owner:
+            logger.debug("Duplicate message from another account, skipping.", msg_id=message.message_id, bot_name=bot_name)
+            return
 
         if opportunity:
             # Збагачуємо об'єкт інформацією про бота
@@ -41,25 +83,138 @@ class MessagePipeline:
                 source_mode=source_mode,
             )
 
-    async def validate_and_get_opportunity(self, message: Message) -> Optional[MessageOpportunity]:
+    def match_keywords(self, content: str) -> Optional[List[str]]:
+        """Фільтр за ключовими словами по сирому тексту (див. MessageFilter.match); None — повідомлення не цікаве."""
+        return self._filter.match(content)
+
+    async def validate_and_get_opportunity(
+        self, message: Message, live: bool = False, prefiltered: bool = False
+    ) -> Optional[MessageOpportunity]:
         """
         Виконує повний, двохетапний процес валідації та повертає
         об'єкт MessageOpportunity з результатами.
+        prefiltered=True — ключові слова вже перевірено (і записано в message) через match_keywords.
+
+        У live-режимі (якщо увімкнено openai.speculative) Stage 2 для "перспективних"
+        повідомлень стартує одночасно зі Stage 1 і скасовується, якщо Stage 1 скаже JUNK.
         """
-        if not self._filter.is_relevant(message):
+        if not prefiltered and not self._filter.is_relevant(message):
             return None
 
-        stage_one_result = await self._agent.validate_stage_one(message)
+        # Stage 0: локальна модель відсікає впевнене сміття без виклику LLM
+        if self._stage_zero and self._stage_zero.is_junk(message.content):
+            logger.debug("Stage zero rejected message, LLM call avoided.",
+                         msg_id=message.message_id, **self._stage_zero.stats())
+            return MessageOpportunity(
+                message=message,
+                stage_one_validation=ValidationResult(
+                    status=ValidationStatus.UNRELEVANT,
+                    reason=STAGE_ZERO_REASON,
+                ),
+            )
+
+        if live and self._speculation.enabled:
+            return await self._validate_live(message)
+
+        stage_one_result = await self._run_stage_one(message)
 
         if stage_one_result.status == ValidationStatus.ERROR:
             return MessageOpportunity(message=message, stage_one_validation=stage_one_result)
 
         stage_two_result: Optional[ValidationResult] = None
         if stage_one_result.status != ValidationStatus.UNRELEVANT:
-            stage_two_result = await self._agent.validate_stage_two(message)
+            stage_two_result = await self._run_stage_two(message)
+
+        return MessageOpportunity(
+            message=message,
+            stage_one_validation=stage_one_result,
+            stage_two_validation=stage_two_result
+        )
+
+    async def _validate_live(self, message: Message) -> MessageOpportunity:
+        """Stage 1 -> Stage 2 зі спекулятивним запуском Stage 2 та метриками затримки."""
+        await self._speculation.warm_up()
+        started = time.perf_counter()
+
+        stage_two_task: Optional[asyncio.Task] = None
+        if self._speculation.should_speculate(message):
+            stage_two_task = asyncio.create_task(self._timed(self._run_stage_two(message)))
+            self._speculation.launched += 1
+
+        try:
+            stage_one_result, stage_one_s = await self._timed(self._run_stage_one(message))
+        except BaseException:
+            if stage_two_task:
+                stage_two_task.cancel()
+            raise
+        self._speculation.record_stage_one(message.channel_id, stage_one_result.status)
+
+        stage_two_result: Optional[ValidationResult] = None
+        stage_two_s = 0.0
+        if stage_one_result.status in (ValidationStatus.ERROR, ValidationStatus.UNRELEVANT):
+            if stage_two_task:
+                # Не скасовуємо: запит уже оплачено, а точні токени дасть лише відповідь.
+                # Дочікуємося її у фоні й пишемо виклик в облік як відкинутий.
+                discard = asyncio.create_task(self._record_discarded_stage_two(message, stage_two_task))
+                self._discarded_tasks.add(discard)
+                discard.add_done_callback(self._discarded_tasks.discard)
+        elif stage_two_task:
+            stage_two_result, stage_two_s = await stage_two_task
+        else:
+            stage_two_result, stage_two_s = await self._timed(self._run_stage_two(message))
 
+        self._speculation.record_outcome(
+            speculative=stage_two_task is not None,
+            used=stage_two_task is not None and stage_two_result is not None,
+            total_s=time.perf_counter() - started,
+            stage_one_s=stage_one_s,
+            stage_two_s=stage_two_s,
+        )
         return MessageOpportunity(
             message=message,
             stage_one_validation=stage_one_result,
             stage_two_validation=stage_two_result
-        )
\ No newline at end of file
+        )
+
+    async def _record_discarded_stage_two(self, message: Message, stage_two_task: asyncio.Task) -> None:
+        try:
+            result, _ = await stage_two_task
+        except Exception:
+            logger.debug("Discarded speculative Stage 2 failed.", msg_id=message.message_id, exc_info=True)
+            return
+        calls = [call.model_copy(update={"discarded": True}) for call in result.ai_calls]
+        logger.debug("Speculative Stage 2 discarded.", msg_id=message.message_id, calls=len(calls))
+        if not calls:
+            return
+        try:
+            await self.recorder.record_unlinked_ai_calls(calls)
+        except Exception:
+            logger.exception("Failed to record discarded Stage 2 calls.", msg_id=message.message_id)
+
+    @staticmethod
+    async def _timed(coro) -> Tuple[ValidationResult, float]:
+        started = time.perf_counter()
+        result = await coro
+        return result, time.perf_counter() - started
+
+    async def _run_stage_one(self, message: Message) -> ValidationResult:
+        """Stage 1 з кешем вердиктів: OpenAI викликається лише при промаху."""
+        config = self._agent.stage_one_config
+        cached = await self._cache.get(1, message.content, config.model, config.system_prompt)
+        if cached:
+            return cached
+
+        result = await self._agent.validate_stage_one(message)
+        await self._cache.put(1, message.content, config.model, config.system_prompt, result)
+        return result
+
+    async def _run_stage_two(self, message: Message) -> ValidationResult:
+        """Stage 2 з кешем вердиктів: OpenAI викликається лише при промаху."""
+        config = self._agent.stage_two_config
+        cached = await self._cache.get(2, message.content, config.model, config.system_prompt)
+        if cached:
+            return cached
+
+        result = await self._agent.validate_stage_two(message)
+        await self._cache.put(2, message.content, config.model, config.system_prompt, result)
+        return result
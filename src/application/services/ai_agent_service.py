@@ -1,19 +1,38 @@
 # src/application/services/ai_agent_service.py
+import time
+from json import JSONDecodeError
+
 import instructor
 import structlog
-from openai import AsyncOpenAI, RateLimitError, APIError, APITimeoutError
-from pydantic import BaseModel, Field
-from typing import List, Literal, Optional
+from instructor.retry import InstructorRetryException
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient, RateLimitError, APIError, APITimeoutError
+from pydantic import BaseModel, Field, ValidationError
+from tenacity import AsyncRetrying, retry_if_exception_type, stop_after_attempt
+from typing import Awaitable, Callable, Dict, List, Literal, Optional
 
 from config import settings
-from domain.models import Message, ValidationResult, ValidationStatus
+from config.settings import StageOneSettings, StageTwoSettings
+from application.services.ai_usage import CostCalculator, begin_request_count, count_response, split_call
+from application.services.openai_rate_limiter import AdaptiveRateLimiter
+from application.services.stage_one_batcher import StageOneBatcher
+from domain.models import AICallRecord, Message, ValidationResult, ValidationStatus
 
 logger = structlog.get_logger(__name__)
 
+# Спільний для обох етапів обмежувач: бачить заголовки кожної відповіді OpenAI
+rate_limiter = AdaptiveRateLimiter.from_settings(settings.openai)
+cost_calculator = CostCalculator(settings.openai.pricing)
+
 # Ініціалізуємо OpenAI-клієнт при старті модуля
 try:
     # Використовуємо правильний шлях до ключа: settings.openai.api_key
-    aclient = instructor.patch(AsyncOpenAI(api_key=settings.openai.api_key.get_secret_value()))
+    aclient = instructor.patch(AsyncOpenAI(
+        api_key=settings.openai.api_key.get_secret_value(),
+        timeout=settings.openai.timeout,
+        # 429 обробляє rate_limiter (чергою), а не вбудовані ретраї SDK
+        max_retries=0,
+        http_client=DefaultAsyncHttpxClient(event_hooks={"response": [rate_limiter.observe_response, count_response]}),
+    ))
 except Exception as e:
     logger.critical("Failed to initialize OpenAI client. Check API key.", error=e)
     aclient = None
@@ -29,6 +48,26 @@ class StageOneResult(BaseModel):
     reason: str = Field(..., description="A very brief (1-2 sentences) reasoning for the verdict.")
 
 
+class StageOneBatchItem(StageOneResult):
+    """Вердикт Stage 1 для одного повідомлення з пакета."""
+    message_id: str = Field(..., description="The id of the message this verdict belongs to, copied exactly.")
+
+
+class StageOneBatchResult(BaseModel):
+    """Pydantic модель для пакетного Stage 1: по одному вердикту на кожне повідомлення."""
+    results: List[StageOneBatchItem] = Field(
+        ...,
+        description="Exactly one verdict for every message in the input, in any order."
+    )
+
+
+STAGE_ONE_BATCH_INSTRUCTIONS = (
+    "\n\nYou will receive several independent messages, each wrapped in <message id=\"...\"> tags. "
+    "Classify every message on its own, following the rules above, and return one result per message "
+    "with its id copied exactly."
+)
+
+
 class StageTwoResult(BaseModel):
     """Pydantic модель для другого, детального етапу валідації."""
     status: Literal["RELEVANT", "POSSIBLY_RELEVANT", "POSSIBLY_UNRELEVANT", "UNRELEVANT"] = Field(
@@ -48,9 +87,35 @@ class AIAgentService:
     """
     total_requests: int = 0
 
-    def __init__(self):
+    def __init__(self, unlinked_calls_sink: Optional[Callable[[List[AICallRecord]], Awaitable[None]]] = None):
+        # Куди писати оплачені виклики, які не потраплять у жодну можливість
+        self._unlinked_calls_sink = unlinked_calls_sink
         self._config_stage_one = settings.openai.stage_one
         self._config_stage_two = settings.openai.stage_two
+        self._stage_one_batcher: Optional[StageOneBatcher] = None
+        if self._config_stage_one.batch_size > 1:
+            self._stage_one_batcher = StageOneBatcher(
+                batch_validator=self._validate_stage_one_batch,
+                single_validator=self._validate_stage_one_single,
+                max_size=self._config_stage_one.batch_size,
+                max_wait_ms=self._config_stage_one.batch_wait_ms,
+            )
+
+    @property
+    def stage_one_config(self) -> StageOneSettings:
+        return self._config_stage_one
+
+    @property
+    def stage_two_config(self) -> StageTwoSettings:
+        return self._config_stage_two
+
+    def apply_stage_configs(self, stage_one: StageOneSettings, stage_two: StageTwoSettings):
+        """
+        Підміняє моделі/промпти на льоту (hot-reload). Запити, що вже в роботі,
+        дочитують стару версію; параметри пакетування змінюються лише після рестарту.
+        """
+        self._config_stage_one = stage_one
+        self._config_stage_two = stage_two
 
     @classmethod
     def increment_request_count(cls, count: int = 1):
@@ -74,20 +139,167 @@ class AIAgentService:
         else:
             return ValidationStatus.UNRELEVANT
 
+    @staticmethod
+    def _parse_retrying(max_retries: int) -> AsyncRetrying:
+        """
+        Ретраї instructor — лише на нерозібрану відповідь (re-ask). 429 та інші помилки API
+        виходять одразу і повертаються в чергу rate_limiter, а не надсилаються повторно в тому ж слоті.
+        instructor загортає ValidationError/JSONDecodeError в InstructorRetryException всередині спроби.
+        """
+        return AsyncRetrying(
+            stop=stop_after_attempt(max_retries),
+            retry=retry_if_exception_type((InstructorRetryException, ValidationError, JSONDecodeError)),
+            reraise=True,
+        )
+
+    async def _create_completion(self, log, stage: int, calls: List[AICallRecord], **kwargs):
+        """
+        Виклик OpenAI через спільний rate_limiter. На 429 виклик не падає,
+        а повертається в чергу (обмежувач сам витримує паузу) до rate_limit_max_attempts спроб.
+        kwargs["max_retries"] — скільки разів instructor перепитує модель на нерозібрану відповідь.
+        Токени, ретраї, затримка та вартість дописуються в `calls` — навіть якщо виклик упав.
+        """
+        estimated_tokens = rate_limiter.estimate_tokens(*(m["content"] for m in kwargs["messages"]))
+        max_attempts = max(1, settings.openai.rate_limit_max_attempts)
+        parse_retries = kwargs.pop("max_retries", 1)
+        requests = begin_request_count()
+        latency = 0.0
+        usage = None
+        try:
+            for attempt in range(1, max_attempts + 1):
+                # AsyncRetrying зберігає стан спроб у собі — новий об'єкт на кожен виклик
+                kwargs["max_retries"] = self._parse_retrying(parse_retries)
+                try:
+                    async with rate_limiter.slot(estimated_tokens):
+                        started = time.perf_counter()
+                        try:
+                            result = await aclient.chat.completions.create(**kwargs)
+                        finally:
+                            latency += time.perf_counter() - started
+                    # instructor підсумовує usage усіх своїх ретраїв у _raw_response
+                    usage = getattr(getattr(result, "_raw_response", None), "usage", None)
+                    return result
+                except RateLimitError as e:
+                    # Вичерпана квота не минає сама — немає сенсу чекати
+                    if attempt == max_attempts or getattr(e, "code", None) == "insufficient_quota":
+                        raise
+                    log.warning("OpenAI rate limit hit, re-queueing request.", attempt=attempt, **rate_limiter.stats())
+        except InstructorRetryException as e:
+            usage = e.total_usage
+            raise
+        finally:
+            calls.append(self._call_record(stage, kwargs["model"], usage, requests[0], latency))
+
+    @staticmethod
+    def _call_record(stage: int, model: str, usage, http_requests: int, latency: float) -> AICallRecord:
+        prompt_tokens = getattr(usage, "prompt_tokens", 0) or 0
+        completion_tokens = getattr(usage, "completion_tokens", 0) or 0
+        return AICallRecord(
+            stage=stage,
+            model=model,
+            prompt_tokens=prompt_tokens,
+            completion_tokens=completion_tokens,
+            retries=max(0, http_requests - 1),
+            latency_ms=int(latency * 1000),
+            cost_usd=cost_calculator.cost(model, prompt_tokens, completion_tokens),
+        )
+
+    async def _record_unlinked_calls(self, log, calls: List[AICallRecord]) -> None:
+        if not calls or not self._unlinked_calls_sink:
+            return
+        try:
+            await self._unlinked_calls_sink(calls)
+        except Exception:
+            # Збій обліку не повинен зривати перевірку повідомлень поодинці
+            log.exception("Failed to record unlinked AI calls.", count=len(calls))
+
+    @staticmethod
+    def _stage_one_to_validation(result: StageOneResult, calls: List[AICallRecord]) -> ValidationResult:
+        status = ValidationStatus.POSSIBLY_RELEVANT if result.verdict == "POTENTIAL" else ValidationStatus.UNRELEVANT
+        return ValidationResult(status=status, score=result.confidence, reason=result.reason, ai_calls=calls)
+
     async def validate_stage_one(self, msg: Message) -> ValidationResult:
         """
         Виконує перший етап перевірки: швидкий фільтр сміття.
+        Якщо увімкнено пакетування, запит іде через StageOneBatcher.
         """
+        if self._stage_one_batcher:
+            return await self._stage_one_batcher.submit(msg)
+        return await self._validate_stage_one_single(msg)
+
+    async def _validate_stage_one_batch(self, messages: List[Message]) -> Dict[int, ValidationResult]:
+        """
+        Один запит Stage 1 на пакет повідомлень. Кидає виняток, якщо відповідь не розібрано,
+        — тоді StageOneBatcher перевірить повідомлення поодинці.
+        """
+        log = logger.bind(stage=1, batch_size=len(messages))
+        if not aclient:
+            raise RuntimeError("OpenAI client is not available.")
+
+        AIAgentService.increment_request_count()
+        log.info("Sending message batch to AI Agent for validation (Stage 1)...")
+
+        batch_content = "\n".join(
+            f'<message id="{m.message_id}">\n{m.content}\n</message>' for m in messages
+        )
+        calls: List[AICallRecord] = []
+        try:
+            batch: StageOneBatchResult = await self._create_completion(
+                log,
+                stage=1,
+                calls=calls,
+                model=self._config_stage_one.model,
+                response_model=StageOneBatchResult,
+                messages=[
+                    {"role": "system", "content": self._config_stage_one.system_prompt + STAGE_ONE_BATCH_INSTRUCTIONS},
+                    {"role": "user", "content": f"Analyze these messages:\n---\n{batch_content}\n---"},
+                ],
+                max_retries=self._config_stage_one.max_retries,
+            )
+        except Exception:
+            # Повідомлення підуть поодинці; токени невдалого пакета все одно оплачені — пишемо їх в облік
+            log.warning("Stage 1 batch call failed.", **calls[0].model_dump(exclude={"stage", "batch_size"}))
+            await self._record_unlinked_calls(log, calls)
+            raise
+
+        known_ids = {str(m.message_id): m.message_id for m in messages}
+        verdicts: Dict[int, StageOneBatchItem] = {}
+        for item in batch.results:
+            message_id = known_ids.get(item.message_id.strip())
+            if message_id is not None:
+                verdicts.setdefault(message_id, item)
+
+        if not verdicts:
+            # Жодного придатного вердикту: пакет оплачено, але частки нікому не дістануться
+            log.warning("Stage 1 batch returned no usable verdicts.", **calls[0].model_dump(exclude={"stage", "batch_size"}))
+            await self._record_unlinked_calls(log, calls)
+            return {}
+
+        # Вартість пакета ділиться між повідомленнями, що отримали вердикт
+        shares = split_call(calls[0], len(verdicts))
+        results: Dict[int, ValidationResult] = {
+            message_id: self._stage_one_to_validation(item, [share])
+            for (message_id, item), share in zip(verdicts.items(), shares)
+        }
+
+        log.debug("Stage 1 batch validation successful.", verdicts=len(results))
+        return results
+
+    async def _validate_stage_one_single(self, msg: Message) -> ValidationResult:
         log = logger.bind(msg_id=msg.message_id, stage=1)
         if not aclient:
             log.error("OpenAI client is not available.")
             return ValidationResult(status=ValidationStatus.ERROR, reason="Client not initialized")
 
+        calls: List[AICallRecord] = []
         try:
             AIAgentService.increment_request_count()
             log.info("Sending message to AI Agent for validation (Stage 1)...")
 
-            result: StageOneResult = await aclient.chat.completions.create(
+            result: StageOneResult = await self._create_completion(
+                log,
+                stage=1,
+                calls=calls,
                 # --- ВИКОРИСТОВУЄМО НАЛАШТУВАННЯ З КОНФІГУ ---
                 model=self._config_stage_one.model,
                 response_model=StageOneResult,
@@ -98,14 +310,14 @@ class AIAgentService:
                 max_retries=self._config_stage_one.max_retries,
             )
 
-            status = ValidationStatus.POSSIBLY_RELEVANT if result.verdict == "POTENTIAL" else ValidationStatus.UNRELEVANT
-            log.debug("Stage 1 validation successful.", status=status.name, score=result.confidence)
+            validation = self._stage_one_to_validation(result, calls)
+            log.debug("Stage 1 validation successful.", status=validation.status.name, score=result.confidence)
 
-            return ValidationResult(status=status, score=result.confidence, reason=result.reason)
+            return validation
 
         except Exception as e:
             log.exception("Unexpected error in AI Agent (Stage 1).")
-            return ValidationResult(status=ValidationStatus.ERROR, reason="Agent processing failed")
+            return ValidationResult(status=ValidationStatus.ERROR, reason="Agent processing failed", ai_calls=calls)
 
     async def validate_stage_two(self, msg: Message) -> ValidationResult:
         """
@@ -116,11 +328,15 @@ class AIAgentService:
             log.error("OpenAI client is not available.")
             return ValidationResult(status=ValidationStatus.ERROR, reason="Client not initialized")
 
+        calls: List[AICallRecord] = []
         try:
             AIAgentService.increment_request_count()
             log.info("Sending message to AI Agent for validation (Stage 2)...")
 
-            lead_details: StageTwoResult = await aclient.chat.completions.create(
+            lead_details: StageTwoResult = await self._create_completion(
+                log,
+                stage=2,
+                calls=calls,
                 # --- ВИКОРИСТОВУЄМО НАЛАШТУВАННЯ З КОНФІГУ ---
                 model=self._config_stage_two.model,
                 response_model=StageTwoResult,
@@ -141,10 +357,11 @@ class AIAgentService:
                 reason=lead_details.summary,
                 lead_type=lead_details.lead_type,
                 extracted_tech_stack=lead_details.tech_stack,
+                ai_calls=calls,
             )
         except (RateLimitError, APITimeoutError, APIError) as e:
             log.warning(f"OpenAI API error during Stage 2: {type(e).__name__}")
-            return ValidationResult(status=ValidationStatus.ERROR, reason=f"API error: {str(e)}")
+            return ValidationResult(status=ValidationStatus.ERROR, reason=f"API error: {str(e)}", ai_calls=calls)
         except Exception as e:
             log.exception("Unexpected error in AI Agent (Stage 2).")
-            return ValidationResult(status=ValidationStatus.ERROR, reason="Agent processing failed")
\ No newline at end of file
+            return ValidationResult(status=ValidationStatus.ERROR, reason="Agent processing failed", ai_calls=calls)
\ No newline at end of file
@@ -0,0 +1,94 @@
+# src/application/services/ai_cost_report_service.py
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+import structlog
+from tortoise import Tortoise
+
+from database.dialect import qmark
+from domain.models import ValidationStatus
+
+logger = structlog.get_logger(__name__)
+
+_QUALIFIED = (ValidationStatus.RELEVANT.value, ValidationStatus.POSSIBLY_RELEVANT.value)
+
+
+class AICostReportService:
+    """
+    Агрегує реальні витрати на AI з таблиці ai_calls: по моделях/етапах,
+    вартість кваліфікованого ліда, розріз по серверах і ключових словах.
+    """
+
+    def __init__(self, days: Optional[int] = None, top: int = 10):
+        self._since = datetime.now(timezone.utc) - timedelta(days=days) if days else None
+        self._top = top
+
+    def _period(self, column: str) -> tuple:
+        if self._since is None:
+            return "", []
+        return f" AND {column} >= ?", [self._since]
+
+    async def _query(self, sql: str, params: list) -> List[Dict]:
+        conn = Tortoise.get_connection("default")
+        return await conn.execute_query_dict(qmark(conn, sql), params)
+
+    async def by_model(self) -> List[Dict]:
+        where, params = self._period("created_at")
+        return await self._query(f"""
+            SELECT stage, model,
+                   COUNT(*)               AS calls,
+                   SUM(prompt_tokens)     AS prompt_tokens,
+                   SUM(completion_tokens) AS completion_tokens,
+                   SUM(retries)           AS retries,
+                   AVG(latency_ms)        AS avg_latency_ms,
+                   SUM(cost_usd)          AS cost_usd,
+                   SUM(CASE WHEN discarded THEN cost_usd ELSE 0 END) AS discarded_cost_usd
+            FROM ai_calls
+            WHERE 1 = 1{where}
+            GROUP BY stage, model
+            ORDER BY stage, cost_usd DESC
+        """, params)
+
+    async def by_dimension(self, dimension_sql: str) -> List[Dict]:
+        """Витрати та ліди в розрізі довільного виразу над opportunities (o) / server (srv)."""
+        where, params = self._period("c.created_at")
+        return await self._query(f"""
+            SELECT {dimension_sql}  AS name,
+                   SUM(c.cost_usd)  AS cost_usd,
+                   COUNT(DISTINCT o.id) AS messages,
+                   COUNT(DISTINCT CASE WHEN o.ai_stage_two_status IN (?, ?) THEN o.id END) AS leads
+            FROM ai_calls AS c
+            JOIN opportunities AS o ON c.opportunity_id = o.id
+            LEFT JOIN server AS srv ON o.server_id = srv.id
+            WHERE 1 = 1{where}
+            -- за позицією: PostgreSQL у GROUP BY name бере вхідну колонку srv.name, а не псевдонім
+            GROUP BY 1
+            ORDER BY cost_usd DESC
+            LIMIT {int(self._top)}
+        """, [*_QUALIFIED, *params])
+
+    async def totals(self) -> Dict:
+        where, params = self._period("c.created_at")
+        rows = await self._query(f"""
+            SELECT COUNT(*) AS calls,
+                   COALESCE(SUM(c.cost_usd), 0) AS cost_usd,
+                   COALESCE(SUM(CASE WHEN c.discarded THEN c.cost_usd ELSE 0 END), 0) AS discarded_cost_usd,
+                   COUNT(DISTINCT CASE WHEN o.ai_stage_two_status IN (?, ?) THEN o.id END) AS leads
+            FROM ai_calls AS c
+            LEFT JOIN opportunities AS o ON c.opportunity_id = o.id
+            WHERE 1 = 1{where}
+        """, [*_QUALIFIED, *params])
+        totals = rows[0] if rows else {"calls": 0, "cost_usd": 0.0, "discarded_cost_usd": 0.0, "leads": 0}
+        totals["cost_per_lead_usd"] = totals["cost_usd"] / totals["leads"] if totals["leads"] else None
+        totals["leads_per_usd"] = totals["leads"] / totals["cost_usd"] if totals["cost_usd"] else None
+        return totals
+
+    async def run(self) -> Dict:
+        report = {
+            "totals": await self.totals(),
+            "by_model": await self.by_model(),
+            "by_server": await self.by_dimension("COALESCE(srv.name, '(DM)')"),
+            "by_keyword": await self.by_dimension("COALESCE(o.keyword_trigger, '(none)')"),
+        }
+        logger.info("AI cost report generated", **report["totals"])
+        return report
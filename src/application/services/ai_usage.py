@@ -0,0 +1,66 @@
+# src/application/services/ai_usage.py
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+
+import httpx
+import structlog
+
+from config.settings import ModelPricing
+from domain.models import AICallRecord
+
+logger = structlog.get_logger(__name__)
+
+# Лічильник HTTP-запитів поточного виклику (включно з ретраями instructor та 429).
+# httpx викликає event hooks у тому ж таску, тож ContextVar ізолює паралельні виклики.
+_http_requests: ContextVar[Optional[List[int]]] = ContextVar("ai_http_requests", default=None)
+
+
+def begin_request_count() -> List[int]:
+    counter = [0]
+    _http_requests.set(counter)
+    return counter
+
+
+async def count_response(response: httpx.Response) -> None:
+    """httpx event hook: рахує кожну відповідь OpenAI для поточного виклику."""
+    counter = _http_requests.get()
+    if counter is not None:
+        counter[0] += 1
+
+
+class CostCalculator:
+    """Рахує вартість виклику за таблицею цін із конфігу (точна назва або найдовший префікс)."""
+
+    def __init__(self, pricing: Dict[str, ModelPricing]):
+        self._pricing = pricing
+        self._unknown_logged = set()
+
+    def price_for(self, model: str) -> Optional[ModelPricing]:
+        if model in self._pricing:
+            return self._pricing[model]
+        # "gpt-4o-mini-2024-07-18" -> "gpt-4o-mini", а не "gpt-4o"
+        matches = [name for name in self._pricing if model.startswith(name)]
+        return self._pricing[max(matches, key=len)] if matches else None
+
+    def cost(self, model: str, prompt_tokens: int, completion_tokens: int) -> float:
+        price = self.price_for(model)
+        if price is None:
+            if model not in self._unknown_logged:
+                self._unknown_logged.add(model)
+                logger.warning("No pricing configured for model, cost recorded as 0.", model=model)
+            return 0.0
+        return (prompt_tokens * price.input_per_1m + completion_tokens * price.output_per_1m) / 1_000_000
+
+
+def split_call(record: AICallRecord, parts: int) -> List[AICallRecord]:
+    """Ділить пакетний виклик порівну між повідомленнями (залишок токенів — першому)."""
+    parts = max(1, parts)
+    records = []
+    for i in range(parts):
+        records.append(record.model_copy(update={
+            "prompt_tokens": record.prompt_tokens // parts + (record.prompt_tokens % parts if i == 0 else 0),
+            "completion_tokens": record.completion_tokens // parts + (record.completion_tokens % parts if i == 0 else 0),
+            "cost_usd": record.cost_usd / parts,
+            "batch_size": parts,
+        }))
+    return records
@@ -1,95 +1,210 @@
 # src/dkh/application/services/backfill_service.py
 import asyncio
+import functools
 import sys
 from datetime import datetime, timedelta, timezone
-from typing import List, Optional, AsyncGenerator
+from collections import Counter
+from typing import AsyncGenerator, Dict, List, NamedTuple, Optional, Sequence, Tuple
 
 import discord
 import structlog
-from discord.utils import snowflake_time
+from discord.utils import snowflake_time, time_snowflake
 from tqdm.asyncio import tqdm
 
-from database.storage import DatabaseStorage
+from database.models import BackfillRun
+from database.storage import DatabaseStorage, chunked
 from application.message_pipeline import MessagePipeline
-from application.utils import SimpleGlobalRateLimiter
+from application.utils import DiscordRateLimiter
 from config import settings
 from domain.models import Message, MessageOpportunity
 
 logger = structlog.get_logger(__name__)
 
+# Бакет обмежувача для сторінок історії — окремий на кожен канал
+HISTORY_ROUTE = "GET /channels/{channel_id}/messages"
+
+# Прогін спільний для всіх акаунтів; 0 — той самий "Backfill-Client", що й у discovered_by за замовчуванням
+SHARED_RUN_BOT_ID = 0
+
+
+class BackfillAccount(NamedTuple):
+    """Залогінений акаунт з власним обмежувачем швидкості: ліміти Discord — на токен."""
+    client: discord.Client
+    name: str
+    rate_limiter: DiscordRateLimiter
+
+    @property
+    def id(self) -> int:
+        return self.client.user.id
+
 
 class BackfillService:
     """
     Виконує збір та обробку історії повідомлень з каналів.
+
+    Кожен запуск — прогін (backfill_runs) з чекпоінтами: курсор каналу та повідомлення,
+    що чекають AI, пишуться до класифікації. resume=True продовжує останній незавершений
+    прогін: пройдені канали пропускаються, незбережені повідомлення повертаються в AI.
+
+    Історію збирають усі залогінені акаунти: кожен канал (навіть видимий кільком акаунтам)
+    завантажується один раз — тим із його читачів, у кого найменше роботи.
     """
 
     def __init__(
         self,
-        client: discord.Client,
+        accounts: Sequence[BackfillAccount],
         pipeline: MessagePipeline,
-        rate_limiter: SimpleGlobalRateLimiter,
         db_storage: DatabaseStorage,
+        resume: bool = False,
     ):
-        self.client = client
+        self.accounts = list(accounts)
         self.pipeline = pipeline
-        self.rate_limiter = rate_limiter
         self.db = db_storage
-        self._channel_semaphore = asyncio.Semaphore(settings.discord.concurrent_channels)
+        self.resume = resume
+        self._run_id: Optional[int] = None
+        # concurrent_channels — на акаунт: пропускна здатність росте з кількістю токенів
+        self._channel_semaphores: Dict[int, asyncio.Semaphore] = {
+            account.id: asyncio.Semaphore(settings.discord.concurrent_channels) for account in self.accounts
+        }
         # Лічильник унікальних запитів до AI API
         self.api_request_count: int = 0
+        # Скільки повідомлень проглянуто і скільки з них пройшло фільтр ключових слів
+        self.scanned_count: int = 0
+        self.keyword_hit_count: int = 0
+        self._ai_semaphore = asyncio.Semaphore(settings.discord.backfill_ai_in_flight)
+        # Скидання буферів каналів у БД/sinks — по одному, щоб не змагатися за транзакції
+        self._flush_lock = asyncio.Lock()
+        self.flush_count: int = 0
+        # Повідомлення, AI-валідація яких упала: лишаються в черзі прогону для --resume
+        self.failed_validation_count: int = 0
 
     async def run(self):
         log = logger.bind(
-            bot_id=str(self.client.user.id),
+            accounts=[account.name for account in self.accounts],
             history_days=settings.history_days
         )
+        run = await self._open_run(log)
+        log = log.bind(run_id=run.id)
+        self._run_id = run.id
         log.info("Backfill process started.")
 
-        cutoff_time = datetime.now(timezone.utc) - timedelta(days=settings.history_days)
-        active_channels = self._discover_active_channels(cutoff_time)
-
-        if not active_channels:
-            log.warning("No active channels found for backfill. Exiting.")
-            return
+        # Спершу — робота, що лишилась від перерваного прогону (без повторного завантаження історії)
+        found = await self._requeue_pending(log)
 
-        all_opportunities = await self._process_channels_history(active_channels, cutoff_time)
+        cutoff_time = datetime.now(timezone.utc) - timedelta(days=run.history_days)
+        finished = await self.db.get_finished_channels(run.id)
+        readers = {
+            channel_id: channel_readers
+            for channel_id, channel_readers in self._discover_active_channels(cutoff_time).items()
+            if channel_id not in finished
+        }
+        if finished:
+            log.info("Skipping channels finished in this run", channels=len(finished))
 
-        if all_opportunities:
-            log.info(f"Collected {len(all_opportunities)} total opportunities. Saving them now...")
-            await self.pipeline.recorder.record_batch(all_opportunities, "backfill")
+        failed = 0
+        if readers:
+            assignments = self._assign_shards(readers)
+            channels_found, failed = await self._process_channels_history(assignments, cutoff_time)
+            found += channels_found
         else:
+            log.warning("No active channels left for backfill.")
+        if not found:
             log.info("No new opportunities found during this backfill run.")
 
+        # Прогін з каналами чи повідомленнями, що впали, лишається відкритим — їх підхопить --resume
+        if failed or self.failed_validation_count:
+            log.warning("Backfill run left unfinished; rerun with --resume",
+                        failed_channels=failed, failed_validations=self.failed_validation_count)
+        else:
+            await self.db.finish_backfill_run(run.id)
+
         # Лог загальної кількості унікальних запитів до AI
+        log.info("Keyword prefilter", scanned=self.scanned_count, hits=self.keyword_hit_count)
         log.info("Total unique AI validation requests made", api_requests=self.api_request_count)
-        log.info("Backfill process finished.")
+        for account in self.accounts:
+            log.info("Discord rate limiter stats", account=account.name, **account.rate_limiter.stats())
+        log.info("Backfill process finished.", opportunities=found, flushes=self.flush_count)
 
-    def _discover_active_channels(self, cutoff: datetime) -> List[discord.TextChannel]:
-        active = []
+    async def _open_run(self, log) -> BackfillRun:
+        if self.resume:
+            run = await self.db.get_resumable_run(SHARED_RUN_BOT_ID)
+            if run:
+                log.info("Resuming backfill run", run_id=run.id, started_at=str(run.started_at))
+                return run
+            log.info("No unfinished backfill run to resume, starting a new one.")
+        return await self.db.create_backfill_run(SHARED_RUN_BOT_ID, settings.history_days)
+
+    async def _requeue_pending(self, log) -> int:
+        """Повідомлення, завантажені до збою, але не збережені: знову через AI → БД/sinks."""
+        pending = await self.db.get_pending_messages(self._run_id)
+        if not pending:
+            return 0
+        log.info("Re-queueing in-flight messages from checkpoint", messages=len(pending))
+        found = 0
+        for batch in chunked(pending, settings.discord.backfill_flush_size):
+            # Між record_batch і очищенням черги міг статися збій — збережене не класифікуємо вдруге
+            existing = await self.db.get_existing_message_ids(m.message_id for m in batch)
+            opportunities, validated_ids = await self._validate([m for m in batch if m.message_id not in existing], log)
+            found += await self._flush(opportunities, [*existing, *validated_ids])
+        return found
+
+    def _discover_active_channels(
+        self, cutoff: datetime
+    ) -> Dict[int, List[Tuple[BackfillAccount, discord.TextChannel]]]:
+        """
+        Активні канали з усіх акаунтів: {channel_id: [(акаунт, канал у його кеші), ...]}.
+        Один канал може мати кількох читачів — хто з них його завантажить, вирішує _assign_shards.
+        """
+        readers: Dict[int, List[Tuple[BackfillAccount, discord.TextChannel]]] = {}
         logger.debug("Discovering active channels...", cutoff_date=cutoff.strftime('%Y-%m-%d'))
-        for guild in self.client.guilds:
-            log = logger.bind(guild_id=guild.id, guild_name=guild.name)
-            me = guild.me
-            for channel in guild.text_channels:
-                if channel.last_message_id and channel.permissions_for(me).read_message_history:
-                    try:
-                        last_message_time = snowflake_time(channel.last_message_id).replace(tzinfo=timezone.utc)
-                        if last_message_time >= cutoff:
-                            active.append(channel)
-                    except (ValueError, TypeError):
-                        log.debug("Could not parse snowflake_time for channel", channel_id=channel.id)
-        active.sort(key=lambda c: c.last_message_id or 0, reverse=True)
-        logger.info("Active channels discovered", count=len(active))
-        return active
+        for account in self.accounts:
+            for guild in account.client.guilds:
+                log = logger.bind(account=account.name, guild_id=guild.id, guild_name=guild.name)
+                me = guild.me
+                for channel in guild.text_channels:
+                    if channel.last_message_id and channel.permissions_for(me).read_message_history:
+                        try:
+                            last_message_time = snowflake_time(channel.last_message_id).replace(tzinfo=timezone.utc)
+                            if last_message_time >= cutoff:
+                                readers.setdefault(channel.id, []).append((account, channel))
+                        except (ValueError, TypeError):
+                            log.debug("Could not parse snowflake_time for channel", channel_id=channel.id)
+        logger.info(
+            "Active channels discovered",
+            count=len(readers),
+            shared=sum(1 for channel_readers in readers.values() if len(channel_readers) > 1),
+        )
+        return readers
+
+    def _assign_shards(
+        self, readers: Dict[int, List[Tuple[BackfillAccount, discord.TextChannel]]]
+    ) -> List[Tuple[BackfillAccount, discord.TextChannel]]:
+        """
+        Кожному каналу — рівно один акаунт. Жадібно: спершу канали з найменшою кількістю
+        читачів (у них немає вибору), кожен — читачу з найменшим навантаженням.
+        """
+        load: Counter = Counter({account.id: 0 for account in self.accounts})
+        assignments = []
+        for channel_readers in sorted(readers.values(), key=len):
+            account, channel = min(channel_readers, key=lambda reader: load[reader[0].id])
+            load[account.id] += 1
+            assignments.append((account, channel))
+        # Найсвіжіші канали — першими, як і раніше
+        assignments.sort(key=lambda a: a[1].last_message_id or 0, reverse=True)
+        logger.info(
+            "Channels sharded across accounts",
+            shards={account.name: load[account.id] for account in self.accounts},
+        )
+        return assignments
 
     async def _process_channels_history(
         self,
-        channels: List[discord.TextChannel],
+        assignments: List[Tuple[BackfillAccount, discord.TextChannel]],
         default_after_time: datetime
-    ) -> List[MessageOpportunity]:
-        tasks = [self._stream_and_process_channel(ch, default_after_time) for ch in channels]
+    ) -> Tuple[int, int]:
+        tasks = [self._stream_and_process_channel(account, ch, default_after_time) for account, ch in assignments]
 
-        all_opportunities = []
+        found_count = 0
         processed_count = 0
         failed_count = 0
         progress_bar = tqdm(
@@ -100,9 +215,7 @@ class BackfillService:
         )
         for f in progress_bar:
             try:
-                channel_opportunities = await f
-                if channel_opportunities:
-                    all_opportunities.extend(channel_opportunities)
+                found_count += await f
                 processed_count += 1
             except Exception:
                 logger.error("A channel processing task failed. See previous logs for details.")
@@ -113,100 +226,159 @@ class BackfillService:
             total_channels=len(tasks),
             successful=processed_count,
             failed=failed_count,
-            found_opportunities=len(all_opportunities)
+            found_opportunities=found_count
         )
-        return all_opportunities
+        return found_count, failed_count
 
     async def _stream_and_process_channel(
-        self, channel: discord.TextChannel, default_after_time: datetime
-    ) -> List[MessageOpportunity]:
-        log = logger.bind(channel_id=channel.id, channel_name=channel.name)
+        self, account: BackfillAccount, channel: discord.TextChannel, default_after_time: datetime
+    ) -> int:
+        """
+        Стрімінг одного каналу: сторінка → фільтр/дедуплікація → чекпоінт → AI → буфер.
+        Буфер скидається в БД і sinks кожні backfill_flush_size можливостей і в кінці каналу,
+        тож у пам'яті не більше одного буфера на канал. Чекпоінт (курсор + черга AI) пишеться
+        до класифікації, тож перерваний прогін не завантажує сторінку вдруге.
+        """
+        log = logger.bind(account=account.name, channel_id=channel.id, channel_name=channel.name)
+        flush_size = settings.discord.backfill_flush_size
         try:
-            async with self._channel_semaphore:
-                # ЕТАП 1: ЗБІР ТА ПЕРВИННА ФІЛЬТРАЦІЯ З ДЕДУПЛІКАЦІЄЮ
-                last_seen_timestamp = await self.db.get_latest_message_timestamp(channel.id)
-                start_time = last_seen_timestamp or default_after_time
-
-                potential_messages: List[Message] = []
-                async for msg in self._stream_and_deduped_history(channel, start_time):
-                    domain = self._to_domain_message(msg)
-                    if domain:
-                        potential_messages.append(domain)
-
-                if not potential_messages:
-                    return []
-
-                # ЕТАП 2: ДЕДУПЛІКАЦІЯ ЗА URL ТА ПЕРЕВІРКА В БД
-                urls = [m.jump_url for m in potential_messages]
-                existing = set(await self.db.get_existing_urls(urls))
-                unique_map = {}
-                for m in potential_messages:
-                    if m.jump_url in existing:
-                        continue
-                    unique_map[m.jump_url] = m
-                messages_for_ai = list(unique_map.values())
-
-                if not messages_for_ai:
-                    log.debug("No new unique messages to send to AI after DB check.")
-                    return []
-
-                # Збільшуємо лічильник унікальних запитів до AI
-                self.api_request_count += len(messages_for_ai)
-                log.debug(f"Incremented API request counter by {len(messages_for_ai)}. Total so far: {self.api_request_count}")
-
-                log.debug(f"Queue of {len(messages_for_ai)} unique messages for AI validation formed.")
-
-                # ЕТАП 3: КОНТРОЛЬОВАНА ОБРОБКА ЧЕРЕЗ AI
-                validation_tasks = [
-                    asyncio.create_task(self.pipeline.validate_and_get_opportunity(msg))
-                    for msg in messages_for_ai
-                ]
-                results = await asyncio.gather(*validation_tasks, return_exceptions=True)
-                return [res for res in results if res and not isinstance(res, Exception)]
+            async with self._channel_semaphores[account.id]:
+                # Продовжуємо строго після курсора; без нього — від останньої можливості.
+                # Але не раніше history_days: застарілий курсор не повинен гортати всю історію каналу
+                after_id = await self.db.get_channel_cursor(channel.id)
+                if after_id is None:
+                    last_seen_timestamp = await self.db.get_latest_message_timestamp(channel.id)
+                    after_id = time_snowflake(last_seen_timestamp, high=True) if last_seen_timestamp else 0
+                after_id = max(after_id, time_snowflake(default_after_time, high=True))
+
+                pending: List[MessageOpportunity] = []
+                in_flight: List[int] = []
+                found = 0
+                async for page in self._stream_history_pages(channel, after_id, account.rate_limiter):
+                    messages_for_ai = await self._select_new_messages(page)
+                    await self.db.checkpoint_page(self._run_id, channel.id, messages_for_ai, page[-1].id)
+                    opportunities, validated_ids = await self._validate(messages_for_ai, log, account)
+                    pending.extend(opportunities)
+                    in_flight.extend(validated_ids)
+                    if len(pending) >= flush_size:
+                        found += await self._flush(pending, in_flight)
+                        pending, in_flight = [], []
+
+                found += await self._flush(pending, in_flight)
+                await self.db.mark_channel_finished(self._run_id, channel.id)
+                return found
         except Exception as e:
             log.exception("Critical error during channel processing pipeline", error_type=type(e).__name__)
             raise
 
-    async def _stream_and_deduped_history(
-        self, channel: discord.TextChannel, after_time: datetime
-    ) -> AsyncGenerator[discord.Message, None]:
+    async def _select_new_messages(self, page: List[discord.Message]) -> List[Message]:
+        # ЕТАП 1: ФІЛЬТР ЗА КЛЮЧОВИМИ СЛОВАМИ ПО СИРОМУ ТЕКСТУ — доменні об'єкти лише для збігів
+        hits: Dict[int, Tuple[discord.Message, List[str]]] = {}
+        for msg in page:
+            if not msg.content or msg.id in hits:
+                continue
+            keywords = self.pipeline.match_keywords(msg.content)
+            if keywords is not None:
+                hits[msg.id] = (msg, keywords)
+        self.scanned_count += len(page)
+        self.keyword_hit_count += len(hits)
+        if not hits:
+            return []
+
+        # ЕТАП 2: ПЕРЕВІРКА В БД ЗА ID ПОВІДОМЛЕННЯ
+        existing = await self.db.get_existing_message_ids(hits.keys())
+        return [
+            self._to_domain_message(msg, keywords)
+            for message_id, (msg, keywords) in hits.items()
+            if message_id not in existing
+        ]
+
+    async def _validate(
+        self, messages_for_ai: List[Message], log, account: Optional[BackfillAccount] = None
+    ) -> Tuple[List[MessageOpportunity], List[int]]:
         """
-        Асинхронно ітерується по історії повідомлень з дедуплікацією по ID, щоб уникнути повторів.
+        AI-валідація; знайдене записується на акаунт, що завантажив канал (без нього — Backfill-Client).
+        Повертає (можливості, id повідомлень з вердиктом). Повідомлення, валідація яких упала,
+        у другий список не потрапляють — вони лишаються в черзі прогону до --resume.
         """
-        seen_ids = set()
-        naive_after = after_time.replace(tzinfo=None)
+        if not messages_for_ai:
+            return [], []
+
+        # Збільшуємо лічильник унікальних запитів до AI
+        self.api_request_count += len(messages_for_ai)
+        log.debug("Page queued for AI validation.", messages=len(messages_for_ai), total=self.api_request_count)
+
+        # ЕТАП 3: КОНТРОЛЬОВАНА ОБРОБКА ЧЕРЕЗ AI
+        validation_tasks = [asyncio.create_task(self._validate_one(msg)) for msg in messages_for_ai]
+        results = await asyncio.gather(*validation_tasks, return_exceptions=True)
+        opportunities = [res for res in results if res and not isinstance(res, BaseException)]
+        validated_ids = [msg.message_id for msg, res in zip(messages_for_ai, results) if not isinstance(res, BaseException)]
+        failed = len(messages_for_ai) - len(validated_ids)
+        if failed:
+            self.failed_validation_count += failed
+            log.warning("AI validation failed; messages kept for --resume", failed=failed,
+                        error=next(repr(res) for res in results if isinstance(res, BaseException)))
+        if account:
+            for opportunity in opportunities:
+                opportunity.bot_id = account.id
+                opportunity.bot_name = account.name
+        return opportunities, validated_ids
+
+    async def _validate_one(self, message: Message) -> Optional[MessageOpportunity]:
+        # Спільна межа для всіх каналів і акаунтів: скільки повідомлень одночасно в AI
+        async with self._ai_semaphore:
+            # Ключові слова вже знайдено в _select_new_messages (і збережено в чекпоінті)
+            return await self.pipeline.validate_and_get_opportunity(message, prefiltered=bool(message.keywords))
+
+    async def _flush(self, opportunities: List[MessageOpportunity], message_ids: List[int]) -> int:
+        """
+        Зберігає буфер (БД + sinks), а потім прибирає його повідомлення з черги прогону —
+        саме в такому порядку, щоб збій не загубив незбережене. Скидання з усіх каналів
+        іде по черзі (один записувач).
+        """
+        if not message_ids:
+            return 0
+        async with self._flush_lock:
+            if opportunities:
+                await self.pipeline.recorder.record_batch(opportunities, "backfill")
+                self.flush_count += 1
+            await self.db.complete_pending_messages(message_ids)
+        return len(opportunities)
+
+    async def _stream_history_pages(
+        self, channel: discord.TextChannel, after_id: int, rate_limiter: DiscordRateLimiter
+    ) -> AsyncGenerator[List[discord.Message], None]:
+        """
+        Гортає історію ВПЕРЕД (від старих до нових) сторінками строго після after_id.
+        Кожна наступна сторінка починається після останнього повідомлення попередньої.
+        """
+        page_limit = settings.discord.message_page_limit
+        bucket = (HISTORY_ROUTE, channel.id)
         while True:
             try:
-                await self.rate_limiter.acquire()
-                page = [
-                    msg async for msg in channel.history(
-                        limit=settings.discord.message_page_limit,
-                        after=naive_after,
-                        before=discord.Object(id=page[-1].id) if 'page' in locals() and page else None,
-                    )
-                ]
-                if not page:
-                    break
-                for msg in page:
-                    if msg.id in seen_ids:
-                        continue
-                    seen_ids.add(msg.id)
-                    yield msg
-            except discord.HTTPException as e:
-                if e.status == 429:
-                    retry_after = float(getattr(e, 'retry_after', 5.0))
-                    logger.warning("Rate limit hit, backing off...", retry_after=retry_after)
-                    await asyncio.sleep(retry_after + 1)
-                    continue
+                # 429/5xx повторюються всередині call(); вичерпані повтори валять канал — прогін лишиться для --resume
+                page = await rate_limiter.call(
+                    bucket, functools.partial(self._fetch_page, channel, after_id, page_limit)
+                )
+            except discord.Forbidden:
+                logger.warning("No access to channel history", channel_id=channel.id)
+                return
+            if not page:
                 break
-            except Exception:
-                logger.exception("Unexpected error fetching channel history")
+            after_id = page[-1].id
+            yield page
+            if len(page) < page_limit:
                 break
 
-    def _to_domain_message(self, msg: discord.Message) -> Optional[Message]:
-        """Конвертує discord.Message в доменну модель Message."""
-        if not msg.content:
-            return None
+    @staticmethod
+    async def _fetch_page(channel: discord.TextChannel, after_id: int, limit: int) -> List[discord.Message]:
+        return [
+            msg async for msg in channel.history(limit=limit, after=discord.Object(id=after_id), oldest_first=True)
+        ]
+
+    @staticmethod
+    def _to_domain_message(msg: discord.Message, keywords: List[str]) -> Message:
+        """Конвертує discord.Message (вже відібране фільтром) в доменну модель Message."""
         return Message(
             message_id=msg.id,
             channel_id=msg.channel.id,
@@ -218,5 +390,6 @@ class BackfillService:
             content=msg.content.strip(),
             timestamp=msg.created_at,
             jump_url=msg.jump_url,
-            keyword=None,
+            keyword=keywords[0] if keywords else None,
+            keywords=keywords,
         )
@@ -0,0 +1,156 @@
+# src/application/services/keyword_engines.py
+import re
+from typing import Dict, List, NamedTuple, Protocol
+
+
+class KeywordMatch(NamedTuple):
+    """Одне спрацювання ключового слова: канонічне слово з конфігу та його позиція в тексті."""
+    keyword: str
+    start: int
+    end: int
+
+
+class KeywordEngine(Protocol):
+    """Контракт рушія пошуку ключових слів для MessageFilter."""
+
+    def find_all(self, content: str) -> List[KeywordMatch]:
+        """Повертає всі спрацювання, відсортовані за позицією."""
+        ...
+
+
+def _is_word_char(ch: str) -> bool:
+    # Те саме, що `\w` у re з Unicode
+    return ch.isalnum() or ch == "_"
+
+
+def _fold(text: str) -> str:
+    """
+    Нижній регістр без зміни довжини рядка, щоб позиції збігів лишались валідними
+    (деякі символи, напр. 'İ', при lower() перетворюються на два).
+    """
+    lowered = text.lower()
+    if len(lowered) == len(text):
+        return lowered
+    return "".join(ch.lower()[0] for ch in text)
+
+
+class RegexKeywordEngine:
+    """
+    Початкова реалізація: одна велика регулярка-альтернація з `\\b` та IGNORECASE.
+    Повертає неперекривні збіги; час сканування росте з кількістю слів.
+    """
+
+    def __init__(self, keywords: List[str]):
+        self._canonical: Dict[str, str] = {k.lower(): k for k in keywords}
+        self._regex = re.compile(
+            r'\b(' + '|'.join(re.escape(k) for k in keywords) + r')\b', re.IGNORECASE
+        ) if keywords else None
+
+    def find_all(self, content: str) -> List[KeywordMatch]:
+        if not self._regex:
+            return []
+        return [
+            KeywordMatch(self._canonical.get(m.group(1).lower(), m.group(1)), m.start(1), m.end(1))
+            for m in self._regex.finditer(content)
+        ]
+
+
+class AhoCorasickKeywordEngine:
+    """
+    Автомат Ахо-Корасік: за один прохід по тексту знаходить усі ключові слова
+    (зокрема перекривні, як "react" і "react native"), незалежно від їх кількості.
+    Межі слів перевіряються вже після збігу — так само, як `\\b` у регулярці.
+    """
+
+    def __init__(self, keywords: List[str]):
+        # Стан 0 — корінь. _goto[state][char] -> наступний стан
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[int]] = [[]]
+        self._keywords: List[str] = []
+
+        seen = set()
+        for keyword in keywords:
+            folded = _fold(keyword.strip())
+            if not folded or folded in seen:
+                continue
+            seen.add(folded)
+            self._add(folded, len(self._keywords))
+            self._keywords.append(keyword.strip())
+        self._lengths = [len(_fold(k)) for k in self._keywords]
+        self._build_failure_links()
+
+    def _add(self, word: str, index: int) -> None:
+        state = 0
+        for ch in word:
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            state = nxt
+        self._output[state].append(index)
+
+    def _build_failure_links(self) -> None:
+        queue = list(self._goto[0].values())
+        head = 0
+        while head < len(queue):
+            state = queue[head]
+            head += 1
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fallback = self._fail[state]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(ch, 0)
+                self._fail[nxt] = target if target != nxt else 0
+                # Успадковуємо виходи суфіксів, щоб не ходити по fail-ланцюжку під час пошуку
+                self._output[nxt] = self._output[nxt] + self._output[self._fail[nxt]]
+
+    def find_all(self, content: str) -> List[KeywordMatch]:
+        if not self._keywords:
+            return []
+
+        text = _fold(content)
+        goto, fail, output = self._goto, self._fail, self._output
+        matches: List[KeywordMatch] = []
+        state = 0
+        for pos, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if not output[state]:
+                continue
+            end = pos + 1
+            for index in output[state]:
+                start = end - self._lengths[index]
+                if self._at_word_boundary(text, start, end):
+                    matches.append(KeywordMatch(self._keywords[index], start, end))
+
+        matches.sort(key=lambda m: (m.start, -m.end))
+        return matches
+
+    @staticmethod
+    def _at_word_boundary(text: str, start: int, end: int) -> bool:
+        # Межу вимагаємо лише там, де край ключового слова — "словесний" символ (як `\b`)
+        if _is_word_char(text[start]) and start > 0 and _is_word_char(text[start - 1]):
+            return False
+        if _is_word_char(text[end - 1]) and end < len(text) and _is_word_char(text[end]):
+            return False
+        return True
+
+
+KEYWORD_ENGINES = {
+    "regex": RegexKeywordEngine,
+    "aho_corasick": AhoCorasickKeywordEngine,
+}
+
+
+def build_keyword_engine(name: str, keywords: List[str]) -> KeywordEngine:
+    try:
+        engine_cls = KEYWORD_ENGINES[name]
+    except KeyError:
+        raise ValueError(f"Unknown keyword engine '{name}'. Available: {', '.join(KEYWORD_ENGINES)}")
+    return engine_cls(keywords)
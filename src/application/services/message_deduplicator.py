@@ -0,0 +1,101 @@
+# src/application/services/message_deduplicator.py
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Optional, Tuple, TypeVar
+
+import structlog
+
+logger = structlog.get_logger(__name__)
+
+T = TypeVar("T")
+
+
+class MessageDeduplicator:
+    """
+    Дедуплікація за Discord message_id між усіма акаунтами одного процесу.
+
+    - Якщо те саме повідомлення вже обробляється, наступні виклики не запускають
+      роботу вдруге, а чекають результат першого (coalescing).
+    - Нещодавно оброблені id пам'ятаються `ttl_seconds` (не більше `max_entries`),
+      тож пізні дублікати відкидаються без фільтра та LLM.
+    """
+
+    def __init__(self, ttl_seconds: float, max_entries: int):
+        self._ttl = ttl_seconds
+        self._max_entries = max_entries
+        self._in_flight: Dict[int, asyncio.Future] = {}
+        self._recent: "OrderedDict[int, float]" = OrderedDict()
+
+        # --- Метрики ---
+        self.unique = 0
+        self.coalesced = 0
+        self.recent_duplicates = 0
+
+    def _seen_recently(self, key: int) -> bool:
+        seen_at = self._recent.get(key)
+        if seen_at is None:
+            return False
+        if time.monotonic() - seen_at > self._ttl:
+            del self._recent[key]
+            return False
+        return True
+
+    def _remember(self, key: int) -> None:
+        self._recent[key] = time.monotonic()
+        self._recent.move_to_end(key)
+        while len(self._recent) > self._max_entries:
+            self._recent.popitem(last=False)
+
+    async def run_once(self, key: int, work: Callable[[], Awaitable[T]]) -> Tuple[Optional[T], bool]:
+        """
+        Виконує `work()` лише для першого спостерігача `key`.
+
+        Returns:
+            (результат, True) для власника роботи; (результат власника або None, False) для дублікатів.
+        """
+        if self._seen_recently(key):
+            self.recent_duplicates += 1
+            logger.debug("Message already processed recently, skipping.", msg_id=key)
+            return None, False
+
+        pending = self._in_flight.get(key)
+        if pending is not None:
+            self.coalesced += 1
+            logger.debug("Message is already in flight, waiting for its result.", msg_id=key)
+            try:
+                return await asyncio.shield(pending), False
+            except asyncio.CancelledError:
+                # Скасовано роботу власника, а не нас — просто пропускаємо дублікат
+                if pending.cancelled():
+                    return None, False
+                raise
+            except Exception:
+                return None, False
+
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        self.unique += 1
+        try:
+            result = await work()
+        except BaseException as e:
+            # Не запам'ятовуємо id: наступна спроба має право обробити повідомлення знову
+            if isinstance(e, Exception):
+                future.set_exception(e)
+                future.exception()  # щоб asyncio не скаржився, якщо ніхто не чекав
+            else:
+                future.cancel()
+            raise
+        else:
+            future.set_result(result)
+            self._remember(key)
+            return result, True
+        finally:
+            self._in_flight.pop(key, None)
+
+    def stats(self) -> dict:
+        return {
+            "dedupe_unique": self.unique,
+            "dedupe_coalesced": self.coalesced,
+            "dedupe_recent_duplicates": self.recent_duplicates,
+        }
@@ -1,9 +1,9 @@
 # src/dkh/application/services/message_filter.py
-import re
 from typing import List, Optional
 
 import structlog
 
+from application.services.keyword_engines import KeywordMatch, build_keyword_engine
 from domain.models import Message
 
 logger = structlog.get_logger(__name__)
@@ -12,19 +12,27 @@ logger = structlog.get_logger(__name__)
 class MessageFilter:
     """
     Відповідає за попередню фільтрацію повідомлень за ключовими словами.
+    Сам пошук делегується рушію (regex або Ахо-Корасік, див. keyword_engines).
     """
 
-    def __init__(self, keywords: List[str]):
+    def __init__(self, keywords: List[str], engine: str = "aho_corasick"):
         if not keywords:
-            self._keyword_regex = None
+            self._engine = None
             logger.warning("MessageFilter initialized with no keywords. All messages will be processed.")
         else:
-            # Створюємо одну велику, ефективну регулярку для всіх ключових слів.
-            # `\b` означає "межа слова", щоб "dev" не знаходило в "develop".
-            self._keyword_regex = re.compile(
-                r'\b(' + '|'.join(re.escape(k) for k in keywords) + r')\b', re.IGNORECASE
-            )
-            logger.info("MessageFilter initialized", keyword_count=len(keywords))
+            self._engine = build_keyword_engine(engine, keywords)
+            logger.info("MessageFilter initialized", keyword_count=len(keywords), engine=engine)
+
+    def find_keywords(self, content: str) -> List[KeywordMatch]:
+        """
+        Знаходить усі ключові слова у тексті за один прохід.
+
+        Returns:
+            Список збігів (слово + позиція), відсортований за позицією.
+        """
+        if not self._engine:
+            return []
+        return self._engine.find_all(content)
 
     def find_keyword(self, content: str) -> Optional[str]:
         """
@@ -33,30 +41,44 @@ class MessageFilter:
         Returns:
             Знайдене ключове слово або None, якщо нічого не знайдено.
         """
-        if not self._keyword_regex:
-            return None
+        matches = self.find_keywords(content)
+        return matches[0].keyword if matches else None
+
+    def match(self, content: str) -> Optional[List[str]]:
+        """
+        Перевірка "сирого" тексту без доменної моделі (backfill фільтрує ще до створення Message).
 
-        match = self._keyword_regex.search(content)
-        return match.group(1) if match else None
+        Returns:
+            Унікальні ключові слова в порядку появи; [] — ключових слів не задано (релевантне все);
+            None — жодного збігу.
+        """
+        if not self._engine:
+            return []
+        matches = self.find_keywords(content)
+        if not matches:
+            return None
+        return list(dict.fromkeys(m.keyword for m in matches))
 
     def is_relevant(self, message: Message) -> bool:
         """
-        Перевіряє, чи є повідомлення релевантним, і записує знайдене слово.
+        Перевіряє, чи є повідомлення релевантним, і записує знайдені слова.
 
         Returns:
             True, якщо повідомлення містить хоча б одне ключове слово.
         """
-        if not self._keyword_regex:
+        if not self._engine:
             # Якщо ключових слів не задано, вважаємо всі повідомлення релевантними.
             return True
 
-        found_keyword = self.find_keyword(message.content)
-        if found_keyword:
-            # ✅ Зберігаємо знайдене слово в доменну модель
-            message.keyword = found_keyword
+        keywords = self.match(message.content)
+        if keywords:
+            # ✅ Зберігаємо знайдені слова в доменну модель (перше — як основний тригер)
+            message.keywords = keywords
+            message.keyword = message.keywords[0]
             logger.debug(
                 "Keyword found in message",
-                keyword=found_keyword,
+                keyword=message.keyword,
+                hits=len(keywords),
                 msg_id=message.message_id
             )
             return True
@@ -1,11 +1,12 @@
 # src/application/services/message_recorder.py
 import asyncio
-from typing import List
+from typing import List, Optional
 import structlog
 
 from config import settings
+from database.opportunity_writer import OpportunityWriter
 from database.storage import DatabaseStorage
-from domain.models import MessageOpportunity, ValidationStatus
+from domain.models import AICallRecord, MessageOpportunity, ValidationStatus
 from domain.ports import OpportunitySink
 
 logger = structlog.get_logger(__name__)
@@ -16,9 +17,24 @@ class MessageRecorder:
     Відповідає за фіналізацію обробки: збереження в БД та відправку в зовнішні системи.
     """
 
-    def __init__(self, db_storage: DatabaseStorage, sinks: List[OpportunitySink]):
+    def __init__(self, db_storage: DatabaseStorage, sinks: List[OpportunitySink],
+                 writer: Optional[OpportunityWriter] = None):
         self._db = db_storage
         self._sinks = sinks
+        # Якщо є — live-записи йдуть через єдиного записувача з груповими комітами
+        self._writer = writer
+
+    def stats(self) -> dict:
+        return self._writer.stats() if self._writer else {}
+
+    async def close(self):
+        """Дописує можливості, що ще чекають групового коміту."""
+        if self._writer:
+            await self._writer.stop()
+
+    async def record_unlinked_ai_calls(self, calls: List[AICallRecord]):
+        """Облік викликів AI без можливості (невдалий пакет Stage 1)."""
+        await self._db.save_unlinked_ai_calls(calls)
 
     async def record(self, opportunity: MessageOpportunity, source_mode: str):
         """
@@ -35,12 +51,14 @@ class MessageRecorder:
         )
         log.debug("Recording opportunity...")
 
-        # --- ОНОВЛЕНИЙ ВИКЛИК ---
-        # Тепер передаємо лише 'opportunity' та 'source_mode'
-        saved_record = await self._db.save_opportunity(
-            opportunity=opportunity,
-            source_mode=source_mode,
-        )
+        if self._writer:
+            # Повертається лише після коміту, тож sinks нижче бачать уже збережений запис
+            saved_record = await self._writer.submit(opportunity, source_mode)
+        else:
+            saved_record = await self._db.save_opportunity(
+                opportunity=opportunity,
+                source_mode=source_mode,
+            )
 
         if not saved_record:
             log.warning("Record already exists in DB, skipping further processing.")
@@ -82,13 +100,13 @@ class MessageRecorder:
         log.info("Starting batch recording.")
 
         # Крок 1: Пакетне збереження в базу даних
-        saved_count = await self._db.save_opportunities_batch(opportunities, 0, "Backfill-Client", source_mode)
-        log.info("Batch save to database complete.", new_records=saved_count)
-        # Крок 2: Відфільтровуємо, що писати в sinks
-        sinks_opportunities = opportunities
+        save_result = await self._db.save_opportunities_batch(opportunities, 0, "Backfill-Client", source_mode)
+        log.info("Batch save to database complete.", new_records=save_result.saved, skipped=save_result.skipped)
+        # Крок 2: Відфільтровуємо, що писати в sinks (як і в live — лише нові записи)
+        sinks_opportunities = [opp for opp in opportunities if opp.message.message_id in save_result.saved_ids]
         if settings.google_sheet.write_mode == 'qualified':
             sinks_opportunities = [
-                opp for opp in opportunities
+                opp for opp in sinks_opportunities
                 if opp.stage_two_validation and opp.stage_two_validation.status in {ValidationStatus.RELEVANT, ValidationStatus.POSSIBLY_RELEVANT}
             ]
             log.info("Filtered for sinks.", qualified_count=len(sinks_opportunities))
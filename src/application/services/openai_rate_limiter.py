@@ -0,0 +1,214 @@
+# src/application/services/openai_rate_limiter.py
+import asyncio
+import re
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Mapping, Optional
+
+import httpx
+import structlog
+from openai import APITimeoutError, RateLimitError
+
+from config.settings import OpenAISettings
+
+logger = structlog.get_logger(__name__)
+
+# OpenAI повертає тривалості у вигляді "1s", "6m0s", "20ms", "1h2m3.5s"
+_DURATION_RE = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+def parse_reset_duration(value: Optional[str]) -> Optional[float]:
+    """Перетворює значення x-ratelimit-reset-* у секунди."""
+    if not value:
+        return None
+    parts = _DURATION_RE.findall(value)
+    if not parts:
+        try:
+            return float(value)
+        except ValueError:
+            return None
+    return sum(float(num) * _DURATION_UNITS[unit] for num, unit in parts)
+
+
+def _to_int(value: Optional[str]) -> Optional[int]:
+    try:
+        return int(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+class AdaptiveRateLimiter:
+    """
+    Спільний для обох етапів обмежувач запитів до OpenAI.
+
+    - Паралельність регулюється за AIMD: після кожної успішної відповіді ліміт
+      росте адитивно (≈ +1 за "вікно"), а на 429, таймаут чи стрибок затримки
+      (у т.ч. невдалого виклику) зменшується мультиплікативно.
+    - Залишки RPM/TPM беруться з заголовків x-ratelimit-*; якщо бюджет вичерпано,
+      виклики чекають до скидання вікна замість того, щоб падати.
+    """
+
+    def __init__(
+        self,
+        initial_concurrency: int,
+        max_concurrency: int,
+        min_concurrency: int = 1,
+        latency_spike_seconds: float = 20.0,
+        decrease_factor: float = 0.5,
+    ):
+        self._limit = float(max(min_concurrency, initial_concurrency))
+        self._min = min_concurrency
+        self._max = max(max_concurrency, initial_concurrency)
+        self._latency_spike = latency_spike_seconds
+        self._decrease_factor = decrease_factor
+        self._in_flight = 0
+        self._cond = asyncio.Condition()
+
+        # Бюджет із заголовків (None — ще не знаємо)
+        self._remaining_requests: Optional[int] = None
+        self._remaining_tokens: Optional[int] = None
+        self._requests_reset_at = 0.0
+        self._tokens_reset_at = 0.0
+        self._blocked_until = 0.0
+        self._last_decrease_at = 0.0
+
+        # --- Метрики ---
+        self.rate_limited = 0
+        self.waited_seconds = 0.0
+
+    @classmethod
+    def from_settings(cls, config: OpenAISettings) -> "AdaptiveRateLimiter":
+        return cls(
+            initial_concurrency=config.concurrency,
+            max_concurrency=config.max_concurrency,
+            latency_spike_seconds=config.latency_spike_seconds,
+        )
+
+    @property
+    def concurrency_limit(self) -> int:
+        return int(self._limit)
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def estimate_tokens(self, *texts: str, completion_tokens: int = 256) -> int:
+        """Груба оцінка: ~4 символи на токен + запас на відповідь."""
+        return sum(len(t) for t in texts) // 4 + completion_tokens
+
+    @asynccontextmanager
+    async def slot(self, estimated_tokens: int = 0) -> AsyncIterator[None]:
+        await self._acquire(estimated_tokens)
+        started = time.monotonic()
+        error: Optional[BaseException] = None
+        try:
+            yield
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            latency = time.monotonic() - started
+            async with self._cond:
+                self._in_flight -= 1
+                if error is None:
+                    self._on_success(latency)
+                else:
+                    self._on_failure(error, latency)
+                self._cond.notify_all()
+
+    async def _acquire(self, estimated_tokens: int) -> None:
+        wait_started = time.monotonic()
+        async with self._cond:
+            while True:
+                delay = self._budget_delay(estimated_tokens)
+                if delay <= 0 and self._in_flight < int(self._limit):
+                    break
+                try:
+                    if delay > 0:
+                        await asyncio.wait_for(self._cond.wait(), timeout=delay)
+                    else:
+                        await self._cond.wait()
+                except asyncio.TimeoutError:
+                    pass
+
+            self._in_flight += 1
+            # Резервуємо бюджет, щоб паралельні виклики не перевищили його разом
+            if self._remaining_requests is not None:
+                self._remaining_requests -= 1
+            if self._remaining_tokens is not None:
+                self._remaining_tokens -= estimated_tokens
+
+        self.waited_seconds += time.monotonic() - wait_started
+
+    def _budget_delay(self, estimated_tokens: int) -> float:
+        now = time.monotonic()
+        delay = self._blocked_until - now
+        if self._remaining_requests is not None and self._remaining_requests <= 0:
+            delay = max(delay, self._requests_reset_at - now)
+        if self._remaining_tokens is not None and self._remaining_tokens < estimated_tokens:
+            delay = max(delay, self._tokens_reset_at - now)
+        return delay
+
+    def _on_success(self, latency: float) -> None:
+        if latency > self._latency_spike:
+            self._decrease(reason="latency_spike", latency_s=round(latency, 2))
+            return
+        # Адитивне зростання: +1 до ліміту приблизно за кожне "вікно" з limit відповідей
+        self._limit = min(self._max, self._limit + 1.0 / self._limit)
+
+    def _on_failure(self, error: BaseException, latency: float) -> None:
+        # 429 уже враховано в observe_response; скасування — не сигнал про перевантаження
+        if isinstance(error, (RateLimitError, asyncio.CancelledError)):
+            return
+        if isinstance(error, (APITimeoutError, asyncio.TimeoutError, httpx.TimeoutException)):
+            self._decrease(reason="timeout", latency_s=round(latency, 2))
+        elif latency > self._latency_spike:
+            self._decrease(reason="latency_spike", latency_s=round(latency, 2), error=type(error).__name__)
+
+    def _decrease(self, **log_kw) -> None:
+        now = time.monotonic()
+        # Одна серія 429 — одне зменшення, а не падіння до мінімуму
+        if now - self._last_decrease_at < 1.0:
+            return
+        self._last_decrease_at = now
+        old = self._limit
+        self._limit = max(float(self._min), self._limit * self._decrease_factor)
+        logger.warning("OpenAI concurrency decreased", old_limit=int(old), new_limit=int(self._limit), **log_kw)
+
+    def on_rate_limited(self, retry_after: Optional[float]) -> None:
+        """Викликається на 429: зменшує паралельність і ставить паузу для всіх."""
+        self.rate_limited += 1
+        pause = retry_after if retry_after is not None else 1.0
+        self._blocked_until = max(self._blocked_until, time.monotonic() + pause)
+        self._decrease(reason="rate_limited", retry_after_s=pause)
+
+    def update_from_headers(self, headers: Mapping[str, str]) -> None:
+        now = time.monotonic()
+        remaining_requests = _to_int(headers.get("x-ratelimit-remaining-requests"))
+        remaining_tokens = _to_int(headers.get("x-ratelimit-remaining-tokens"))
+        if remaining_requests is not None:
+            self._remaining_requests = remaining_requests
+            self._requests_reset_at = now + (parse_reset_duration(headers.get("x-ratelimit-reset-requests")) or 1.0)
+        if remaining_tokens is not None:
+            self._remaining_tokens = remaining_tokens
+            self._tokens_reset_at = now + (parse_reset_duration(headers.get("x-ratelimit-reset-tokens")) or 1.0)
+
+    async def observe_response(self, response: httpx.Response) -> None:
+        """httpx event hook: читає заголовки кожної відповіді OpenAI."""
+        self.update_from_headers(response.headers)
+        if response.status_code == 429:
+            retry_after = parse_reset_duration(response.headers.get("retry-after"))
+            async with self._cond:
+                self.on_rate_limited(retry_after)
+                self._cond.notify_all()
+
+    def stats(self) -> dict:
+        return {
+            "concurrency_limit": self.concurrency_limit,
+            "in_flight": self._in_flight,
+            "remaining_requests": self._remaining_requests,
+            "remaining_tokens": self._remaining_tokens,
+            "rate_limited": self.rate_limited,
+            "waited_s": round(self.waited_seconds, 1),
+        }
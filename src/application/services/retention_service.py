@@ -0,0 +1,145 @@
+# src/application/services/retention_service.py
+import asyncio
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List
+
+import structlog
+from tortoise import Tortoise
+from tortoise.transactions import in_transaction
+
+from config.settings import RetentionRule, RetentionSettings
+from database.archive import ArchiveStore
+from database.dialect import qmark
+from database.models import ArchivedMessage, Opportunity
+
+logger = structlog.get_logger(__name__)
+
+
+class RetentionService:
+    """
+    Переносить холодні можливості (за правилами віку та статусу) в помісячні архівні файли,
+    лишаючи в основній БД лише snowflake для дедуплікації, і стискає БД через VACUUM.
+
+    Порядок для кожної пачки: запис в архів (коміт на диск) → в одній транзакції
+    archived_messages + DELETE з opportunities. Збій посередині дає в гіршому разі
+    дублікат в архіві (INSERT OR IGNORE), але не втрату даних.
+    """
+
+    def __init__(self, config: RetentionSettings, dry_run: bool = False):
+        self._config = config
+        self._dry_run = dry_run
+        self._archive = ArchiveStore(config.archive_dir)
+
+    def _where(self, rule: RetentionRule) -> tuple:
+        conn = Opportunity._meta.db
+        field = Opportunity._meta.fields_map["message_timestamp"]
+        cutoff = datetime.now(timezone.utc) - timedelta(days=rule.older_than_days)
+        clauses = ["o.message_timestamp < ?"]
+        params: list = [conn.executor_class._field_to_db(field, cutoff, Opportunity)]
+        if rule.statuses:
+            clauses.append(
+                f"COALESCE(o.ai_stage_two_status, o.ai_stage_one_status) IN ({', '.join('?' for _ in rule.statuses)})"
+            )
+            params.extend(rule.statuses)
+        if self._config.keep_reviewed:
+            clauses.append("(o.manual_status IS NULL OR LOWER(o.manual_status) = 'n/a')")
+        return " AND ".join(clauses), params
+
+    async def _candidates(self, rule: RetentionRule, after_id: int) -> List[Dict]:
+        where, params = self._where(rule)
+        conn = Tortoise.get_connection("default")
+        return await conn.execute_query_dict(qmark(conn, f"""
+            SELECT o.*,
+                   srv.name  AS server_name,
+                   chn.name  AS channel_name,
+                   auth.name AS author_name,
+                   acc.name  AS bot_name
+            FROM opportunities AS o
+            LEFT JOIN server         AS srv  ON o.server_id = srv.id
+            LEFT JOIN channel        AS chn  ON o.channel_id = chn.id
+            LEFT JOIN author         AS auth ON o.author_id = auth.id
+            LEFT JOIN discordaccount AS acc  ON o.discovered_by_id = acc.id
+            WHERE {where} AND o.id > ?
+            ORDER BY o.id
+            LIMIT ?
+        """), [*params, after_id, self._config.batch_size])
+
+    @staticmethod
+    def _month(value) -> str:
+        return value[:7] if isinstance(value, str) else value.strftime("%Y-%m")
+
+    async def _archive_batch(self, rows: List[Dict]) -> Dict[str, int]:
+        conn = Tortoise.get_connection("default")
+        ids = [row["id"] for row in rows]
+        message_ids = {row["id"]: row["message_id"] for row in rows}
+        calls = await conn.execute_query_dict(
+            qmark(conn, f"SELECT * FROM ai_calls WHERE opportunity_id IN ({', '.join('?' for _ in ids)})"), ids
+        )
+        for call in calls:
+            call["message_id"] = message_ids[call["opportunity_id"]]
+
+        by_month: Dict[str, List[Dict]] = defaultdict(list)
+        for row in rows:
+            by_month[self._month(row["message_timestamp"])].append(row)
+        calls_by_month: Dict[str, List[Dict]] = defaultdict(list)
+        months_by_id = {row["id"]: month for month, month_rows in by_month.items() for row in month_rows}
+        for call in calls:
+            calls_by_month[months_by_id[call["opportunity_id"]]].append(call)
+
+        # 1) Архів — на диск до того, як щось видаляємо
+        for month, month_rows in by_month.items():
+            await asyncio.to_thread(self._archive.write, month, month_rows, calls_by_month[month])
+
+        # 2) Слід для дедуплікації + видалення; ai_calls лишаються (opportunity_id → NULL), тож підсумки витрат не змінюються
+        async with in_transaction():
+            await ArchivedMessage.bulk_create(
+                [
+                    ArchivedMessage(message_id=row["message_id"], archive_month=month)
+                    for month, month_rows in by_month.items()
+                    for row in month_rows
+                    if row["message_id"] is not None
+                ],
+                ignore_conflicts=True,
+            )
+            await Opportunity.filter(id__in=ids).delete()
+
+        return {month: len(month_rows) for month, month_rows in by_month.items()}
+
+    async def _vacuum(self) -> None:
+        conn = Tortoise.get_connection("default")
+        if conn.capabilities.dialect != "sqlite":
+            return
+        logger.info("Vacuuming main database...")
+        await conn.execute_script("VACUUM")
+        await conn.execute_script("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    async def run(self) -> Dict:
+        log = logger.bind(dry_run=self._dry_run, archive_dir=str(self._config.archive_dir))
+        log.info("Retention run started.", rules=len(self._config.rules))
+
+        per_month: Dict[str, int] = defaultdict(int)
+        for rule in self._config.rules:
+            rule_log = log.bind(older_than_days=rule.older_than_days, statuses=rule.statuses)
+            matched, after_id = 0, 0
+            while True:
+                rows = await self._candidates(rule, after_id)
+                if not rows:
+                    break
+                after_id = rows[-1]["id"]
+                matched += len(rows)
+                if self._dry_run:
+                    for row in rows:
+                        per_month[self._month(row["message_timestamp"])] += 1
+                    continue
+                for month, count in (await self._archive_batch(rows)).items():
+                    per_month[month] += count
+                rule_log.debug("Batch archived.", rows=len(rows), total=matched)
+            rule_log.info("Retention rule applied.", matched=matched)
+
+        total = sum(per_month.values())
+        if total and self._config.vacuum and not self._dry_run:
+            await self._vacuum()
+
+        log.info("Retention run finished.", archived=total, months=len(per_month))
+        return {"archived": total, "by_month": dict(sorted(per_month.items()))}
@@ -0,0 +1,145 @@
+# src/application/services/speculative_stage_two.py
+from collections import defaultdict
+from typing import Dict, List
+
+import structlog
+from tortoise.functions import Count
+
+from application.services.stage_zero_classifier import STAGE_ZERO_REASON
+from config.settings import SpeculativeSettings
+from database.models import Opportunity
+from domain.models import Message, ValidationStatus
+
+logger = structlog.get_logger(__name__)
+
+
+class _Latency:
+    """Лічильник затримки: кількість, сума та максимум (секунди)."""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds: float) -> None:
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def as_dict(self, prefix: str) -> dict:
+        avg = self.total / self.count if self.count else 0.0
+        return {
+            f"{prefix}_count": self.count,
+            f"{prefix}_avg_ms": round(avg * 1000, 1),
+            f"{prefix}_max_ms": round(self.max * 1000, 1),
+        }
+
+
+class SpeculationPolicy:
+    """
+    Вирішує, для яких live-повідомлень запускати Stage 2 одночасно зі Stage 1,
+    і рахує, скільки це заощаджує часу та скільки викликів іде в нікуди.
+
+    Предикат: серед знайдених ключових слів є "сильне" (strong_keywords), або
+    канал має високий історичний yield Stage 1 (частка повідомлень, які Stage 1
+    не відкинув). Yield прогрівається з БД і далі оновлюється на льоту.
+    """
+
+    def __init__(self, config: SpeculativeSettings):
+        self._config = config
+        self._strong = {k.lower() for k in config.strong_keywords}
+        self._channel_total: Dict[int, int] = defaultdict(int)
+        self._channel_passed: Dict[int, int] = defaultdict(int)
+        self._warmed_up = False
+
+        # --- Метрики ---
+        self.launched = 0
+        self.useful = 0
+        self.wasted = 0
+        self._saved_seconds = 0.0
+        self._latency_speculative = _Latency()
+        self._latency_sequential = _Latency()
+
+    @property
+    def enabled(self) -> bool:
+        return self._config.enabled
+
+    def apply_config(self, config: SpeculativeSettings) -> None:
+        """Hot-reload: нові поріг/сильні слова; накопичена статистика каналів лишається."""
+        self._config = config
+        self._strong = {k.lower() for k in config.strong_keywords}
+
+    # --- Yield каналів ---
+
+    async def warm_up(self) -> None:
+        """Один раз підтягує статистику Stage 1 по каналах з БД."""
+        if self._warmed_up or not self.enabled:
+            return
+        self._warmed_up = True
+        try:
+            base = Opportunity.exclude(ai_stage_one_status=ValidationStatus.ERROR).exclude(
+                ai_stage_one_reason=STAGE_ZERO_REASON
+            )
+            totals = await base.annotate(n=Count("id")).group_by("channel_id").values("channel_id", "n")
+            passed = await base.exclude(ai_stage_one_status=ValidationStatus.UNRELEVANT) \
+                .annotate(n=Count("id")).group_by("channel_id").values("channel_id", "n")
+        except Exception:
+            logger.exception("Could not warm up channel yield stats, starting from scratch.")
+            return
+        for row in totals:
+            self._channel_total[row["channel_id"]] += row["n"]
+        for row in passed:
+            self._channel_passed[row["channel_id"]] += row["n"]
+        logger.info("Speculative Stage 2 channel stats loaded", channels=len(self._channel_total))
+
+    def channel_yield(self, channel_id: int) -> float:
+        total = self._channel_total.get(channel_id, 0)
+        return self._channel_passed.get(channel_id, 0) / total if total else 0.0
+
+    def record_stage_one(self, channel_id: int, status: ValidationStatus) -> None:
+        if status == ValidationStatus.ERROR:
+            return
+        self._channel_total[channel_id] += 1
+        if status != ValidationStatus.UNRELEVANT:
+            self._channel_passed[channel_id] += 1
+
+    # --- Предикат ---
+
+    def should_speculate(self, message: Message) -> bool:
+        if not self.enabled:
+            return False
+        keywords: List[str] = message.keywords or ([message.keyword] if message.keyword else [])
+        if self._strong and any(k.lower() in self._strong for k in keywords):
+            return True
+        return (
+            self._channel_total.get(message.channel_id, 0) >= self._config.min_channel_samples
+            and self.channel_yield(message.channel_id) >= self._config.min_channel_yield
+        )
+
+    # --- Метрики ---
+
+    def record_outcome(self, speculative: bool, used: bool, total_s: float,
+                       stage_one_s: float = 0.0, stage_two_s: float = 0.0) -> None:
+        """
+        Фіксує результат одного повідомлення, що дійшло до Stage 1.
+        Для корисної спекуляції економія = (Stage 1 + Stage 2 послідовно) - фактичний час.
+        """
+        if not speculative:
+            self._latency_sequential.add(total_s)
+            return
+        self._latency_speculative.add(total_s)
+        if used:
+            self.useful += 1
+            self._saved_seconds += max(0.0, stage_one_s + stage_two_s - total_s)
+        else:
+            self.wasted += 1
+
+    def stats(self) -> dict:
+        return {
+            "speculative_launched": self.launched,
+            "speculative_useful": self.useful,
+            "speculative_wasted": self.wasted,
+            "speculative_saved_ms_total": round(self._saved_seconds * 1000, 1),
+            **self._latency_speculative.as_dict("latency_speculative"),
+            **self._latency_sequential.as_dict("latency_sequential"),
+        }
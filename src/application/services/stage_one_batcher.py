@@ -0,0 +1,100 @@
+# src/application/services/stage_one_batcher.py
+import asyncio
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+import structlog
+
+from domain.models import Message, ValidationResult
+
+logger = structlog.get_logger(__name__)
+
+BatchValidator = Callable[[List[Message]], Awaitable[Dict[int, ValidationResult]]]
+SingleValidator = Callable[[Message], Awaitable[ValidationResult]]
+
+
+class StageOneBatcher:
+    """
+    Збирає запити Stage 1 у мікро-пакети: до `max_size` повідомлень або
+    `max_wait_ms` очікування — що настане раніше. Пакет відправляється одним
+    запитом до LLM, а вердикти повертаються кожному, хто чекає.
+    Якщо пакет не вдалося розібрати (або в ньому бракує вердикту для якогось
+    повідомлення), такі повідомлення перевіряються поодинці.
+    """
+
+    def __init__(
+        self,
+        batch_validator: BatchValidator,
+        single_validator: SingleValidator,
+        max_size: int,
+        max_wait_ms: int,
+    ):
+        self._batch_validator = batch_validator
+        self._single_validator = single_validator
+        self._max_size = max_size
+        self._max_wait = max_wait_ms / 1000
+        self._pending: List[Tuple[Message, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: set[asyncio.Task] = set()
+
+        # --- Метрики ---
+        self.batches_sent = 0
+        self.messages_batched = 0
+        self.fallbacks = 0
+
+    async def submit(self, msg: Message) -> ValidationResult:
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((msg, future))
+
+        if len(self._pending) >= self._max_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self._max_wait, self._flush)
+
+        return await future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+
+        batch, self._pending = self._pending, []
+        task = asyncio.create_task(self._run_batch(batch))
+        # Тримаємо посилання, щоб задачу не зібрав GC до завершення
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run_batch(self, batch: List[Tuple[Message, asyncio.Future]]) -> None:
+        messages = [msg for msg, _ in batch]
+        log = logger.bind(batch_size=len(batch))
+
+        results: Dict[int, ValidationResult] = {}
+        if len(batch) > 1:
+            try:
+                results = await self._batch_validator(messages)
+                self.batches_sent += 1
+                self.messages_batched += len(results)
+            except Exception:
+                log.warning("Stage 1 batch failed, falling back to per-message calls.", exc_info=True)
+
+        missing = [(msg, fut) for msg, fut in batch if msg.message_id not in results]
+        if missing and results:
+            log.warning("Stage 1 batch is missing verdicts, re-checking them one by one.", missing=len(missing))
+        self.fallbacks += len(missing) if len(batch) > 1 else 0
+
+        for msg, fut in batch:
+            if msg.message_id in results and not fut.done():
+                fut.set_result(results[msg.message_id])
+
+        if missing:
+            singles = await asyncio.gather(
+                *(self._single_validator(msg) for msg, _ in missing), return_exceptions=True
+            )
+            for (msg, fut), result in zip(missing, singles):
+                if fut.done():
+                    continue
+                if isinstance(result, BaseException):
+                    fut.set_exception(result)
+                else:
+                    fut.set_result(result)
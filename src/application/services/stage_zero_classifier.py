@@ -0,0 +1,202 @@
+# src/application/services/stage_zero_classifier.py
+import json
+import re
+import zlib
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import List, Optional, Sequence
+
+import numpy as np
+import structlog
+
+from config.settings import StageZeroSettings
+
+logger = structlog.get_logger(__name__)
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+# Причина, з якою зберігаються відсічені stage zero записи (щоб не вчитись на власних рішеннях)
+STAGE_ZERO_REASON = "Rejected by local stage zero classifier"
+
+
+def _hash_token(token: str, n_features: int) -> int:
+    # crc32 стабільний між процесами, на відміну від вбудованого hash()
+    return zlib.crc32(token.encode("utf-8")) % n_features
+
+
+class StageZeroClassifier:
+    """
+    Локальна "нульова" стадія: логістична регресія на хешованих n-грамах (NumPy).
+    Навчається на ручній сортировці та вердиктах AI і відсікає очевидне сміття
+    ще до платного Stage 1.
+
+    Поріг підбирається так, щоб на валідаційній вибірці зберігалась щонайменше
+    `recall_floor` частка справжніх лідів (тобто пропускати лідів майже не можна).
+    """
+
+    def __init__(
+        self,
+        weights: np.ndarray,
+        bias: float,
+        val_positive_probs: np.ndarray,
+        recall_floor: float,
+        meta: Optional[dict] = None,
+    ):
+        self._weights = weights
+        self._bias = bias
+        self._n_features = weights.shape[0]
+        self._val_positive_probs = val_positive_probs
+        self.meta = meta or {}
+        self.threshold = self.threshold_for_recall(val_positive_probs, recall_floor)
+
+        # --- Метрики ---
+        self.skipped = 0
+        self.passed = 0
+
+    # --- Ознаки ---
+
+    @staticmethod
+    def featurize(text: str, n_features: int) -> np.ndarray:
+        """Уніграми + біграми слів, захешовані в n_features бінарних ознак."""
+        tokens = _TOKEN_RE.findall(text.lower())
+        grams = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+        if not grams:
+            return np.empty(0, dtype=np.int64)
+        return np.unique(np.fromiter((_hash_token(g, n_features) for g in grams), dtype=np.int64, count=len(grams)))
+
+    @staticmethod
+    def _sigmoid(z: float) -> float:
+        return float(1.0 / (1.0 + np.exp(-np.clip(z, -30, 30))))
+
+    def _score(self, indices: np.ndarray) -> float:
+        if indices.size == 0:
+            return self._bias
+        # Нормалізація на довжину, щоб довгі пости не домінували
+        return float(self._weights[indices].sum() / np.sqrt(indices.size) + self._bias)
+
+    def predict_proba(self, text: str) -> float:
+        """Ймовірність того, що повідомлення варто віддати в LLM."""
+        return self._sigmoid(self._score(self.featurize(text, self._n_features)))
+
+    def is_junk(self, text: str) -> bool:
+        junk = self.predict_proba(text) < self.threshold
+        if junk:
+            self.skipped += 1
+        else:
+            self.passed += 1
+        return junk
+
+    # --- Поріг ---
+
+    @staticmethod
+    def threshold_for_recall(positive_probs: np.ndarray, recall_floor: float) -> float:
+        if positive_probs.size == 0:
+            return 0.0
+        # Найвищий поріг, за якого частка позитивів з p >= поріг не менша за recall_floor.
+        # Рахуємо кількість збережених позитивів напряму: quantile(1 - recall_floor) через похибку
+        # float (1 - 0.8 = 0.19999...) інколи брав на одне значення нижче, ніж потрібно.
+        n = positive_probs.size
+        keep = min(max(int(np.ceil(recall_floor * n - 1e-9)), 1), n)
+        return float(np.sort(positive_probs)[n - keep])
+
+    # --- Навчання ---
+
+    @classmethod
+    def train(
+        cls,
+        texts: Sequence[str],
+        labels: Sequence[int],
+        config: StageZeroSettings,
+        validation_share: float = 0.2,
+        seed: int = 42,
+    ) -> "StageZeroClassifier":
+        n_features = config.n_features
+        features: List[np.ndarray] = [cls.featurize(t, n_features) for t in texts]
+        y = np.asarray(labels, dtype=np.float32)
+
+        rng = np.random.default_rng(seed)
+        order = rng.permutation(len(features))
+        n_val = max(1, int(len(order) * validation_share))
+        val_idx, train_idx = order[:n_val], order[n_val:]
+
+        # Балансуємо класи: сміття зазвичай у рази більше, ніж лідів
+        pos_share = float(y[train_idx].mean()) if train_idx.size else 0.5
+        pos_share = min(max(pos_share, 1e-3), 1 - 1e-3)
+        class_weight = {1.0: 0.5 / pos_share, 0.0: 0.5 / (1 - pos_share)}
+
+        weights = np.zeros(n_features, dtype=np.float32)
+        bias = 0.0
+        lr, l2 = config.learning_rate, config.l2
+        for epoch in range(config.epochs):
+            rng.shuffle(train_idx)
+            for i in train_idx:
+                idx = features[i]
+                scale = 1.0 / np.sqrt(idx.size) if idx.size else 0.0
+                z = weights[idx].sum() * scale + bias
+                p = 1.0 / (1.0 + np.exp(-np.clip(z, -30, 30)))
+                grad = (p - y[i]) * class_weight[float(y[i])]
+                if idx.size:
+                    weights[idx] -= lr * (grad * scale + l2 * weights[idx])
+                bias -= lr * grad
+            logger.debug("Stage zero epoch finished", epoch=epoch + 1)
+
+        model = cls(weights, bias, np.empty(0), config.recall_floor)
+        val_probs = np.array([model._sigmoid(model._score(features[i])) for i in val_idx])
+        val_y = y[val_idx]
+        model._val_positive_probs = val_probs[val_y == 1]
+        model.threshold = cls.threshold_for_recall(model._val_positive_probs, config.recall_floor)
+
+        negatives = val_probs[val_y == 0]
+        model.meta = {
+            "trained_at": datetime.now(timezone.utc).isoformat(),
+            "samples": len(features),
+            "positives": int(y.sum()),
+            "validation_samples": int(n_val),
+            "validation_recall": float((model._val_positive_probs >= model.threshold).mean()) if model._val_positive_probs.size else None,
+            "validation_junk_skip_rate": float((negatives < model.threshold).mean()) if negatives.size else None,
+        }
+        return model
+
+    # --- Збереження ---
+
+    def save(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "wb") as f:
+            np.savez_compressed(
+                f,
+                weights=self._weights,
+                bias=np.float32(self._bias),
+                val_positive_probs=self._val_positive_probs,
+                meta=np.array(json.dumps(self.meta)),
+            )
+
+    @classmethod
+    def load(cls, path: Path, recall_floor: float) -> "StageZeroClassifier":
+        with np.load(path, allow_pickle=False) as data:
+            return cls(
+                weights=data["weights"],
+                bias=float(data["bias"]),
+                val_positive_probs=data["val_positive_probs"],
+                recall_floor=recall_floor,
+                meta=json.loads(str(data["meta"])),
+            )
+
+    @classmethod
+    def load_from_settings(cls, config: StageZeroSettings) -> Optional["StageZeroClassifier"]:
+        """Повертає модель, якщо stage zero увімкнено і файл моделі існує."""
+        if not config.enabled:
+            return None
+        if not config.model_path.is_file():
+            logger.warning("Stage zero is enabled but model file is missing. Run 'train-stage-zero'.",
+                           path=str(config.model_path))
+            return None
+        try:
+            model = cls.load(config.model_path, config.recall_floor)
+        except Exception:
+            logger.exception("Failed to load stage zero model, continuing without it.")
+            return None
+        logger.info("Stage zero classifier loaded", threshold=round(model.threshold, 4), **model.meta)
+        return model
+
+    def stats(self) -> dict:
+        return {"stage_zero_skipped": self.skipped, "stage_zero_passed": self.passed}
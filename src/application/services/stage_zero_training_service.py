@@ -0,0 +1,89 @@
+# src/application/services/stage_zero_training_service.py
+from typing import List, Optional, Tuple
+
+import structlog
+
+from application.services.stage_zero_classifier import STAGE_ZERO_REASON, StageZeroClassifier
+from config import settings
+from database.models import Opportunity
+from domain.models import ValidationStatus
+
+logger = structlog.get_logger(__name__)
+
+# Ручні статуси з дашборду (view_deck / view_list)
+MANUAL_APPROVED = "approved"
+MANUAL_REJECTED = "rejected"
+
+# Усе, що AI не відкинув остаточно, вважаємо "варто віддати в LLM"
+_POSITIVE_AI_STATUSES = {
+    ValidationStatus.RELEVANT,
+    ValidationStatus.POSSIBLY_RELEVANT,
+    ValidationStatus.POSSIBLY_UNRELEVANT,
+}
+
+
+class StageZeroTrainingService:
+    """
+    Навчає локальний stage-zero класифікатор на збережених повідомленнях.
+    Мітки: ручний статус (approved/rejected) має пріоритет над вердиктами AI.
+    """
+
+    def __init__(self):
+        self._config = settings.stage_zero
+
+    @staticmethod
+    def _status(value) -> Optional[ValidationStatus]:
+        if value is None or isinstance(value, ValidationStatus):
+            return value
+        return ValidationStatus(value)
+
+    @classmethod
+    def _label(cls, row: dict) -> Optional[int]:
+        manual = (row.get("manual_status") or "").lower()
+        if manual == MANUAL_APPROVED:
+            return 1
+        if manual == MANUAL_REJECTED:
+            return 0
+
+        s1 = cls._status(row.get("ai_stage_one_status"))
+        s2 = cls._status(row.get("ai_stage_two_status"))
+        if s1 == ValidationStatus.ERROR or s2 == ValidationStatus.ERROR:
+            return None
+        if s2 in _POSITIVE_AI_STATUSES:
+            return 1
+        if s1 == ValidationStatus.UNRELEVANT or s2 == ValidationStatus.UNRELEVANT:
+            return 0
+        return None
+
+    async def _load_dataset(self) -> Tuple[List[str], List[int]]:
+        # Записи, відсічені самим stage zero, не містять незалежної мітки
+        rows = await Opportunity.exclude(ai_stage_one_reason=STAGE_ZERO_REASON).values(
+            "message_content", "manual_status", "ai_stage_one_status", "ai_stage_two_status"
+        )
+        texts, labels = [], []
+        for row in rows:
+            label = self._label(row)
+            if label is None or not row["message_content"]:
+                continue
+            texts.append(row["message_content"])
+            labels.append(label)
+        return texts, labels
+
+    async def run(self):
+        log = logger.bind(model_path=str(self._config.model_path))
+        log.info("Loading training data for stage zero classifier...")
+
+        texts, labels = await self._load_dataset()
+        positives = sum(labels)
+        log.info("Training data loaded.", samples=len(texts), positives=positives, negatives=len(labels) - positives)
+
+        if len(texts) < self._config.min_training_samples or positives == 0 or positives == len(labels):
+            log.error(
+                "Not enough labelled data to train stage zero.",
+                min_required=self._config.min_training_samples,
+            )
+            return
+
+        model = StageZeroClassifier.train(texts, labels, self._config)
+        model.save(self._config.model_path)
+        log.info("✅ Stage zero classifier trained and saved.", threshold=round(model.threshold, 4), **model.meta)
@@ -59,9 +59,10 @@ class StatsGeneratorService:
                 if op.manual_status and op.manual_status.lower() == self.MANUAL_APPROVED_STATUS:
                     stats['manual_approved'] += 1
 
-            # --- Статистика по ключових словах ---
-            if op.keyword_trigger:
-                stats = self.keyword_stats[op.keyword_trigger]
+            # --- Статистика по ключових словах (усі слова, що спрацювали) ---
+            keywords = op.keyword_hits or ([op.keyword_trigger] if op.keyword_trigger else [])
+            for keyword in keywords:
+                stats = self.keyword_stats[keyword]
                 stats['mentions'] += 1
                 # І тут також
                 if op.ai_status in {ValidationStatus.RELEVANT, ValidationStatus.POSSIBLY_RELEVANT}:
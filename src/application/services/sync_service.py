@@ -6,6 +6,8 @@ from typing import Optional
 
 from config import settings
 from database.models import Opportunity
+from database.storage import EXISTENCE_CHUNK_SIZE, chunked
+from domain.models import message_id_from_url
 
 logger = structlog.get_logger(__name__)
 
@@ -69,11 +71,16 @@ class SyncService:
                 log.warning("No rows with both URL and Status found in the sheet.")
                 return
 
-            # --- КРОК 2: Отримати всі відповідні записи з БД одним запитом ---
-            opportunities_from_db = await Opportunity.filter(message_url__in=urls_from_sheet.keys())
-
-            # Створюємо словник для швидкого доступу до об'єктів БД
-            opportunities_map = {op.message_url: op for op in opportunities_from_db}
+            # --- КРОК 2: Отримати відповідні записи з БД (чанками по message_id) ---
+            ids_from_sheet = {
+                message_id: url for url in urls_from_sheet
+                if (message_id := message_id_from_url(url)) is not None
+            }
+            opportunities_map = {}
+            for chunk in chunked(ids_from_sheet, EXISTENCE_CHUNK_SIZE):
+                for op in await Opportunity.filter(message_id__in=chunk):
+                    # Ключ — URL з аркуша, щоб нижче порівнювати з його статусом
+                    opportunities_map[ids_from_sheet[op.message_id]] = op
 
             # --- КРОК 3: Порівняти дані в пам'яті та підготувати пакет для оновлення ---
             ops_to_update = []
@@ -0,0 +1,139 @@
+# src/application/services/verdict_cache.py
+import hashlib
+import re
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+import structlog
+
+from config.settings import VerdictCacheSettings
+from database.models import VerdictCacheEntry
+from domain.models import ValidationResult, ValidationStatus
+
+logger = structlog.get_logger(__name__)
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+class VerdictCache:
+    """
+    Персистентний кеш вердиктів Stage 1 / Stage 2 у тій самій SQLite БД.
+    Один і той самий пост, розісланий по десятках серверів, оплачується лише раз.
+
+    Ключ залежить від моделі та версії промпту, тож зміна конфігурації
+    автоматично робить старі записи недосяжними. Записи живуть `ttl_hours`,
+    а понад `max_entries` витісняються найдавніше використані (LRU).
+    """
+
+    # Як часто (у кількості put) запускати прибирання
+    EVICTION_EVERY = 200
+
+    def __init__(self, config: VerdictCacheSettings):
+        self._config = config
+        self._ttl = timedelta(hours=config.ttl_hours)
+        self._puts_since_eviction = 0
+
+        # --- Метрики ---
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self._config.enabled
+
+    @staticmethod
+    def normalize_content(content: str) -> str:
+        """Нижній регістр + схлопнуті пробіли: косметичні відмінності не ламають кеш."""
+        return _WHITESPACE_RE.sub(" ", content).strip().lower()
+
+    @staticmethod
+    def prompt_version(system_prompt: str) -> str:
+        return hashlib.sha256(system_prompt.encode("utf-8")).hexdigest()[:12]
+
+    @classmethod
+    def make_key(cls, stage: int, content: str, model: str, system_prompt: str) -> str:
+        raw = "|".join([str(stage), model, cls.prompt_version(system_prompt), cls.normalize_content(content)])
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    async def get(self, stage: int, content: str, model: str, system_prompt: str) -> Optional[ValidationResult]:
+        if not self.enabled:
+            return None
+
+        key = self.make_key(stage, content, model, system_prompt)
+        try:
+            entry = await VerdictCacheEntry.get_or_none(key=key)
+            now = datetime.now(timezone.utc)
+            if entry is None or entry.created_at < now - self._ttl:
+                self.misses += 1
+                return None
+
+            await VerdictCacheEntry.filter(key=key).update(last_used_at=now, hits=entry.hits + 1)
+            self.hits += 1
+            logger.debug("Verdict cache hit", stage=stage, key=key[:12], hits=self.hits, misses=self.misses)
+            return ValidationResult.model_validate(entry.result)
+        except Exception:
+            logger.exception("Verdict cache lookup failed, treating as miss.")
+            self.misses += 1
+            return None
+
+    async def put(self, stage: int, content: str, model: str, system_prompt: str, result: ValidationResult) -> None:
+        # Помилки не кешуємо — наступна спроба має піти в AI
+        if not self.enabled or result.status == ValidationStatus.ERROR:
+            return
+
+        key = self.make_key(stage, content, model, system_prompt)
+        now = datetime.now(timezone.utc)
+        try:
+            await VerdictCacheEntry.update_or_create(
+                key=key,
+                defaults={
+                    "stage": stage,
+                    "model": model,
+                    # Облік викликів лишається за оригінальним записом — хіт кешу нічого не коштує
+                    "result": result.model_dump(mode="json", exclude={"ai_calls"}),
+                    "created_at": now,
+                    "last_used_at": now,
+                },
+            )
+        except Exception:
+            logger.exception("Failed to store verdict in cache.")
+            return
+
+        self._puts_since_eviction += 1
+        if self._puts_since_eviction >= self.EVICTION_EVERY:
+            self._puts_since_eviction = 0
+            await self.evict()
+
+    async def evict(self) -> int:
+        """Видаляє прострочені записи та обрізає кеш до `max_entries` за LRU."""
+        try:
+            expired = await VerdictCacheEntry.filter(
+                created_at__lt=datetime.now(timezone.utc) - self._ttl
+            ).delete()
+
+            overflow = 0
+            total = await VerdictCacheEntry.all().count()
+            if total > self._config.max_entries:
+                # Межа LRU: усе, що використовувалось раніше за N-й найстаріший запис, видаляємо
+                boundary = await VerdictCacheEntry.all().order_by("last_used_at").offset(
+                    total - self._config.max_entries
+                ).first()
+                if boundary:
+                    overflow = await VerdictCacheEntry.filter(last_used_at__lt=boundary.last_used_at).delete()
+
+            self.evicted += expired + overflow
+            logger.info("Verdict cache eviction finished", expired=expired, lru_evicted=overflow, **self.stats())
+            return expired + overflow
+        except Exception:
+            logger.exception("Verdict cache eviction failed.")
+            return 0
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "cache_hits": self.hits,
+            "cache_misses": self.misses,
+            "cache_hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "cache_evicted": self.evicted,
+        }
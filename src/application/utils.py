@@ -1,26 +1,194 @@
 # src/dkh/application/utils.py
 import asyncio
+import random
+import re
+from types import SimpleNamespace
+from typing import Awaitable, Callable, Dict, Hashable, Mapping, Optional, Tuple, TypeVar
 
+import aiohttp
+import discord
 import structlog
 
+from config.settings import DiscordSettings
+
 logger = structlog.get_logger(__name__)
 
+T = TypeVar("T")
+
+# /api/v9/channels/123/messages → ("GET /channels/{channel_id}/messages", 123)
+_CHANNEL_ROUTE_RE = re.compile(r"^(?:/api/v\d+)?/channels/(\d+)(/[^?]*)?$")
+
+
+def route_bucket(method: str, path: str) -> Optional[Tuple[str, int]]:
+    """Ключ бакета (маршрут, канал) для шляху REST-запиту Discord; None — не канальний маршрут."""
+    match = _CHANNEL_ROUTE_RE.match(path)
+    if match is None:
+        return None
+    return f"{method.upper()} /channels/{{channel_id}}{match.group(2) or ''}", int(match.group(1))
+
+
+class _Bucket:
+    __slots__ = ("lock", "next_allowed", "blocked_until")
 
-class SimpleGlobalRateLimiter:
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        # Пауза між запитами цього бакета (delay_seconds з джитером)
+        self.next_allowed = 0.0
+        # Заборона до певного моменту: вичерпаний ліміт або 429
+        self.blocked_until = 0.0
+
+
+class DiscordRateLimiter:
     """
-    Простий глобальний обмежувач швидкості, як у вашому оригінальному коді.
+    Обмежувач запитів до Discord одного акаунта з бакетом на (маршрут, канал).
+
+    Різні канали гортаються паралельно — кожен чекає лише на власний бакет; 429 чи вичерпаний
+    X-RateLimit-Remaining блокує тільки свій бакет (або все — для глобального ліміту).
+    Глобальна стеля requests_per_second — лише запобіжник від сплеску.
+    Заголовки КОЖНОЇ відповіді (і успішної) приходять через trace_config(), підключений
+    до aiohttp-сесії клієнта discord.py (http_trace); 429/5xx, які бібліотека не відпрацювала
+    сама, обробляє call().
     """
 
-    def __init__(self, interval: float):
-        self._interval = interval
-        self._next_available_time = 0.0
-        self._lock = asyncio.Lock()
-
-    async def acquire(self) -> None:
-        async with self._lock:
-            now = asyncio.get_event_loop().time()
-            if now < self._next_available_time:
-                sleep_duration = self._next_available_time - now
-                logger.debug('Global rate limiter: sleeping', duration_s=round(sleep_duration, 2))
-                await asyncio.sleep(sleep_duration)
-            self._next_available_time = asyncio.get_event_loop().time() + self._interval
+    def __init__(
+        self,
+        requests_per_second: float,
+        delay_seconds: Tuple[float, float] = (0.0, 0.0),
+        max_retries: int = 5,
+        backoff_base_seconds: float = 1.0,
+        backoff_max_seconds: float = 60.0,
+    ):
+        self._global_interval = 1.0 / requests_per_second if requests_per_second > 0 else 0.0
+        self._delay_seconds = delay_seconds
+        self._max_retries = max_retries
+        self._backoff_base = backoff_base_seconds
+        self._backoff_max = backoff_max_seconds
+        self._buckets: Dict[Hashable, _Bucket] = {}
+        self._global_next = 0.0
+        self._global_blocked_until = 0.0
+        self.rate_limited_count = 0
+        self.retry_count = 0
+
+    @classmethod
+    def from_settings(cls, config: DiscordSettings) -> "DiscordRateLimiter":
+        return cls(
+            requests_per_second=config.global_requests_per_second,
+            delay_seconds=config.delay_seconds,
+            max_retries=config.max_retries,
+            backoff_base_seconds=config.backoff_base_seconds,
+            backoff_max_seconds=config.backoff_max_seconds,
+        )
+
+    @staticmethod
+    def _now() -> float:
+        return asyncio.get_running_loop().time()
+
+    def _bucket(self, key: Hashable) -> _Bucket:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = _Bucket()
+        return bucket
+
+    async def acquire(self, key: Hashable) -> None:
+        """Чекає на дозвіл для бакета key, потім — на слот глобальної стелі."""
+        bucket = self._bucket(key)
+        async with bucket.lock:
+            wait = max(bucket.next_allowed, bucket.blocked_until) - self._now()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            bucket.next_allowed = self._now() + random.uniform(*self._delay_seconds)
+
+        # Слот резервується без очікування під замком, тож бакети не серіалізуються один за одним
+        now = self._now()
+        slot = max(now, self._global_next, self._global_blocked_until)
+        self._global_next = slot + self._global_interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+    def block(self, key: Hashable, retry_after: float, is_global: bool = False) -> None:
+        until = self._now() + retry_after
+        if is_global:
+            self._global_blocked_until = max(self._global_blocked_until, until)
+        else:
+            bucket = self._bucket(key)
+            bucket.blocked_until = max(bucket.blocked_until, until)
+
+    def update_from_headers(self, key: Hashable, headers: Mapping[str, str]) -> None:
+        """X-RateLimit-Remaining = 0 → бакет чекає X-RateLimit-Reset-After секунд."""
+        remaining, reset_after = headers.get("X-RateLimit-Remaining"), headers.get("X-RateLimit-Reset-After")
+        if remaining is not None and reset_after is not None and int(float(remaining)) == 0:
+            self.block(key, float(reset_after))
+
+    async def _on_request_end(self, _session, _ctx: SimpleNamespace, params: aiohttp.TraceRequestEndParams) -> None:
+        key = route_bucket(params.method, params.url.path)
+        if key is not None:
+            self.update_from_headers(key, params.response.headers)
+
+    def trace_config(self) -> aiohttp.TraceConfig:
+        """TraceConfig для discord.Client(http_trace=...): бакети бачать заголовки всіх відповідей."""
+        trace = aiohttp.TraceConfig()
+        trace.on_request_end.append(self._on_request_end)
+        return trace
+
+    def backoff(self, attempt: int) -> float:
+        """Експоненційна затримка з повним джитером: U(0, min(max, base * 2^attempt))."""
+        return random.uniform(0, min(self._backoff_max, self._backoff_base * 2 ** attempt))
+
+    @staticmethod
+    def _retry_after(error: discord.HTTPException) -> Tuple[Optional[float], bool]:
+        headers = getattr(error.response, "headers", None) or {}
+        is_global = str(headers.get("X-RateLimit-Global", "")).lower() == "true" \
+            or headers.get("X-RateLimit-Scope") == "global"
+        payload = getattr(error, "json", None)
+        value = (payload or {}).get("retry_after") if isinstance(payload, dict) else None
+        if value is None:
+            value = headers.get("Retry-After")
+        return (float(value) if value is not None else None), is_global
+
+    async def call(self, key: Hashable, request: Callable[[], Awaitable[T]]) -> T:
+        """
+        Виконує запит бакета key з повторами (не більше max_retries): 429 — чекаємо retry_after
+        (або backoff, якщо його нема), 5xx і мережеві збої — backoff. Інші помилки — одразу нагору.
+        """
+        attempt = 0
+        while True:
+            await self.acquire(key)
+            try:
+                return await request()
+            except discord.RateLimited as e:
+                self.rate_limited_count += 1
+                error, delay = e, e.retry_after
+                self.block(key, delay)
+            except discord.HTTPException as e:
+                if e.status == 429:
+                    self.rate_limited_count += 1
+                    retry_after, is_global = self._retry_after(e)
+                    delay = retry_after if retry_after is not None else self.backoff(attempt)
+                    self.block(key, delay, is_global)
+                elif e.status >= 500:
+                    delay = self.backoff(attempt)
+                    self.block(key, delay)
+                else:
+                    raise
+                error = e
+                headers = getattr(e.response, "headers", None)
+                if headers:
+                    self.update_from_headers(key, headers)
+            except (asyncio.TimeoutError, OSError) as e:
+                error, delay = e, self.backoff(attempt)
+                self.block(key, delay)
+
+            attempt += 1
+            if attempt > self._max_retries:
+                logger.error("Discord request failed after retries", bucket=str(key), retries=self._max_retries)
+                raise error
+            self.retry_count += 1
+            logger.warning("Discord request throttled, retrying", bucket=str(key), attempt=attempt,
+                           delay_s=round(delay, 2))
+
+    def stats(self) -> dict:
+        return {
+            "discord_buckets": len(self._buckets),
+            "discord_rate_limited": self.rate_limited_count,
+            "discord_retries": self.retry_count,
+        }
@@ -1,12 +1,17 @@
 # src/dkh/bootstrap.py
+from typing import Sequence
+
 import discord
 import structlog
 
+from database.opportunity_writer import OpportunityWriter
 from database.storage import DatabaseStorage
+from application.config_reloader import ConfigReloader
+from application.ingestion_queue import IngestionQueue
 from application.message_pipeline import MessagePipeline
-from application.services.backfill_service import BackfillService
+from application.services.backfill_service import BackfillAccount, BackfillService
 from application.services.message_recorder import MessageRecorder
-from application.utils import SimpleGlobalRateLimiter
+from application.utils import DiscordRateLimiter
 from config import settings
 from infrastructure.sinks.google_sheet import GoogleSheetSink
 
@@ -28,21 +33,50 @@ def bootstrap_live_dependencies() -> (MessagePipeline, DatabaseStorage):
     except Exception:
         logger.warning("Could not create Google Sheet sink for live mode. Continuing without it.")
 
-    db_storage = DatabaseStorage()
-    recorder = MessageRecorder(db_storage=db_storage, sinks=sinks)
+    db_storage = DatabaseStorage(identity_cache_size=settings.database.identity_cache_size)
+    writer = None
+    if settings.database.writer.enabled:
+        writer = OpportunityWriter(
+            storage=db_storage,
+            batch_size=settings.database.writer.batch_size,
+            batch_wait_ms=settings.database.writer.batch_wait_ms,
+        )
+    recorder = MessageRecorder(db_storage=db_storage, sinks=sinks, writer=writer)
     pipeline = MessagePipeline(recorder=recorder)
 
     logger.info("✅ Live mode dependencies bootstrapped.")
     return pipeline, db_storage
 
 
-def bootstrap_backfill_service(client: discord.Client) -> BackfillService:
+def bootstrap_ingestion_queue(pipeline: MessagePipeline, db_storage: DatabaseStorage) -> IngestionQueue:
+    """
+    Створює обмежену чергу з пулом воркерів між Listener-ами та конвеєром.
+    """
+    return IngestionQueue(
+        handler=pipeline.process_message,
+        config=settings.ingestion,
+        extra_stats=lambda: {**pipeline.stats(), **db_storage.stats()},
+    )
+
+
+def bootstrap_config_reloader(pipeline: MessagePipeline) -> ConfigReloader:
+    """
+    Створює hot-reload конфігу (SIGHUP / зміна config.yaml) і підписує на нього конвеєр.
+    Listener-и підписуються окремо, коли їх створено.
+    """
+    reloader = ConfigReloader(config=settings.hot_reload)
+    reloader.subscribe(pipeline.apply_settings)
+    return reloader
+
+
+def bootstrap_backfill_service(clients: Sequence[discord.Client], resume: bool = False) -> BackfillService:
     """
     Створює та налаштовує сервіс для режиму 'backfill'.
+    clients — вже залогінені акаунти; кожен отримує власний обмежувач швидкості.
     """
     logger.info("Bootstrapping BACKFILL mode service...")
 
-    db_storage = DatabaseStorage()
+    db_storage = DatabaseStorage(identity_cache_size=settings.database.identity_cache_size)
     sinks = []
     try:
         # має бути
@@ -54,13 +88,21 @@ def bootstrap_backfill_service(client: discord.Client) -> BackfillService:
 
     recorder = MessageRecorder(db_storage=db_storage, sinks=sinks)
     pipeline = MessagePipeline(recorder=recorder)
-    rate_limiter = SimpleGlobalRateLimiter(interval=settings.discord.batch_pause_seconds)
+    accounts = [
+        BackfillAccount(
+            client=client,
+            name=getattr(client, "account_name", None) or str(client.user),
+            # обмежувач, уже підключений до HTTP-сесії клієнта (BackfillClient), бачить заголовки відповідей
+            rate_limiter=getattr(client, "rate_limiter", None) or DiscordRateLimiter.from_settings(settings.discord),
+        )
+        for client in clients
+    ]
 
     backfill_service = BackfillService(
-        client=client,
+        accounts=accounts,
         pipeline=pipeline,
-        rate_limiter=rate_limiter,
         db_storage=db_storage,
+        resume=resume,
     )
 
     logger.info("✅ Backfill service bootstrapped.")
@@ -1,3 +1,4 @@
+import hashlib
 import yaml
 from pathlib import Path
 from typing import List, Literal, Tuple, Dict, Any
@@ -14,14 +15,88 @@ def yaml_config_settings_source() -> Dict[str, Any]:
     with open(CONFIG_FILE, 'r', encoding='utf-8') as f:
         return yaml.safe_load(f) or {}
 
+class SQLiteSettings(BaseModel):
+    """PRAGMA-профіль SQLite: однаковий для ботів (Tortoise) і дашборду (SQLAlchemy)."""
+    # WAL: читачі (дашборд) не блокують записувача (боти) і навпаки
+    journal_mode: Literal['WAL', 'DELETE', 'TRUNCATE'] = 'WAL'
+    # NORMAL у WAL-режимі не робить fsync на кожен коміт, але БД лишається цілісною
+    synchronous: Literal['OFF', 'NORMAL', 'FULL'] = 'NORMAL'
+    # Скільки чекати чужий lock замість негайного "database is locked"
+    busy_timeout_ms: int = 5000
+    cache_size_mb: int = 64
+    mmap_size_mb: int = 256
+    temp_store: Literal['DEFAULT', 'FILE', 'MEMORY'] = 'MEMORY'
+    # Дашборд читає БД через read-only з'єднання (mode=ro + query_only)
+    dashboard_read_only: bool = True
+
+    def pragmas(self) -> Dict[str, Any]:
+        """PRAGMA для з'єднання, що пише (порядок важливий: busy_timeout — першим)."""
+        return {
+            "busy_timeout": self.busy_timeout_ms,
+            "journal_mode": self.journal_mode,
+            "synchronous": self.synchronous,
+            # від'ємне значення — розмір у KiB, а не в сторінках
+            "cache_size": -self.cache_size_mb * 1024,
+            "mmap_size": self.mmap_size_mb * 1024 * 1024,
+            "temp_store": self.temp_store,
+            "foreign_keys": "ON",
+        }
+
+    def read_only_pragmas(self) -> Dict[str, Any]:
+        """PRAGMA для read-only з'єднання: режим журналу й synchronous задає записувач."""
+        pragmas = {k: v for k, v in self.pragmas().items() if k not in ("journal_mode", "synchronous")}
+        pragmas["query_only"] = "ON"
+        return pragmas
+
+class PostgresSettings(BaseModel):
+    """Пули з'єднань для PostgreSQL (кілька хостів з ботами + дашборд на одній БД)."""
+    # asyncpg-пул кожного процесу ботів
+    min_pool_size: int = 1
+    max_pool_size: int = 10
+    # QueuePool SQLAlchemy у дашборді
+    dashboard_pool_size: int = 5
+    dashboard_max_overflow: int = 5
+    # Запит, що висить довше, обриває сервер (0 — без обмеження)
+    statement_timeout_ms: int = 30_000
+
+class WriterSettings(BaseModel):
+    # Єдиний записувач у live-режимі: груповий коміт кожні batch_size рядків або batch_wait_ms
+    enabled: bool = True
+    batch_size: int = 100
+    batch_wait_ms: int = 50
+
+class RetentionRule(BaseModel):
+    older_than_days: int
+    # Фінальний статус AI (Stage 2, а якщо його нема — Stage 1); порожній список — будь-який
+    statuses: List[str] = []
+
+class RetentionSettings(BaseModel):
+    # Холодні рядки переносяться в помісячні SQLite-файли: <archive_dir>/opportunities-YYYY-MM.sqlite3
+    archive_dir: Path = BASE_DIR / 'archive'
+    rules: List[RetentionRule] = [RetentionRule(older_than_days=30, statuses=['UNRELEVANT', 'ERROR'])]
+    # Не архівувати те, що вже розглянуто вручну (manual_status не 'n/a')
+    keep_reviewed: bool = True
+    batch_size: int = 5000
+    # VACUUM основної БД після архівації, щоб файл реально зменшився
+    vacuum: bool = True
+
 class DatabaseSettings(BaseModel):
     # ВАЖЛИВО: дефолт одразу коректний (три /)
     db_url: str = "sqlite:///db.sqlite3"
+    # Скільки id довідників (акаунти/сервери/канали/автори) тримати в пам'яті
+    identity_cache_size: int = 50_000
+    sqlite: SQLiteSettings = SQLiteSettings()
+    postgres: PostgresSettings = PostgresSettings()
+    writer: WriterSettings = WriterSettings()
+    retention: RetentionSettings = RetentionSettings()
 
 class StageOneSettings(BaseModel):
     model: str = 'gpt-3.5-turbo'
     system_prompt: str = ""
     max_retries: int = 1
+    # Мікро-пакетування: 1 = вимкнено (по одному запиту на повідомлення)
+    batch_size: int = 1
+    batch_wait_ms: int = 100
 
 class StageTwoSettings(BaseModel):
     model: str = 'gpt-4o-mini'
@@ -29,12 +104,48 @@ class StageTwoSettings(BaseModel):
     max_retries: int = 3
     system_prompt: str = ""
 
+class VerdictCacheSettings(BaseModel):
+    enabled: bool = True
+    ttl_hours: float = 24 * 7
+    max_entries: int = 50_000
+
+class SpeculativeSettings(BaseModel):
+    # Live: Stage 2 стартує паралельно зі Stage 1 і скасовується, якщо Stage 1 скаже JUNK
+    enabled: bool = False
+    # Предикат: хоча б одне з "сильних" слів серед знайдених ключових...
+    strong_keywords: List[str] = Field(default_factory=list)
+    # ...або канал, де Stage 1 історично пропускає щонайменше таку частку повідомлень
+    min_channel_yield: float = 0.5
+    min_channel_samples: int = 20
+
+class ModelPricing(BaseModel):
+    # USD за 1M токенів
+    input_per_1m: float
+    output_per_1m: float
+
+def _default_pricing() -> Dict[str, ModelPricing]:
+    return {
+        'gpt-4o-mini': ModelPricing(input_per_1m=0.15, output_per_1m=0.60),
+        'gpt-4o': ModelPricing(input_per_1m=2.50, output_per_1m=10.00),
+        'gpt-4.1-mini': ModelPricing(input_per_1m=0.40, output_per_1m=1.60),
+        'gpt-4.1-nano': ModelPricing(input_per_1m=0.10, output_per_1m=0.40),
+        'gpt-3.5-turbo': ModelPricing(input_per_1m=0.50, output_per_1m=1.50),
+    }
+
 class OpenAISettings(BaseModel):
     api_key: SecretStr | None = None
     timeout: int = 30
+    # Стартова паралельність; далі підлаштовується адаптивно (AIMD) до max_concurrency
     concurrency: int = 5
+    max_concurrency: int = 50
+    latency_spike_seconds: float = 20.0
+    rate_limit_max_attempts: int = 6
     stage_one: StageOneSettings = StageOneSettings()
     stage_two: StageTwoSettings = StageTwoSettings()
+    verdict_cache: VerdictCacheSettings = VerdictCacheSettings()
+    speculative: SpeculativeSettings = SpeculativeSettings()
+    # Ціни для обліку витрат (таблиця ai_calls); ключ — назва моделі або її префікс
+    pricing: Dict[str, ModelPricing] = Field(default_factory=_default_pricing)
 
 class DiscordAccount(BaseModel):
     name: str
@@ -43,13 +154,53 @@ class DiscordAccount(BaseModel):
 class DiscordSettings(BaseModel):
     accounts: List[DiscordAccount] = Field(default_factory=list)
     concurrent_channels: int = 12
-    batch_pause_seconds: float = 0.3
+    # Ліміти запитів до Discord (на акаунт): пауза з джитером між сторінками ОДНОГО каналу
     delay_seconds: Tuple[float, float] = (0.05, 0.15)
+    # Глобальна стеля — лише запобіжник (глобальний ліміт Discord — 50 запитів/с)
+    global_requests_per_second: float = 40.0
+    # Повтори 429/5xx: експоненційний backoff з джитером, не більше max_retries спроб
+    backoff_base_seconds: float = 1.0
+    backoff_max_seconds: float = 60.0
     message_page_limit: int = 100
+    # Backfill скидає можливості каналу в БД/sinks кожні N штук (і в кінці каналу)
+    backfill_flush_size: int = 200
+    # Скільки повідомлень backfill одночасно тримає в AI-валідації (на всі канали й акаунти)
+    backfill_ai_in_flight: int = 50
     max_retries: int = 5
     track_all_channels: bool = True
     channel_whitelist: List[int] = Field(default_factory=list)
 
+class IngestionSettings(BaseModel):
+    # Черга між Listener та MessagePipeline у режимі 'live'
+    queue_size: int = 1000
+    workers: int = 5
+    overflow_policy: Literal['block', 'drop_oldest', 'spill'] = 'block'
+    # block: кожна подія discord.py — окрема задача; понад стільки очікувачів повідомлення йдуть на диск
+    max_blocked_producers: int = 1000
+    spill_path: Path = BASE_DIR / '.ingest_spill' / 'queue.jsonl'
+    stats_interval_seconds: float = 60.0
+    # Дедуплікація одного повідомлення, яке бачать кілька акаунтів
+    dedupe_ttl_seconds: float = 900.0
+    dedupe_max_entries: int = 100_000
+
+class StageZeroSettings(BaseModel):
+    # Локальний класифікатор перед Stage 1 (див. команду train-stage-zero)
+    enabled: bool = False
+    model_path: Path = BASE_DIR / 'models' / 'stage_zero.npz'
+    # Яку частку справжніх лідів гарантовано пропускати далі в LLM
+    recall_floor: float = 0.98
+    min_training_samples: int = 200
+    n_features: int = 2 ** 18
+    epochs: int = 5
+    learning_rate: float = 0.1
+    l2: float = 1e-6
+
+class HotReloadSettings(BaseModel):
+    # Перечитування config.yaml у live-процесі без перепідключення до Discord
+    enabled: bool = True
+    # Опитування mtime файлу; додатково завжди працює SIGHUP (де він є)
+    poll_interval_seconds: float = 5.0
+
 class GoogleSheetSettings(BaseModel):
     spreadsheet_id: str = ""
     live_sheet_name: str = 'Live'
@@ -66,6 +217,7 @@ class ExportSettings(BaseModel):
 class Settings(BaseSettings):
     history_days: int = 7
     keywords: List[str] = Field(default_factory=list)
+    keyword_engine: Literal['regex', 'aho_corasick'] = 'aho_corasick'
     log_level: Literal['DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL'] = 'INFO'
     log_dir: Path = BASE_DIR / 'logs'
     log_file: str = 'app.log'
@@ -74,6 +226,9 @@ class Settings(BaseSettings):
     database: DatabaseSettings = DatabaseSettings()
     openai: OpenAISettings = OpenAISettings()
     discord: DiscordSettings = DiscordSettings()
+    ingestion: IngestionSettings = IngestionSettings()
+    stage_zero: StageZeroSettings = StageZeroSettings()
+    hot_reload: HotReloadSettings = HotReloadSettings()
     google_sheet: GoogleSheetSettings = GoogleSheetSettings()
     export: ExportSettings = ExportSettings()
 
@@ -122,13 +277,65 @@ def _normalize_sqlite_url(db_url: str) -> str:
 
     return f"sqlite:///{db_path.as_posix()}"
 
+def _normalize_db_url(db_url: str) -> str:
+    """
+    Зводить URL PostgreSQL до єдиної форми postgresql://... (її розуміють і Tortoise, і SQLAlchemy);
+    SQLite-URL нормалізуються як і раніше.
+    """
+    for prefix in ("postgres://", "postgresql+asyncpg://", "postgresql+psycopg2://"):
+        if db_url.startswith(prefix):
+            return "postgresql://" + db_url[len(prefix):]
+    return _normalize_sqlite_url(db_url)
+
+def load_settings() -> Settings:
+    """Читає налаштування з нуля (config.yaml + .env) — використовується і для hot-reload."""
+    loaded = Settings()
+    # НОРМАЛІЗАЦІЯ ОДИН РАЗ ДЛЯ ВСІХ
+    loaded.database.db_url = _normalize_db_url(loaded.database.db_url)
+    if not loaded.database.retention.archive_dir.is_absolute():
+        loaded.database.retention.archive_dir = BASE_DIR / loaded.database.retention.archive_dir
+    return loaded
+
+def config_version() -> str:
+    """Короткий хеш вмісту config.yaml, щоб у логах було видно, яка версія конфігу активна."""
+    if not CONFIG_FILE.is_file():
+        return "default"
+    return hashlib.sha256(CONFIG_FILE.read_bytes()).hexdigest()[:12]
+
 # ініціалізація
-settings = Settings()
-# НОРМАЛІЗАЦІЯ ОДИН РАЗ ДЛЯ ВСІХ
-settings.database.db_url = _normalize_sqlite_url(settings.database.db_url)
+settings = load_settings()
+
+def tortoise_connection(database: DatabaseSettings) -> Any:
+    """
+    Конфіг з'єднання Tortoise. Для SQLite — у формі credentials: усі зайві ключі
+    бекенд виконує як PRAGMA при відкритті з'єднання. Для PostgreSQL — asyncpg-пул
+    з розмірами та statement_timeout з database.postgres.
+    """
+    url = make_url(database.db_url)
+    if url.get_backend_name() == "postgresql":
+        pg = database.postgres
+        return {
+            "engine": "tortoise.backends.asyncpg",
+            "credentials": {
+                "host": url.host or "localhost",
+                "port": url.port or 5432,
+                "user": url.username,
+                "password": url.password,
+                "database": url.database,
+                "minsize": pg.min_pool_size,
+                "maxsize": pg.max_pool_size,
+                "server_settings": {"statement_timeout": str(pg.statement_timeout_ms)},
+            },
+        }
+    if url.get_backend_name() != "sqlite":
+        return database.db_url
+    return {
+        "engine": "tortoise.backends.sqlite",
+        "credentials": {"file_path": url.database or ":memory:", **database.sqlite.pragmas()},
+    }
 
 # Tortoise ORM має дивитись у той самий URL
 TORTOISE_CONFIG = {
-    "connections": {"default": settings.database.db_url},
+    "connections": {"default": tortoise_connection(settings.database)},
     "apps": {"models": {"models": ["database.models"], "default_connection": "default"}},
 }
@@ -1,5 +1,6 @@
 # src/dashboard.py
 import os
+import time
 from pathlib import Path
 
 import pandas as pd
@@ -9,6 +10,7 @@ from sqlalchemy.engine import make_url
 
 from config.settings import settings
 from dashboard.data import load_data
+from database.search import SearchScope
 from dashboard.pages import (
     page_triage,
     page_analytics,
@@ -33,7 +35,10 @@ def _db_signature(db_url: str) -> tuple:
     """
     Сигнатура БД для кешу: (mtime,size) основного файлу + -wal/-shm, якщо є.
     Змінились файли -> змінилась сигнатура -> перераховується cache_data.
+    Для PostgreSQL файлів нема — сигнатура змінюється раз на 5 секунд.
     """
+    if make_url(db_url).get_backend_name() != "sqlite":
+        return (int(time.time() // 5),)
     p = _resolve_db_file(db_url)
     files = [p, p.with_suffix(p.suffix + "-wal"), p.with_suffix(p.suffix + "-shm")]
     sig = []
@@ -107,11 +112,18 @@ def main():
         if selected_account != "Всі акаунти" and "bot_user_name" in df.columns:
             df = df[df["bot_user_name"] == selected_account]
 
+    # Ті самі фільтри для повнотекстового пошуку — виконуються в SQL разом із MATCH
+    scope = SearchScope(
+        date_from=pd.to_datetime(selected_date_range[0]).date(),
+        date_to=pd.to_datetime(selected_date_range[-1]).date(),
+        bot_name=selected_account if selected_account != "Всі акаунти" else None,
+    )
+
     # --- 4) Рендер сторінки за вибором ---
     if page == "📬 Сортування":
-        page_triage.display_page(df)
+        page_triage.display_page(df, scope)
     elif page == "📈 Аналітика":
-        page_analytics.display_page(df)
+        page_analytics.display_page(df, scope)
     elif page == "⚙️ Конфігурація":
         config_path = Path(__file__).resolve().parents[1] / "config.yaml"
         page_config.display_page(config_path)
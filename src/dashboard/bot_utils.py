@@ -86,3 +86,17 @@ def stop_bot(account: str) -> None:
         pass
     finally:
         p.unlink(missing_ok=True)
+
+def reload_bot(account: str) -> bool:
+    """
+    Просить запущеного бота перечитати config.yaml (SIGHUP) без перезапуску.
+    Де SIGHUP немає (Windows), бот підхопить зміни сам, опитуючи файл.
+    """
+    p = pid_file(account)
+    if not p.exists() or not hasattr(signal, "SIGHUP"):
+        return False
+    try:
+        os.kill(int(p.read_text()), signal.SIGHUP)
+        return True
+    except Exception:
+        return False
@@ -11,6 +11,7 @@ AI_QUALIFIED_STATUSES = ['RELEVANT', 'POSSIBLY_RELEVANT']
 # Статус, який ми вважаємо підтвердженим вручну
 MANUAL_APPROVED_STATUS = 'approved'
 # --- Константи для аналізу витрат ---
+# Реальні витрати беруться з таблиці ai_calls; ця оцінка — лише для старих записів без обліку.
 # Приблизна вартість одного запиту до OpenAI API (gpt-4o-mini).
 # Це значення варто уточнити відповідно до вашого середнього використання токенів.
 # Наприклад, $0.15 / 1M input tokens, $0.60 / 1M output tokens
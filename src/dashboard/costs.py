@@ -0,0 +1,19 @@
+# src/dashboard/costs.py
+
+import pandas as pd
+
+from .constants import COST_PER_AI_REQUEST_USD
+
+
+def with_estimated_costs(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Рядки без обліку в ai_calls (записи до його появи) отримують оцінку
+    COST_PER_AI_REQUEST_USD за запис; рядки з реальним обліком не змінюються.
+    Повертає копію df і додає колонку 'cost_estimated' (True — вартість оцінена).
+    """
+    df = df.copy()
+    estimated = df['ai_calls'].fillna(0) == 0
+    df['cost_estimated'] = estimated
+    df.loc[estimated, 'ai_calls'] = 1
+    df.loc[estimated, 'ai_cost_usd'] = COST_PER_AI_REQUEST_USD
+    return df
@@ -1,10 +1,12 @@
 # src/dashboard/data.py
 import streamlit as st
 import pandas as pd
-from sqlalchemy import create_engine, text
+from sqlalchemy import inspect, text
 from sqlalchemy.engine import make_url
 from pathlib import Path
 from config.settings import settings
+from database.search import COUNT_SQL, FTS_TABLE, SearchScope, scoped_count_sql, scoped_search_sql, to_fts_query
+from .db_utils import get_engine
 
 
 # --- Які колонки очікує дашборд у всіх табах ---
@@ -17,14 +19,19 @@ _EXPECTED_COLS = [
     # AI/ручні
     "ai_stage_one_status", "ai_stage_two_status", "ai_stage_two_score",
     "manual_status",
+    # облік AI (таблиця ai_calls)
+    "ai_calls", "ai_prompt_tokens", "ai_completion_tokens", "ai_cost_usd",
 ]
 
+_NUMERIC_COLS = ["ai_stage_two_score", "ai_calls", "ai_prompt_tokens", "ai_completion_tokens", "ai_cost_usd"]
+
 
 def _empty_df() -> pd.DataFrame:
     """Порожній DF із повною схемою, щоб UI ніколи не падав."""
     df = pd.DataFrame(columns=_EXPECTED_COLS)
     # типи за замовчуванням
-    df["ai_stage_two_score"] = pd.Series(dtype="float64")
+    for c in _NUMERIC_COLS:
+        df[c] = pd.Series(dtype="float64")
     return df
 
 
@@ -33,7 +40,7 @@ def _ensure_columns(df: pd.DataFrame) -> pd.DataFrame:
     for c in _EXPECTED_COLS:
         if c not in df.columns:
             # розумні дефолти
-            if c == "ai_stage_two_score":
+            if c in _NUMERIC_COLS:
                 df[c] = 0.0
             else:
                 df[c] = ""
@@ -48,7 +55,8 @@ def _ensure_columns(df: pd.DataFrame) -> pd.DataFrame:
     df["manual_status"]       = df.get("manual_status", pd.Series(dtype=str)).fillna("N/A").astype(str).str.lower()
     df["ai_stage_one_status"] = df.get("ai_stage_one_status", pd.Series(dtype=str)).fillna("N/A").astype(str)
     df["ai_stage_two_status"] = df.get("ai_stage_two_status", pd.Series(dtype=str)).fillna("N/A").astype(str)
-    df["ai_stage_two_score"]  = pd.to_numeric(df.get("ai_stage_two_score", 0.0), errors="coerce").fillna(0.0)
+    for c in _NUMERIC_COLS:
+        df[c] = pd.to_numeric(df[c], errors="coerce").fillna(0.0)
 
     # текстові поля
     for c in ["server_name", "channel_name", "author_name", "bot_user_name",
@@ -62,7 +70,7 @@ def _ensure_columns(df: pd.DataFrame) -> pd.DataFrame:
 def load_data(db_url: str, db_signature: tuple) -> pd.DataFrame:
     """
     Повертає DataFrame з opportunities + назви ботів/серверів/каналів/авторів.
-    Джерело: settings.database.db_url (sqlite).
+    Джерело: settings.database.db_url (sqlite або postgresql).
     Ніколи не кидає KeyError: повертає DF з повною очікуваною схемою.
     """
     # --- 1) Перевіряємо URL і файл БД ---
@@ -78,50 +86,69 @@ def load_data(db_url: str, db_signature: tuple) -> pd.DataFrame:
         return _empty_df()
 
     url = make_url(db_url)
-    if url.drivername != "sqlite":
-        raise RuntimeError("Поки що підтримується лише sqlite")
+    if url.get_backend_name() == "sqlite":
+        db_path = url.database
+        if not db_path:
+            st.error("❌ У sqlite URL відсутній шлях до файлу БД.")
+            return _empty_df()
 
-    db_path = url.database
-    if not db_path:
-        st.error("❌ У sqlite URL відсутній шлях до файлу БД.")
-        return _empty_df()
+        db_file = Path(db_path if Path(db_path).is_absolute()
+                       else (Path(__file__).resolve().parents[2] / db_path)).resolve()
 
-    db_file = Path(db_path if Path(db_path).is_absolute()
-                   else (Path(__file__).resolve().parents[2] / db_path)).resolve()
+        if not db_file.exists():
+            st.error(f"❌ Файл БД не знайдено: {db_file}")
+            return _empty_df()
 
-    if not db_file.exists():
-        st.error(f"❌ Файл БД не знайдено: {db_file}")
-        return _empty_df()
-
-    st.caption(f"🔌 DB: `{db_file}`")
+        st.caption(f"🔌 DB: `{db_file}`")
+    else:
+        st.caption(f"🔌 DB: `{url.render_as_string(hide_password=True)}`")
 
     # --- 2) Чи є потрібна таблиця? ---
-    engine = create_engine(db_url)
+    engine = get_engine(db_url, read_only=settings.database.sqlite.dashboard_read_only)
     try:
         with engine.connect() as conn:
-            exists = conn.execute(
-                text("SELECT 1 FROM sqlite_master WHERE type='table' AND name='opportunities' LIMIT 1")
-            ).fetchone()
-            if not exists:
+            inspector = inspect(conn)
+            if not inspector.has_table("opportunities"):
                 st.info("ℹ️ У БД немає таблиці 'opportunities'.")
                 return _empty_df()
+            has_ai_calls = inspector.has_table("ai_calls")
     except Exception as e:
         st.warning(f"Не вдалося перевірити структуру БД: {e}")
         return _empty_df()
 
     # --- 3) Основний запит ---
-    query = """
+    # Реальні витрати на AI агрегуються по кожній можливості (якщо таблиця вже є)
+    ai_select, ai_join = "", ""
+    if has_ai_calls:
+        ai_select = """,
+            ai.calls             AS ai_calls,
+            ai.prompt_tokens     AS ai_prompt_tokens,
+            ai.completion_tokens AS ai_completion_tokens,
+            ai.cost_usd          AS ai_cost_usd"""
+        ai_join = """
+        LEFT JOIN (
+            SELECT opportunity_id,
+                   COUNT(*)               AS calls,
+                   SUM(prompt_tokens)     AS prompt_tokens,
+                   SUM(completion_tokens) AS completion_tokens,
+                   SUM(cost_usd)          AS cost_usd
+            FROM ai_calls
+            WHERE opportunity_id IS NOT NULL
+            GROUP BY opportunity_id
+        ) AS ai ON ai.opportunity_id = opp.id"""
+
+    query = f"""
         SELECT
             opp.*,
             acc.name  AS bot_user_name,
             srv.name  AS server_name,
             chn.name  AS channel_name,
-            auth.name AS author_name
+            auth.name AS author_name{ai_select}
         FROM opportunities AS opp
         LEFT JOIN discordaccount AS acc ON opp.discovered_by_id = acc.id
         LEFT JOIN server         AS srv ON opp.server_id = srv.id
         LEFT JOIN channel        AS chn ON opp.channel_id = chn.id
-        LEFT JOIN author         AS auth ON opp.author_id = auth.id
+        LEFT JOIN author         AS auth ON opp.author_id = auth.id{ai_join}
     """
 
     try:
@@ -141,3 +168,40 @@ def load_data(db_url: str, db_signature: tuple) -> pd.DataFrame:
 
     st.caption(f"📦 Завантажено рядків: {len(df)}")
     return df
+
+
+@st.cache_data(show_spinner=False, ttl=30)
+def search_messages(db_url: str, text_query: str, scope: SearchScope, limit: int = 10_000) -> tuple:
+    """
+    Повнотекстовий пошук (FTS5) по тексту повідомлень у межах фільтрів дашборду (scope).
+    Фільтри виконуються в тому ж SQL-запиті, що й MATCH, — без передачі списку id.
+    Повертає (DataFrame[id, rank, snippet] за релевантністю, збігів у БД, збігів у вибірці).
+    """
+    empty = pd.DataFrame(columns=["id", "rank", "snippet"])
+    fts_query = to_fts_query(text_query)
+    if not fts_query:
+        return empty, 0, 0
+    if make_url(db_url).get_backend_name() != "sqlite":
+        st.info("ℹ️ Повнотекстовий пошук (FTS5) доступний лише для SQLite.")
+        return empty, 0, 0
+
+    engine = get_engine(db_url, read_only=settings.database.sqlite.dashboard_read_only)
+    try:
+        with engine.connect() as conn:
+            exists = conn.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type='table' AND name=:name"), {"name": FTS_TABLE}
+            ).fetchone()
+            if not exists:
+                st.info("ℹ️ Пошуковий індекс ще не створено — запустіть бота або команду `search-rebuild`.")
+                return empty, 0, 0
+            # запити з database.search використовують позиційні '?' — виконуємо їх як є, без text()
+            hits = pd.DataFrame(conn.exec_driver_sql(*scoped_search_sql(fts_query, scope, limit)).fetchall(),
+                                columns=["id", "rank", "snippet"])
+            in_scope = conn.exec_driver_sql(*scoped_count_sql(fts_query, scope)).scalar()
+            total = conn.exec_driver_sql(COUNT_SQL, (fts_query,)).scalar()
+    except Exception as e:
+        st.warning(f"Не вдалося виконати пошук: {e}")
+        return empty, 0, 0
+    if in_scope > limit:
+        st.warning(f"Показано {limit} найрелевантніших із {in_scope} збігів — уточніть запит або фільтри.")
+    return hits, total, in_scope
@@ -1,5 +1,10 @@
 # src/dashboard/db_utils.py
-from sqlalchemy import create_engine, text
+from functools import lru_cache
+
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import Engine, make_url
+
+from config.settings import settings
 
 def _to_sqlalchemy_url(db: str) -> str:
     # якщо вже URL — лишаємо
@@ -8,10 +13,64 @@ def _to_sqlalchemy_url(db: str) -> str:
     # інакше вважаємо, що це шлях до файлу
     return f"sqlite:///{db}"
 
+@lru_cache(maxsize=None)
+def get_engine(db: str, read_only: bool = False) -> Engine:
+    """
+    Один engine на процес (а не новий на кожен запит) з тим самим PRAGMA-профілем, що й у ботів.
+    read_only=True — з'єднання mode=ro + query_only: дашборд фізично не може тримати write-lock.
+    PostgreSQL — пул з database.postgres; read_only робить сесії READ ONLY на рівні сервера.
+    """
+    url = make_url(_to_sqlalchemy_url(db))
+    if url.get_backend_name() == "postgresql":
+        return _postgres_engine(url, read_only)
+    if url.get_backend_name() != "sqlite":
+        return create_engine(url)
+
+    profile = settings.database.sqlite
+    pragmas = profile.pragmas()
+    if read_only and url.database and url.database != ":memory:":
+        url = url.set(database=f"file:{url.database}?mode=ro", query={"uri": "true"})
+        pragmas = profile.read_only_pragmas()
+
+    engine = create_engine(url)
+
+    @event.listens_for(engine, "connect")
+    def _apply_pragmas(dbapi_connection, _connection_record):
+        cursor = dbapi_connection.cursor()
+        for key, value in pragmas.items():
+            cursor.execute(f"PRAGMA {key}={value}")
+        cursor.close()
+
+    return engine
+
+def _postgres_engine(url, read_only: bool) -> Engine:
+    pg = settings.database.postgres
+    # Драйвер з requirements.txt; голий postgresql:// у SQLAlchemy 2.1 означає psycopg 3
+    if url.drivername == "postgresql":
+        url = url.set(drivername="postgresql+psycopg2")
+    engine = create_engine(
+        url,
+        pool_size=pg.dashboard_pool_size,
+        max_overflow=pg.dashboard_max_overflow,
+        # з'єднання, обірване сервером/мережею, перевіряється перед видачею з пулу
+        pool_pre_ping=True,
+    )
+
+    @event.listens_for(engine, "connect")
+    def _apply_session_settings(dbapi_connection, _connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute(f"SET statement_timeout = {int(pg.statement_timeout_ms)}")
+        if read_only:
+            cursor.execute("SET SESSION CHARACTERISTICS AS TRANSACTION READ ONLY")
+        cursor.close()
+        dbapi_connection.commit()
+
+    return engine
+
 def update_opportunity_status(db, opportunity_id, new_status):
     """Оновлює поле manual_status для ОДНІЄЇ можливості."""
     try:
-        engine = create_engine(_to_sqlalchemy_url(db))
+        engine = get_engine(db)
         with engine.connect() as connection:
             stmt = text("UPDATE opportunities SET manual_status = :status WHERE id = :id")
             connection.execute(stmt, {"status": new_status, "id": opportunity_id})
@@ -26,7 +85,7 @@ def update_opportunities_status_bulk(db, opportunity_ids, new_status):
     if not opportunity_ids:
         return True
     try:
-        engine = create_engine(_to_sqlalchemy_url(db))
+        engine = get_engine(db)
         with engine.connect() as connection:
             placeholders = ", ".join([f":id_{i}" for i in range(len(opportunity_ids))])
             stmt = text(f"UPDATE opportunities SET manual_status = :status WHERE id IN ({placeholders})")
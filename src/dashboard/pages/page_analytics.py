@@ -13,7 +13,7 @@ from . import (
     tab_approved_leads,   # ← ДОДАЛИ
 )
 
-def display_page(df):
+def display_page(df, scope):
     """Відображає сторінку з усіма аналітичними вкладками."""
     st.header("📈 Аналітичний Центр", divider='rainbow')
 
@@ -37,5 +37,5 @@ def display_page(df):
     with tabs[4]: tab_community_analysis.display_tab(df)
     with tabs[5]: tab_time_analysis.display_tab(df)
     with tabs[6]: tab_cost_analysis.display_tab(df)
-    with tabs[7]: tab_detailed_view.display_tab(df)
+    with tabs[7]: tab_detailed_view.display_tab(df, scope)
     with tabs[8]: tab_approved_leads.display_tab(df)   # ← ДОДАЛИ
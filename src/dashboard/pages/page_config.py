@@ -1,14 +1,13 @@
 import streamlit as st
-import time
 import yaml
 from pathlib import Path
 from ..config_utils import load_config, save_config
 
-from dashboard.bot_utils import get_status, start_bot, stop_bot
+from dashboard.bot_utils import get_status, reload_bot
 
 
 def display_page(config_path: Path):
-    """Відображає вкладку для редагування конфігурації з функцією перезапуску ботів."""
+    """Відображає вкладку для редагування конфігурації з гарячим перезавантаженням ботів."""
     st.header("⚙️ Редактор Конфігурації", divider='rainbow')
 
     config_data = load_config(config_path)
@@ -98,7 +97,7 @@ def display_page(config_path: Path):
             )
 
         st.divider()
-        submitted = st.form_submit_button("💾 Зберегти та Перезапустити активні боти")
+        submitted = st.form_submit_button("💾 Зберегти та застосувати до активних ботів")
 
 
     if not submitted:
@@ -127,19 +126,15 @@ def display_page(config_path: Path):
         st.error("Не вдалося зберегти конфігурацію.")
         return
 
-    # Перезапускаємо ті боти, що зараз Running
-    with st.spinner("Перезапуск ботів..."):
-        cnt = 0
-        for acc in updated.get('discord', {}).get('accounts', []):
-            name = acc.get('name')
-            if name and get_status(name) == "Running":
-                stop_bot(name)
-                time.sleep(1)
-                start_bot(name)
-                time.sleep(1)
-                cnt += 1
+    # Ключові слова, промпти та канали застосовуються на льоту (без перепідключення до Discord)
+    cnt = 0
+    for acc in updated.get('discord', {}).get('accounts', []):
+        name = acc.get('name')
+        if name and get_status(name) == "Running" and reload_bot(name):
+            cnt += 1
 
     if cnt:
-        st.success(f"Перезапущено {cnt} бот(ів).")
+        st.success(f"Сигнал перезавантаження конфігу надіслано {cnt} бот(ам).")
     else:
-        st.info("Не знайдено запущених ботів для перезапуску.")
+        st.info("Запущені боти підхоплять зміни автоматично протягом кількох секунд.")
+    st.caption("Глибина історії та рівень логів застосовуються після перезапуску бота.")
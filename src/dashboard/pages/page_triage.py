@@ -1,12 +1,15 @@
 # src/dashboard/pages/page_triage.py
 
+from dataclasses import replace
+
 import streamlit as st
 from streamlit_autorefresh import st_autorefresh
 from .triage_views import view_deck, view_list
 from ..constants import AI_QUALIFIED_STATUSES  # ← лишаємо тільки цю константу
+from ..search import text_search_filter
 import pandas as pd
 
-def display_page(df):
+def display_page(df, scope):
     """Головна сторінка для сортування, роутер між режимами, з фільтром Stage1/Stage2."""
 
     st_autorefresh(interval=30_000, key="triage_reloader")
@@ -46,14 +49,23 @@ def display_page(df):
         s2_mask = pd.Series(False, index=unreviewed_all.index)
 
     # Застосовуємо вибір етапу
+    scope = replace(scope, manual_status='n/a')
     if st.session_state.triage_stage == "Етап 1":
         unreviewed = unreviewed_all[s1_mask]
+        scope = replace(scope, stage_one_passed=True)
     else:
         unreviewed = unreviewed_all[s2_mask]
+        scope = replace(scope, stage_two_statuses=tuple(AI_QUALIFIED_STATUSES))
+
+    # Повнотекстовий пошук (з'являється колонка 'snippet')
+    unreviewed = text_search_filter(unreviewed, key="triage_search", scope=scope)
 
-    # --- Сортування: message_timestamp → created_at → id ---
+    # --- Сортування: релевантність пошуку → message_timestamp → created_at → id ---
     sort_done = False
-    if 'message_timestamp' in unreviewed.columns:
+    if 'snippet' in unreviewed.columns:
+        # уже впорядковано за релевантністю
+        sort_done = True
+    elif 'message_timestamp' in unreviewed.columns:
         ts = pd.to_datetime(unreviewed['message_timestamp'], errors='coerce', utc=True)
         unreviewed = unreviewed.assign(_ts=ts).sort_values('_ts', ascending=False).drop(columns=['_ts'])
         sort_done = True
@@ -2,6 +2,30 @@
 
 import streamlit as st
 from ..constants import AI_QUALIFIED_STATUSES, COST_PER_AI_REQUEST_USD
+from ..costs import with_estimated_costs
+
+
+def _cost_breakdown(df, column: str, label: str):
+    """Витрати, кількість повідомлень і лідів у розрізі однієї колонки (Топ-10 за витратами)."""
+    grouped = df.assign(is_lead=df['ai_stage_two_status'].isin(AI_QUALIFIED_STATUSES)).groupby(column).agg(
+        messages=('id', 'count'),
+        leads=('is_lead', 'sum'),
+        cost=('ai_cost_usd', 'sum'),
+    ).reset_index()
+    grouped['cost_per_lead'] = grouped['cost'] / grouped['leads'].where(grouped['leads'] > 0)
+    grouped = grouped.nlargest(10, 'cost')
+
+    st.dataframe(
+        grouped,
+        column_config={
+            column: label,
+            "messages": "К-сть повідомлень",
+            "leads": "Ліди",
+            "cost": st.column_config.NumberColumn("Витрати, $", format="$%.4f"),
+            "cost_per_lead": st.column_config.NumberColumn("$ / лід", format="$%.4f"),
+        },
+        use_container_width=True, hide_index=True
+    )
 
 
 def display_tab(df):
@@ -12,8 +36,16 @@ def display_tab(df):
         st.info("Немає даних для аналізу витрат за обраний період.")
         return
 
+    # Записи до появи таблиці ai_calls не мають обліку — для кожного такого рядка лишається оцінка
+    df = with_estimated_costs(df)
+    estimated = int(df['cost_estimated'].sum())
+    if estimated:
+        st.caption(f"ℹ️ {estimated} з {len(df)} записів без даних у ai_calls — для них показано оцінку"
+                   f" ${COST_PER_AI_REQUEST_USD} за запис.")
+
     # --- Розрахунок метрик ---
-    total_requests = len(df)
+    total_requests = int(df['ai_calls'].sum())
+    total_tokens = int(df['ai_prompt_tokens'].sum() + df['ai_completion_tokens'].sum())
 
     # --- ВИПРАВЛЕННЯ ТУТ ---
     # Використовуємо нову колонку 'ai_stage_two_status'
@@ -21,36 +53,26 @@ def display_tab(df):
     total_qualified_leads = len(ai_qualified_df)
 
     # Загальні витрати
-    total_cost = total_requests * COST_PER_AI_REQUEST_USD
+    total_cost = df['ai_cost_usd'].sum()
 
     # Вартість одного кваліфікованого ліда
     cost_per_lead = total_cost / total_qualified_leads if total_qualified_leads > 0 else 0
+    leads_per_dollar = total_qualified_leads / total_cost if total_cost > 0 else 0
 
     # --- Відображення ---
     st.subheader("Загальні показники")
-    col1, col2, col3 = st.columns(3)
+    col1, col2, col3, col4, col5 = st.columns(5)
     col1.metric("Кількість запитів до AI", value=total_requests)
-    col2.metric("Загальні витрати (USD)", value=f"${total_cost:.2f}")
-    col3.metric("Вартість 1 кваліфікованого ліда (CPL)", value=f"${cost_per_lead:.3f}")
+    col2.metric("Токени (вхід + вихід)", value=f"{total_tokens:,}")
+    col3.metric("Загальні витрати (USD)", value=f"${total_cost:.2f}")
+    col4.metric("Вартість 1 кваліфікованого ліда (CPL)", value=f"${cost_per_lead:.3f}")
+    col5.metric("Лідів на $1", value=f"{leads_per_dollar:.1f}")
 
     st.markdown("---")
 
     # Аналіз витрат по джерелах
-    st.subheader("Витрати в розрізі джерел (Топ-10)")
-
-    cost_by_server = df.groupby('server_name').size().reset_index(name='requests')
-    cost_by_server['cost'] = cost_by_server['requests'] * COST_PER_AI_REQUEST_USD
-    cost_by_server = cost_by_server.sort_values(by='cost', ascending=False).nlargest(10, 'cost')
+    st.subheader("Витрати в розрізі серверів (Топ-10)")
+    _cost_breakdown(df, 'server_name', "Сервер")
 
-    st.dataframe(
-        cost_by_server,
-        column_config={
-            "server_name": "Сервер",
-            "requests": "К-сть запитів",
-            "cost": st.column_config.NumberColumn(
-                "Витрати, $",
-                format="$%.2f"
-            )
-        },
-        use_container_width=True, hide_index=True
-    )
\ No newline at end of file
+    st.subheader("Витрати в розрізі ключових слів (Топ-10)")
+    _cost_breakdown(df, 'keyword_trigger', "Ключове слово")
@@ -1,8 +1,11 @@
 # src/dashboard/pages/tab_detailed_view.py
 
+from dataclasses import replace
+
 import streamlit as st
+from ..search import text_search_filter
 
-def display_tab(df):
+def display_tab(df, scope):
     """Відображає вкладку з детальною таблицею можливостей."""
     st.header("📄 Детальний перегляд можливостей")
 
@@ -21,15 +24,22 @@ def display_tab(df):
     table_df = df.copy()
     if selected_server != "Всі":
         table_df = table_df[table_df['server_name'] == selected_server]
+        scope = replace(scope, server_name=selected_server)
     if selected_status != "Всі":
         table_df = table_df[table_df['ai_stage_two_status'] == selected_status]
+        scope = replace(scope, stage_two_statuses=(selected_status,))
+    table_df = text_search_filter(table_df, key="detailed_view_search", scope=scope)
 
     # --- ОНОВЛЕНІ КОЛОНКИ ---
+    columns = [
+        'message_timestamp', 'server_name', 'channel_name', 'author_name', 'bot_user_name',
+        'ai_stage_one_status', 'ai_stage_two_status', 'ai_stage_two_score',
+        'manual_status', 'message_content', 'message_url'
+    ]  # <-- Додано 'bot_user_name'
+    if 'snippet' in table_df.columns:
+        columns.insert(0, 'snippet')
     st.dataframe(
-        table_df[[
-            'message_timestamp', 'server_name', 'channel_name', 'author_name', 'bot_user_name',
-            'ai_stage_one_status', 'ai_stage_two_status', 'ai_stage_two_score',
-            'manual_status', 'message_content', 'message_url'
-        ]],  # <-- Додано 'bot_user_name'
+        table_df[columns],
+        column_config={"snippet": "Збіг"},
         use_container_width=True, height=600, hide_index=True
     )
\ No newline at end of file
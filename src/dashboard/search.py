@@ -0,0 +1,34 @@
+# src/dashboard/search.py
+
+import pandas as pd
+import streamlit as st
+
+from config.settings import settings
+from database.search import SearchScope
+from .data import search_messages
+
+
+def text_search_filter(df: pd.DataFrame, key: str, scope: SearchScope) -> pd.DataFrame:
+    """
+    Поле повнотекстового пошуку над DataFrame можливостей.
+    Без запиту повертає df як є; із запитом — лише збіги (найрелевантніші першими)
+    і колонку 'snippet' з підсвіченими [збігами]. scope має описувати ті самі фільтри, що й df.
+    """
+    query = st.text_input(
+        "🔍 Пошук по тексту повідомлень",
+        key=key,
+        placeholder='react developer · "need a react dev" · freelanc*',
+    )
+    if not query.strip() or df.empty:
+        return df
+
+    hits, total, in_scope = search_messages(settings.database.db_url, query.strip(), scope)
+    st.caption(f"Знайдено в БД: {total} повідомлень (у поточній вибірці — {in_scope}).")
+    if hits.empty:
+        return df.iloc[0:0]
+
+    return (
+        df.merge(hits, on="id", how="inner")
+          .sort_values("rank")
+          .drop(columns=["rank"])
+    )
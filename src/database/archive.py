@@ -0,0 +1,112 @@
+# src/database/archive.py
+import fnmatch
+import json
+import sqlite3
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Архівний рядок самодостатній: назви сервера/каналу/автора/бота денормалізовані
+ARCHIVE_OPPORTUNITY_COLUMNS = [
+    "id", "message_id", "message_url", "message_content", "message_timestamp",
+    "keyword_trigger", "keyword_hits",
+    "server_id", "server_name", "channel_id", "channel_name",
+    "author_id", "author_name", "discovered_by_id", "bot_name",
+    "ai_stage_one_status", "ai_stage_one_score", "ai_stage_one_reason",
+    "ai_stage_two_status", "ai_stage_two_score", "ai_stage_two_lead_type", "ai_stage_two_reason",
+    "manual_status", "source_mode", "processed_at",
+]
+ARCHIVE_AI_CALL_COLUMNS = [
+    "id", "message_id", "stage", "model", "prompt_tokens", "completion_tokens",
+    "retries", "latency_ms", "cost_usd", "batch_size", "created_at",
+]
+
+_SCHEMA = f"""
+    CREATE TABLE IF NOT EXISTS opportunities (
+        {", ".join(c + (" INTEGER PRIMARY KEY" if c == "message_id" else "") for c in ARCHIVE_OPPORTUNITY_COLUMNS)},
+        archived_at TEXT NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS ai_calls (
+        {", ".join(c + (" INTEGER PRIMARY KEY" if c == "id" else "") for c in ARCHIVE_AI_CALL_COLUMNS)}
+    );
+    CREATE INDEX IF NOT EXISTS idx_ai_calls_message ON ai_calls (message_id);
+"""
+
+
+def _to_archive_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat(sep=" ")
+    if isinstance(value, (list, dict)):
+        return json.dumps(value, ensure_ascii=False)
+    if value is None or isinstance(value, (int, float, str, bytes)):
+        return value
+    return str(value)
+
+
+class ArchiveStore:
+    """
+    Помісячні архівні SQLite-файли: <archive_dir>/opportunities-YYYY-MM.sqlite3.
+    Синхронний sqlite3 — виклики з async-коду йдуть через asyncio.to_thread.
+    """
+
+    PREFIX = "opportunities-"
+
+    def __init__(self, archive_dir: Path):
+        self._dir = archive_dir
+
+    def path(self, month: str) -> Path:
+        return self._dir / f"{self.PREFIX}{month}.sqlite3"
+
+    def months(self, pattern: str = "*") -> List[str]:
+        """Наявні місяці архіву (YYYY-MM), відфільтровані glob-шаблоном, напр. '2024-*'."""
+        if not self._dir.is_dir():
+            return []
+        months = (p.stem[len(self.PREFIX):] for p in self._dir.glob(f"{self.PREFIX}*.sqlite3"))
+        return sorted(m for m in months if fnmatch.fnmatch(m, pattern))
+
+    def write(self, month: str, opportunities: Sequence[Dict], ai_calls: Sequence[Dict]) -> int:
+        """
+        Дописує рядки в архів місяця однією транзакцією (INSERT OR IGNORE — повтор безпечний).
+        Повертається лише після коміту на диск, тож видаляти з основної БД можна одразу після.
+        """
+        self._dir.mkdir(parents=True, exist_ok=True)
+        archived_at = datetime.now().astimezone().isoformat(sep=" ")
+        conn = sqlite3.connect(self.path(month))
+        try:
+            conn.execute("PRAGMA journal_mode=DELETE")
+            conn.executescript(_SCHEMA)
+            with conn:
+                before = conn.total_changes
+                conn.executemany(
+                    f"INSERT OR IGNORE INTO opportunities ({', '.join(ARCHIVE_OPPORTUNITY_COLUMNS)}, archived_at)"
+                    f" VALUES ({', '.join('?' for _ in ARCHIVE_OPPORTUNITY_COLUMNS)}, ?)",
+                    [
+                        [_to_archive_value(row.get(c)) for c in ARCHIVE_OPPORTUNITY_COLUMNS] + [archived_at]
+                        for row in opportunities
+                    ],
+                )
+                written = conn.total_changes - before
+                conn.executemany(
+                    f"INSERT OR IGNORE INTO ai_calls ({', '.join(ARCHIVE_AI_CALL_COLUMNS)})"
+                    f" VALUES ({', '.join('?' for _ in ARCHIVE_AI_CALL_COLUMNS)})",
+                    [[_to_archive_value(row.get(c)) for c in ARCHIVE_AI_CALL_COLUMNS] for row in ai_calls],
+                )
+            return written
+        finally:
+            conn.close()
+
+    def query(
+            self, sql: str, params: Sequence = (), pattern: str = "*", limit: Optional[int] = None,
+    ) -> Iterator[Tuple[str, List[str], List[tuple]]]:
+        """
+        Виконує read-only запит у кожному архіві місяця, що підпадає під шаблон.
+        Повертає (місяць, колонки, рядки) по кожному файлу.
+        """
+        for month in self.months(pattern):
+            conn = sqlite3.connect(f"file:{self.path(month)}?mode=ro", uri=True)
+            try:
+                cursor = conn.execute(sql, params)
+                rows = cursor.fetchmany(limit) if limit else cursor.fetchall()
+                yield month, [d[0] for d in cursor.description or ()], rows
+            finally:
+                conn.close()
@@ -0,0 +1,30 @@
+# src/database/dialect.py
+"""
+Дрібниці, якими SQLite і PostgreSQL відрізняються в "сирому" SQL.
+Запити в коді пишуться з '?' (стиль SQLite); для asyncpg вони переписуються в $1, $2, ...
+"""
+import re
+from typing import List
+
+from tortoise.backends.base.client import BaseDBAsyncClient
+
+_QMARK = re.compile(r"\?")
+
+
+def is_postgres(conn: BaseDBAsyncClient) -> bool:
+    return conn.capabilities.dialect == "postgres"
+
+
+def placeholders(conn: BaseDBAsyncClient, count: int, start: int = 1) -> List[str]:
+    """Плейсхолдери для count параметрів, нумерація з start (для PostgreSQL)."""
+    if is_postgres(conn):
+        return [f"${i}" for i in range(start, start + count)]
+    return ["?"] * count
+
+
+def qmark(conn: BaseDBAsyncClient, sql: str) -> str:
+    """Переписує '?' у $n для PostgreSQL. У запиті не має бути '?' всередині рядкових літералів."""
+    if not is_postgres(conn):
+        return sql
+    counter = iter(range(1, sql.count("?") + 1))
+    return _QMARK.sub(lambda _: f"${next(counter)}", sql)
@@ -0,0 +1,86 @@
+# src/database/identity_cache.py
+import asyncio
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Iterable, Tuple, Type
+
+from tortoise import Model
+
+_Key = Tuple[str, int]
+
+
+class IdentityCache:
+    """
+    Обмежена LRU-мапа id рядків-довідників (DiscordAccount, Server, Channel, Author),
+    про які відомо, що вони вже є в БД. Для відомого id не потрібен жоден запит.
+
+    Створення нового id серіалізується per-key локом: паралельні корутини з тим самим
+    каналом/автором чекають першу, а не б'ються об IntegrityError.
+    """
+
+    def __init__(self, max_entries: int):
+        self._max_entries = max_entries
+        self._known: "OrderedDict[_Key, None]" = OrderedDict()
+        self._locks: Dict[_Key, asyncio.Lock] = {}
+        self._lock_users: Dict[_Key, int] = {}
+
+        # --- Метрики ---
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(model: Type[Model], pk: int) -> _Key:
+        return model.__name__, pk
+
+    @property
+    def max_entries(self) -> int:
+        return self._max_entries
+
+    def __len__(self) -> int:
+        return len(self._known)
+
+    def contains(self, model: Type[Model], pk: int, count: bool = True) -> bool:
+        key = self._key(model, pk)
+        if key in self._known:
+            self._known.move_to_end(key)
+            if count:
+                self.hits += 1
+            return True
+        if count:
+            self.misses += 1
+        return False
+
+    def add(self, model: Type[Model], pk: int) -> None:
+        key = self._key(model, pk)
+        self._known[key] = None
+        self._known.move_to_end(key)
+        while len(self._known) > self._max_entries:
+            self._known.popitem(last=False)
+
+    def add_many(self, model: Type[Model], pks: Iterable[int]) -> None:
+        for pk in pks:
+            self.add(model, pk)
+
+    @asynccontextmanager
+    async def creating(self, model: Type[Model], pk: int) -> AsyncIterator[None]:
+        """Лок на створення одного id; прибирається, коли ним ніхто не користується."""
+        key = self._key(model, pk)
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        self._lock_users[key] = self._lock_users.get(key, 0) + 1
+        try:
+            async with lock:
+                yield
+        finally:
+            self._lock_users[key] -= 1
+            if not self._lock_users[key]:
+                del self._lock_users[key]
+                del self._locks[key]
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "identity_cache_size": len(self._known),
+            "identity_cache_hits": self.hits,
+            "identity_cache_misses": self.misses,
+            "identity_cache_hit_rate": round(self.hits / total, 3) if total else 0.0,
+        }
@@ -0,0 +1,171 @@
+# src/database/migrations.py
+from typing import Awaitable, Callable, Dict, List, NamedTuple
+
+import structlog
+from tortoise import Tortoise
+from tortoise.backends.base.client import BaseDBAsyncClient
+from tortoise.transactions import in_transaction
+
+from domain.models import message_id_from_url
+from .dialect import is_postgres, placeholders
+from .search import FTS_REBUILD, FTS_SCHEMA
+
+logger = structlog.get_logger(__name__)
+
+VERSION_TABLE = "schema_version"
+# Ключ pg_advisory_xact_lock: кілька хостів стартують одночасно, міграції застосовує один
+_PG_MIGRATION_LOCK = 0x6C656164
+
+
+class Migration(NamedTuple):
+    version: int
+    name: str
+    apply: Callable[[BaseDBAsyncClient], Awaitable[None]]
+
+
+async def _columns(conn: BaseDBAsyncClient, table: str) -> set:
+    if is_postgres(conn):
+        rows = await conn.execute_query_dict(
+            "SELECT column_name AS name FROM information_schema.columns WHERE table_name = $1", [table]
+        )
+    else:
+        rows = await conn.execute_query_dict(f"PRAGMA table_info({table})")
+    return {row["name"] for row in rows}
+
+
+# --- Міграції (лише додавати в кінець; застосовані не змінювати) ---
+# execute_script тут не годиться: sqlite3.executescript спершу комітить відкриту транзакцію.
+
+async def _m0001_keyword_hits(conn: BaseDBAsyncClient) -> None:
+    # generate_schemas() створює лише відсутні таблиці, але не колонки в існуючих
+    if "keyword_hits" not in await _columns(conn, "opportunities"):
+        await conn.execute_query("ALTER TABLE opportunities ADD COLUMN keyword_hits JSON")
+
+
+async def _m0002_hot_path_indexes(conn: BaseDBAsyncClient) -> None:
+    for statement in (
+        # get_latest_message_timestamp: WHERE channel_id = ? ORDER BY message_timestamp DESC LIMIT 1
+        "CREATE INDEX IF NOT EXISTS idx_opportunities_channel_ts ON opportunities (channel_id, message_timestamp)",
+        # тріаж: manual_status + ai_stage_two_status, найновіші першими
+        "CREATE INDEX IF NOT EXISTS idx_opportunities_triage"
+        " ON opportunities (manual_status, ai_stage_two_status, message_timestamp)",
+        # джоїни дашборду (channel_id покриває idx_opportunities_channel_ts)
+        "CREATE INDEX IF NOT EXISTS idx_opportunities_server ON opportunities (server_id)",
+        "CREATE INDEX IF NOT EXISTS idx_opportunities_author ON opportunities (author_id)",
+        "CREATE INDEX IF NOT EXISTS idx_opportunities_discovered_by ON opportunities (discovered_by_id)",
+        "CREATE INDEX IF NOT EXISTS idx_ai_calls_opportunity ON ai_calls (opportunity_id)",
+    ):
+        await conn.execute_query(statement)
+
+
+async def _m0003_message_id(conn: BaseDBAsyncClient) -> None:
+    # Числовий snowflake замість 255-символьного URL як ключ дедуплікації
+    if "message_id" not in await _columns(conn, "opportunities"):
+        await conn.execute_query("ALTER TABLE opportunities ADD COLUMN message_id BIGINT")
+
+    rows = await conn.execute_query_dict("SELECT id, message_url FROM opportunities WHERE message_id IS NULL")
+    updates = [
+        [message_id, row["id"]]
+        for row in rows
+        if (message_id := message_id_from_url(row["message_url"])) is not None
+    ]
+    if updates:
+        p_message_id, p_id = placeholders(conn, 2)
+        await conn.execute_many(f"UPDATE opportunities SET message_id = {p_message_id} WHERE id = {p_id}", updates)
+    if len(updates) < len(rows):
+        logger.warning("Rows without a parsable message id in URL", count=len(rows) - len(updates))
+
+    await conn.execute_query(
+        "CREATE UNIQUE INDEX IF NOT EXISTS uq_opportunities_message_id ON opportunities (message_id)"
+    )
+
+
+
+async def _m0004_fts(conn: BaseDBAsyncClient) -> None:
+    # FTS5 — можливість SQLite; на інших СУБД пошук по тексту не вмикається
+    if conn.capabilities.dialect != "sqlite":
+        logger.warning("Full-text index skipped: FTS5 is SQLite-only", dialect=conn.capabilities.dialect)
+        return
+    for statement in [*FTS_SCHEMA, *FTS_REBUILD]:
+        await conn.execute_query(statement)
+
+
+async def _m0005_ai_calls_discarded(conn: BaseDBAsyncClient) -> None:
+    if "discarded" not in await _columns(conn, "ai_calls"):
+        await conn.execute_query("ALTER TABLE ai_calls ADD COLUMN discarded BOOLEAN NOT NULL DEFAULT FALSE")
+
+
+MIGRATIONS: List[Migration] = [
+    Migration(1, "opportunities.keyword_hits", _m0001_keyword_hits),
+    Migration(2, "hot-path composite indexes", _m0002_hot_path_indexes),
+    Migration(3, "opportunities.message_id (unique, backfilled)", _m0003_message_id),
+    Migration(4, "opportunities_fts full-text index", _m0004_fts),
+    Migration(5, "ai_calls.discarded", _m0005_ai_calls_discarded),
+]
+
+LATEST_VERSION = MIGRATIONS[-1].version
+
+
+# --- Раннер ---
+
+async def _ensure_version_table(conn: BaseDBAsyncClient) -> None:
+    await conn.execute_query(f"""
+        CREATE TABLE IF NOT EXISTS {VERSION_TABLE} (
+            version    INTEGER PRIMARY KEY,
+            name       VARCHAR(255) NOT NULL,
+            applied_at TIMESTAMP NOT NULL
+        )
+    """)
+
+
+async def _version_table_exists(conn: BaseDBAsyncClient) -> bool:
+    if is_postgres(conn):
+        rows = await conn.execute_query_dict("SELECT to_regclass($1) IS NOT NULL AS present", [VERSION_TABLE])
+        return bool(rows and rows[0]["present"])
+    rows = await conn.execute_query_dict(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", [VERSION_TABLE]
+    )
+    return bool(rows)
+
+
+async def applied_migrations(conn: BaseDBAsyncClient = None, create: bool = True) -> Dict[int, dict]:
+    """create=False — лише читання: якщо schema_version ще нема, жодна міграція не застосована."""
+    conn = conn or Tortoise.get_connection("default")
+    if create:
+        await _ensure_version_table(conn)
+    elif not await _version_table_exists(conn):
+        return {}
+    rows = await conn.execute_query_dict(f"SELECT version, name, applied_at FROM {VERSION_TABLE} ORDER BY version")
+    return {row["version"]: row for row in rows}
+
+
+async def apply_migrations() -> int:
+    """
+    Застосовує всі ще не застосовані міграції по порядку; кожна — в окремій транзакції
+    разом із записом у schema_version. Повертає поточну версію схеми.
+    """
+    conn = Tortoise.get_connection("default")
+    applied = await applied_migrations(conn)
+
+    for migration in MIGRATIONS:
+        if migration.version in applied:
+            continue
+        log = logger.bind(version=migration.version, migration=migration.name)
+        async with in_transaction() as tx:
+            if is_postgres(tx):
+                await tx.execute_query(f"SELECT pg_advisory_xact_lock({_PG_MIGRATION_LOCK})")
+            # Інший процес (бот / дашборд / інший хост) міг застосувати її, поки ми чекали
+            rows = await tx.execute_query_dict(
+                f"SELECT 1 FROM {VERSION_TABLE} WHERE version = {int(migration.version)}"
+            )
+            if rows:
+                continue
+            await migration.apply(tx)
+            p_version, p_name = placeholders(tx, 2)
+            await tx.execute_query(
+                f"INSERT INTO {VERSION_TABLE} (version, name, applied_at) VALUES ({p_version}, {p_name}, CURRENT_TIMESTAMP)",
+                [migration.version, migration.name],
+            )
+        log.info("Migration applied")
+
+    return LATEST_VERSION
@@ -48,9 +48,12 @@ class Opportunity(models.Model):
     """
     id = fields.IntField(pk=True)
     message_url = fields.CharField(max_length=255, unique=True, indexed=True)
+    # Основний ключ дедуплікації; unique-індекс створює міграція 3 (старі рядки заповнено з URL)
+    message_id = fields.BigIntField(null=True, description="Discord snowflake повідомлення")
     message_content = fields.TextField()
     message_timestamp = fields.DatetimeField(indexed=True)
     keyword_trigger = fields.CharField(max_length=100, null=True)
+    keyword_hits = fields.JSONField(null=True, description="Усі ключові слова, що спрацювали")
 
     # --- ЗОВНІШНІ КЛЮЧІ (روابط) ---
     server = fields.ForeignKeyField("models.Server", related_name="opportunities", null=True)
@@ -75,4 +78,119 @@ class Opportunity(models.Model):
         return f"Opportunity from {self.channel.name}: {self.message_url}"
 
     class Meta:
-        table = "opportunities"
\ No newline at end of file
+        table = "opportunities"
+
+
+# --- КУРСОРИ BACKFILL ---
+
+class ChannelCursor(models.Model):
+    """
+    Останній повністю проглянутий snowflake каналу. Не залежить від opportunities:
+    канал без жодного збігу теж не завантажується повторно з history_days.
+    """
+    channel_id = fields.BigIntField(pk=True, description="Discord Channel ID")
+    last_message_id = fields.BigIntField(description="Snowflake останнього проглянутого повідомлення")
+    updated_at = fields.DatetimeField(auto_now=True)
+
+    class Meta:
+        table = "channel_cursors"
+
+
+# --- ПРОГОНИ BACKFILL (чекпоінти для --resume) ---
+
+class BackfillRun(models.Model):
+    """Один запуск backfill. 'running' без живого процесу — перерваний прогін, його можна продовжити."""
+    id = fields.IntField(pk=True)
+    bot_id = fields.BigIntField(description="Discord User ID акаунта, що збирає історію")
+    status = fields.CharField(max_length=20, default="running", description="running | finished | abandoned")
+    history_days = fields.IntField()
+    started_at = fields.DatetimeField(auto_now_add=True)
+    finished_at = fields.DatetimeField(null=True)
+
+    class Meta:
+        table = "backfill_runs"
+
+
+class BackfillRunChannel(models.Model):
+    """Канал, повністю пройдений у межах прогону: при --resume пропускається."""
+    id = fields.IntField(pk=True)
+    run = fields.ForeignKeyField("models.BackfillRun", related_name="channels", on_delete=fields.CASCADE)
+    channel_id = fields.BigIntField()
+
+    class Meta:
+        table = "backfill_run_channels"
+        unique_together = (("run", "channel_id"),)
+
+
+class BackfillPendingMessage(models.Model):
+    """
+    Повідомлення, вже завантажене (курсор за ним), але ще не збережене як можливість.
+    Видаляється після record_batch; при --resume повертається в AI без повторного завантаження.
+    """
+    message_id = fields.BigIntField(pk=True, description="Discord snowflake повідомлення")
+    run = fields.ForeignKeyField("models.BackfillRun", related_name="pending", on_delete=fields.CASCADE)
+    channel_id = fields.BigIntField()
+    payload = fields.JSONField(description="domain.models.Message у JSON")
+
+    class Meta:
+        table = "backfill_pending"
+
+
+# --- АРХІВ ---
+
+class ArchivedMessage(models.Model):
+    """
+    Слід заархівованої можливості в основній БД: лише snowflake (8 байт) і місяць архіву.
+    Потрібен для дедуплікації — сам рядок живе в archive/opportunities-YYYY-MM.sqlite3.
+    """
+    message_id = fields.BigIntField(pk=True, description="Discord snowflake повідомлення")
+    archive_month = fields.CharField(max_length=7, description="YYYY-MM — файл архіву")
+
+    class Meta:
+        table = "archived_messages"
+
+
+# --- КЕШ ВЕРДИКТІВ AI ---
+
+class VerdictCacheEntry(models.Model):
+    """
+    Результат одного етапу AI-валідації для конкретного тексту.
+    Ключ — sha256(етап + модель + версія промпту + нормалізований текст).
+    """
+    key = fields.CharField(max_length=64, pk=True)
+    stage = fields.SmallIntField()
+    model = fields.CharField(max_length=100)
+    result = fields.JSONField()
+    hits = fields.IntField(default=0)
+    created_at = fields.DatetimeField(auto_now_add=True)
+    last_used_at = fields.DatetimeField(indexed=True)
+
+    class Meta:
+        table = "ai_verdict_cache"
+
+
+# --- ОБЛІК ВИКЛИКІВ AI ---
+
+class AICall(models.Model):
+    """
+    Один виклик OpenAI (або частка пакетного Stage 1): токени, ретраї, затримка, вартість.
+    opportunity може бути NULL, якщо запис можливості не збережено (дублікат).
+    """
+    id = fields.IntField(pk=True)
+    opportunity = fields.ForeignKeyField(
+        "models.Opportunity", related_name="ai_calls", null=True, on_delete=fields.SET_NULL
+    )
+    stage = fields.SmallIntField()
+    model = fields.CharField(max_length=100)
+    prompt_tokens = fields.IntField(default=0)
+    completion_tokens = fields.IntField(default=0)
+    retries = fields.SmallIntField(default=0)
+    latency_ms = fields.IntField(default=0)
+    cost_usd = fields.FloatField(default=0.0)
+    batch_size = fields.SmallIntField(default=1)
+    # Спекулятивний Stage 2, результат якого відкинуто: витрати без користі
+    discarded = fields.BooleanField(default=False)
+    created_at = fields.DatetimeField(auto_now_add=True, indexed=True)
+
+    class Meta:
+        table = "ai_calls"
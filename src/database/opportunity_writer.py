@@ -0,0 +1,125 @@
+# src/database/opportunity_writer.py
+import asyncio
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+import structlog
+
+from domain.models import MessageOpportunity
+from .storage import DatabaseStorage
+
+logger = structlog.get_logger(__name__)
+
+_Item = Tuple[MessageOpportunity, str, asyncio.Future]
+
+
+class OpportunityWriter:
+    """
+    Єдиний записувач у БД для live-режиму. Воркери не пишуть самі, а кладуть можливість
+    у чергу й чекають future. Окрема корутина збирає до `batch_size` рядків або
+    `batch_wait_ms` очікування і пише їх однією транзакцією (save_opportunities_batch).
+    Замість коміту (і fsync) на кожен лід виходить один груповий коміт, а задачі
+    не б'ються між собою за write-lock.
+
+    Future отримує True, якщо рядок новий, і False, якщо це дублікат.
+    """
+
+    def __init__(self, storage: DatabaseStorage, batch_size: int, batch_wait_ms: int):
+        self._storage = storage
+        self._batch_size = max(1, batch_size)
+        self._batch_wait = batch_wait_ms / 1000
+        self._queue: "asyncio.Queue[Optional[_Item]]" = asyncio.Queue()
+        self._task: Optional[asyncio.Task] = None
+
+        # --- Метрики ---
+        self.commits = 0
+        self.rows_committed = 0
+        self.rows_saved = 0
+        self.fallbacks = 0
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="opportunity-writer")
+
+    async def stop(self) -> None:
+        """Дописує все, що вже в черзі (за AI вже заплачено), і зупиняє записувача."""
+        if self._task is None:
+            return
+        await self._queue.put(None)
+        await self._task
+        self._task = None
+        logger.info("Opportunity writer stopped", **self.stats())
+
+    async def submit(self, opportunity: MessageOpportunity, source_mode: str) -> bool:
+        self.start()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((opportunity, source_mode, future))
+        return await future
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            item = await self._queue.get()
+            if item is None:
+                break
+            batch: List[_Item] = [item]
+            deadline = loop.time() + self._batch_wait
+            while len(batch) < self._batch_size:
+                timeout = deadline - loop.time()
+                try:
+                    item = self._queue.get_nowait() if timeout <= 0 else \
+                        await asyncio.wait_for(self._queue.get(), timeout)
+                except (asyncio.QueueEmpty, asyncio.TimeoutError):
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            await self._write(batch)
+
+    async def _write(self, batch: List[_Item]) -> None:
+        by_mode: Dict[str, List[_Item]] = defaultdict(list)
+        for item in batch:
+            by_mode[item[1]].append(item)
+
+        for source_mode, items in by_mode.items():
+            log = logger.bind(batch_size=len(items), source_mode=source_mode)
+            try:
+                result = await self._storage.save_opportunities_batch(
+                    [opp for opp, _, _ in items], 0, "Unknown", source_mode
+                )
+            except Exception:
+                log.warning("Group commit failed, writing opportunities one by one.", exc_info=True)
+                self.fallbacks += len(items)
+                await self._write_one_by_one(items)
+                continue
+
+            self.commits += 1
+            self.rows_committed += len(items)
+            self.rows_saved += result.saved
+            log.debug("Group commit complete.", saved=result.saved, skipped=result.skipped)
+
+            # Одне й те саме повідомлення двічі в пакеті: новим вважається лише перше
+            pending_ids = set(result.saved_ids)
+            for opp, _, future in items:
+                message_id = opp.message.message_id
+                saved = message_id in pending_ids
+                pending_ids.discard(message_id)
+                if not future.done():
+                    future.set_result(saved)
+
+    async def _write_one_by_one(self, items: List[_Item]) -> None:
+        for opp, source_mode, future in items:
+            saved = await self._storage.save_opportunity(opportunity=opp, source_mode=source_mode)
+            if not future.done():
+                future.set_result(saved is not None)
+
+    def stats(self) -> dict:
+        return {
+            "writer_queue": self._queue.qsize(),
+            "writer_commits": self.commits,
+            "writer_rows_saved": self.rows_saved,
+            "writer_avg_batch": round(self.rows_committed / self.commits, 2) if self.commits else 0.0,
+            "writer_fallbacks": self.fallbacks,
+        }
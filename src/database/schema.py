@@ -0,0 +1,72 @@
+# src/database/schema.py
+from typing import Dict, List
+
+import structlog
+from tortoise import Tortoise
+
+from .migrations import LATEST_VERSION, MIGRATIONS, applied_migrations, apply_migrations
+
+logger = structlog.get_logger(__name__)
+
+# Запити гарячого шляху, план яких показує `db-status` (значення — лише приклад для планувальника)
+KEY_QUERIES: Dict[str, str] = {
+    "latest message in channel": """
+        SELECT message_timestamp FROM opportunities
+        WHERE channel_id = 1 ORDER BY message_timestamp DESC LIMIT 1
+    """,
+    "triage queue": """
+        SELECT id FROM opportunities
+        WHERE manual_status = 'n/a' AND ai_stage_two_status IN ('RELEVANT', 'POSSIBLY_RELEVANT')
+        ORDER BY message_timestamp DESC
+    """,
+    "existing message ids": """
+        SELECT message_id FROM opportunities WHERE message_id IN (1, 2)
+    """,
+    "dashboard join": """
+        SELECT opp.id, acc.name, srv.name, chn.name, auth.name
+        FROM opportunities AS opp
+        LEFT JOIN discordaccount AS acc ON opp.discovered_by_id = acc.id
+        LEFT JOIN server         AS srv ON opp.server_id = srv.id
+        LEFT JOIN channel        AS chn ON opp.channel_id = chn.id
+        LEFT JOIN author         AS auth ON opp.author_id = auth.id
+        WHERE opp.channel_id = 1
+    """,
+    "ai calls of opportunity": """
+        SELECT SUM(cost_usd) FROM ai_calls WHERE opportunity_id = 1
+    """,
+}
+
+
+async def ensure_schema() -> int:
+    """Створює відсутні таблиці та доганяє існуючу БД до останньої версії міграцій."""
+    await Tortoise.generate_schemas(safe=True)
+    return await apply_migrations()
+
+
+async def schema_status() -> Dict:
+    """
+    Застосовані міграції та плани виконання ключових запитів.
+    Лише читає: не створює таблиць і не застосовує міграцій.
+    """
+    conn = Tortoise.get_connection("default")
+    applied = await applied_migrations(conn, create=False)
+    explain = "EXPLAIN QUERY PLAN" if conn.capabilities.dialect == "sqlite" else "EXPLAIN"
+
+    plans: Dict[str, List[str]] = {}
+    for name, sql in KEY_QUERIES.items():
+        try:
+            rows = await conn.execute_query_dict(f"{explain} {sql}")
+        except Exception as e:
+            # Таблиці чи колонки ще нема — схему не створено або є неприменені міграції
+            plans[name] = [f"unavailable: {e}"]
+            continue
+        # SQLite: колонка detail; PostgreSQL: "QUERY PLAN"
+        plans[name] = [str(row.get("detail", row.get("QUERY PLAN", row))) for row in rows]
+
+    return {
+        "version": max(applied) if applied else 0,
+        "latest": LATEST_VERSION,
+        "applied": list(applied.values()),
+        "pending": [m for m in MIGRATIONS if m.version not in applied],
+        "plans": plans,
+    }
@@ -0,0 +1,142 @@
+# src/database/search.py
+"""
+Повнотекстовий пошук по opportunities.message_content (SQLite FTS5).
+
+Таблиця opportunities_fts — external content над opportunities (текст не дублюється),
+синхронізується тригерами (міграція 4). SQL тут спільний для DatabaseStorage (Tortoise)
+і дашборду (SQLAlchemy), тож ранжування і сніпети однакові скрізь.
+"""
+import re
+from dataclasses import dataclass
+from datetime import date
+from typing import List, Optional, Tuple
+
+FTS_TABLE = "opportunities_fts"
+
+# Порядок важливий: спершу таблиця, потім тригери, потім початкове наповнення
+FTS_SCHEMA: List[str] = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        message_content,
+        content='opportunities', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS opportunities_fts_ai AFTER INSERT ON opportunities BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, message_content) VALUES (new.id, new.message_content);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS opportunities_fts_ad AFTER DELETE ON opportunities BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, message_content) VALUES ('delete', old.id, old.message_content);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS opportunities_fts_au AFTER UPDATE OF message_content ON opportunities BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, message_content) VALUES ('delete', old.id, old.message_content);
+        INSERT INTO {FTS_TABLE}(rowid, message_content) VALUES (new.id, new.message_content);
+    END""",
+]
+
+# Перебудова індексу з нуля по вмісту opportunities + злиття сегментів
+FTS_REBUILD: List[str] = [
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('optimize')",
+]
+
+# Параметри: (fts-запит, limit). bm25: менше — релевантніше
+SEARCH_SQL = f"""
+    SELECT rowid AS id,
+           bm25({FTS_TABLE}) AS rank,
+           snippet({FTS_TABLE}, 0, '[', ']', '…', 12) AS snippet
+    FROM {FTS_TABLE}
+    WHERE {FTS_TABLE} MATCH ?
+    ORDER BY rank
+    LIMIT ?
+"""
+
+COUNT_SQL = f"SELECT COUNT(*) AS matches FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH ?"
+
+_TOKEN_RE = re.compile(r'"([^"]+)"|(\S+)')
+
+
+def to_fts_query(text: str) -> str:
+    """
+    Перетворює рядок з пошукового поля на безпечний FTS5-запит:
+    слова — через AND, "фраза в лапках" — як фраза, слово* — пошук за префіксом.
+    Оператори FTS5 (OR, NEAR, дужки, двокрапки) не інтерпретуються — без синтаксичних помилок.
+    """
+    terms = []
+    for phrase, word in _TOKEN_RE.findall(text or ""):
+        if phrase:
+            terms.append(f'"{phrase.strip()}"')
+            continue
+        prefix = word.endswith("*")
+        word = word.replace('"', "").strip("*")
+        if word:
+            terms.append(f'"{word}"' + ("*" if prefix else ""))
+    return " ".join(terms)
+
+
+@dataclass(frozen=True)
+class SearchScope:
+    """
+    Вибірка, в межах якої шукаємо (фільтри дашборду). Предикати йдуть у SQL разом із MATCH,
+    тож пошук не залежить від розміру вибірки. frozen — щоб слугувати ключем кешу.
+    """
+    date_from: Optional[date] = None
+    date_to: Optional[date] = None
+    bot_name: Optional[str] = None
+    server_name: Optional[str] = None
+    manual_status: Optional[str] = None
+    # Stage 1 не відкинув повідомлення (статус не UNRELEVANT або ще порожній)
+    stage_one_passed: bool = False
+    stage_two_statuses: Tuple[str, ...] = ()
+
+
+def _scope_where(scope: SearchScope) -> Tuple[str, list]:
+    clauses, params = [f"{FTS_TABLE} MATCH ?"], []
+    if scope.date_from:
+        clauses.append("date(opp.message_timestamp) >= ?")
+        params.append(scope.date_from.isoformat())
+    if scope.date_to:
+        clauses.append("date(opp.message_timestamp) <= ?")
+        params.append(scope.date_to.isoformat())
+    if scope.bot_name is not None:
+        clauses.append("acc.name = ?")
+        params.append(scope.bot_name)
+    if scope.server_name is not None:
+        clauses.append("srv.name = ?")
+        params.append(scope.server_name)
+    if scope.manual_status is not None:
+        clauses.append("LOWER(opp.manual_status) = LOWER(?)")
+        params.append(scope.manual_status)
+    if scope.stage_one_passed:
+        clauses.append("(opp.ai_stage_one_status IS NULL OR UPPER(opp.ai_stage_one_status) <> 'UNRELEVANT')")
+    if scope.stage_two_statuses:
+        clauses.append(f"opp.ai_stage_two_status IN ({', '.join('?' for _ in scope.stage_two_statuses)})")
+        params.extend(scope.stage_two_statuses)
+    return " AND ".join(clauses), params
+
+
+_SCOPED_FROM = f"""
+    FROM {FTS_TABLE}
+    JOIN opportunities AS opp ON opp.id = {FTS_TABLE}.rowid
+    LEFT JOIN discordaccount AS acc ON opp.discovered_by_id = acc.id
+    LEFT JOIN server AS srv ON opp.server_id = srv.id
+"""
+
+
+def scoped_search_sql(fts_query: str, scope: SearchScope, limit: int) -> Tuple[str, list]:
+    """SEARCH_SQL, обмежений вибіркою scope: (sql, параметри) з позиційними '?'."""
+    where, params = _scope_where(scope)
+    sql = f"""
+    SELECT {FTS_TABLE}.rowid AS id,
+           bm25({FTS_TABLE}) AS rank,
+           snippet({FTS_TABLE}, 0, '[', ']', '…', 12) AS snippet
+    {_SCOPED_FROM}
+    WHERE {where}
+    ORDER BY rank
+    LIMIT ?
+"""
+    return sql, [fts_query, *params, limit]
+
+
+def scoped_count_sql(fts_query: str, scope: SearchScope) -> Tuple[str, list]:
+    """Кількість збігів у вибірці scope (без limit)."""
+    where, params = _scope_where(scope)
+    return f"SELECT COUNT(*) AS matches {_SCOPED_FROM} WHERE {where}", [fts_query, *params]
@@ -1,18 +1,92 @@
 # src/database/storage.py
 
+import asyncio
 from datetime import datetime
-from typing import Optional, List
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Set, Type
 
+import structlog
+from tortoise import Model, timezone
+from tortoise.backends.base.client import BaseDBAsyncClient
 from tortoise.exceptions import IntegrityError
-from domain.models import MessageOpportunity
-from .models import Opportunity, DiscordAccount, Server, Channel, Author
+from tortoise.transactions import in_transaction
+from domain.models import AICallRecord, Message, MessageOpportunity
+from .dialect import placeholders
+from .identity_cache import IdentityCache
+from .models import (
+    AICall, Opportunity, DiscordAccount, Server, Channel, Author, ChannelCursor, ArchivedMessage,
+    BackfillRun, BackfillRunChannel, BackfillPendingMessage,
+)
+from .search import COUNT_SQL, FTS_REBUILD, FTS_TABLE, SEARCH_SQL, to_fts_query
+
+logger = structlog.get_logger(__name__)
+
+# Ліміт параметрів одного запиту: SQLite >= 3.32 — 32766, PostgreSQL — 65535
+_MAX_QUERY_PARAMS = 32_000
+# Перевірка існування йде чанками: 100k id — це 20 індексних запитів, а не один гігантський IN
+EXISTENCE_CHUNK_SIZE = 5_000
+
+
+def chunked(items: Iterable, size: int) -> Iterator[list]:
+    """Розбиває послідовність на списки довжиною не більше size."""
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class BatchSaveResult(NamedTuple):
+    """Результат пакетного збереження: скільки записано нових і скільки вже існувало."""
+    saved: int
+    skipped: int
+    saved_ids: Set[int]
 
 
 class DatabaseStorage:
     """
     Інкапсулює всю логіку взаємодії з базою даних, включаючи нормалізацію.
+    Відомі рядки-довідники (акаунти, сервери, канали, автори) тримаються в IdentityCache,
+    тож для них не робиться жодного запиту.
     """
 
+    def __init__(self, identity_cache_size: int = 50_000):
+        self._identity = IdentityCache(max_entries=identity_cache_size)
+        self._warm_up_lock = asyncio.Lock()
+        self._warmed_up = False
+
+    async def warm_up(self) -> None:
+        """Підтягує id довідників з БД (один раз, при першому збереженні)."""
+        if self._warmed_up:
+            return
+        async with self._warm_up_lock:
+            if self._warmed_up:
+                return
+            # Автори — найчисленніші, тож беремо лише тих, хто писав нещодавно
+            recent_authors = await Opportunity.all().order_by("-id").limit(self._identity.max_entries // 2) \
+                .values_list("author_id", flat=True)
+            self._identity.add_many(Author, reversed(list(dict.fromkeys(recent_authors))))
+            for model in (Server, Channel, DiscordAccount):
+                self._identity.add_many(model, await model.all().values_list("id", flat=True))
+            self._warmed_up = True
+            logger.info("Identity cache warmed up", entries=len(self._identity))
+
+    def stats(self) -> dict:
+        return self._identity.stats()
+
+    async def _ensure_dimension(self, model: Type[Model], pk: int, **values) -> None:
+        """Гарантує наявність рядка-довідника: 0 запитів, якщо id уже відомий, інакше один INSERT OR IGNORE."""
+        if self._identity.contains(model, pk):
+            return
+        async with self._identity.creating(model, pk):
+            # Поки чекали лок, інша корутина могла вже створити цей рядок
+            if self._identity.contains(model, pk, count=False):
+                return
+            await self._bulk_insert(model._meta.db, model, [dict(id=pk, **values)], "id")
+            self._identity.add(model, pk)
+
     async def save_opportunity(
             self,
             opportunity: MessageOpportunity,
@@ -22,72 +96,214 @@ class DatabaseStorage:
         Зберігає ОДНУ можливість, "розумно" створюючи або знаходячи пов'язані сутності.
         """
         try:
+            await self.warm_up()
+            msg = opportunity.message
+
             # Тепер беремо дані про бота з об'єкта opportunity
-            account, _ = await DiscordAccount.get_or_create(id=opportunity.bot_id,
-                                                            defaults={"name": opportunity.bot_name})
+            await self._ensure_dimension(DiscordAccount, opportunity.bot_id, name=opportunity.bot_name)
 
-            server = None
-            if opportunity.message.guild_id and opportunity.message.guild_name:
-                server, _ = await Server.get_or_create(id=opportunity.message.guild_id,
-                                                       defaults={"name": opportunity.message.guild_name})
+            server_id = None
+            if msg.guild_id and msg.guild_name:
+                server_id = msg.guild_id
+                await self._ensure_dimension(Server, server_id, name=msg.guild_name)
 
-            channel, _ = await Channel.get_or_create(
-                id=opportunity.message.channel_id,
-                defaults={"name": opportunity.message.channel_name, "server": server}
-            )
-
-            author, _ = await Author.get_or_create(id=opportunity.message.author_id,
-                                                   defaults={"name": opportunity.message.author_name})
+            await self._ensure_dimension(Channel, msg.channel_id, name=msg.channel_name, server_id=server_id)
+            await self._ensure_dimension(Author, msg.author_id, name=msg.author_name)
 
             db_opportunity = await Opportunity.create(
-                message_url=opportunity.message.jump_url,
-                message_content=opportunity.message.content,
-                message_timestamp=opportunity.message.timestamp,
-                keyword_trigger=opportunity.message.keyword,
-
                 # Посилання на пов'язані об'єкти
-                server=server,
-                channel=channel,
-                author=author,
-                discovered_by=account,
-
-                # Результати AI
-                ai_stage_one_status=opportunity.stage_one_validation.status.value,
-                ai_stage_one_score=opportunity.stage_one_validation.score,
-                ai_stage_one_reason=opportunity.stage_one_validation.reason,
-                ai_stage_two_status=opportunity.stage_two_validation.status.value if opportunity.stage_two_validation else None,
-                ai_stage_two_score=opportunity.stage_two_validation.score if opportunity.stage_two_validation else None,
-                ai_stage_two_lead_type=opportunity.stage_two_validation.lead_type if opportunity.stage_two_validation else None,
-                ai_stage_two_reason=opportunity.stage_two_validation.reason if opportunity.stage_two_validation else None,
-
-                manual_status='n/a',
-                source_mode=source_mode,
+                server_id=server_id,
+                channel_id=msg.channel_id,
+                author_id=msg.author_id,
+                discovered_by_id=opportunity.bot_id,
+                **self._opportunity_values(opportunity, source_mode),
             )
+            await self.save_ai_calls(opportunity, db_opportunity)
             return db_opportunity
         except IntegrityError:
+            # Дублікат, але гроші на AI вже витрачено — облік зберігаємо без прив'язки
+            await self.save_ai_calls(opportunity, None)
             return None
-        except Exception as e:
-            print(f"Помилка при збереженні в БД: {e}")
+        except Exception:
+            logger.exception("Failed to save opportunity", msg_id=opportunity.message.message_id)
             return None
 
+    @staticmethod
+    def _opportunity_values(opportunity: MessageOpportunity, source_mode: str) -> dict:
+        """Значення полів Opportunity, крім зв'язків (спільні для поодинокого та пакетного шляху)."""
+        s1, s2 = opportunity.stage_one_validation, opportunity.stage_two_validation
+        return dict(
+            message_id=opportunity.message.message_id,
+            message_url=opportunity.message.jump_url,
+            message_content=opportunity.message.content,
+            message_timestamp=opportunity.message.timestamp,
+            keyword_trigger=opportunity.message.keyword,
+            keyword_hits=opportunity.message.keywords or None,
+
+            # Результати AI
+            ai_stage_one_status=s1.status.value,
+            ai_stage_one_score=s1.score,
+            ai_stage_one_reason=s1.reason,
+            ai_stage_two_status=s2.status.value if s2 else None,
+            ai_stage_two_score=s2.score if s2 else None,
+            ai_stage_two_lead_type=s2.lead_type if s2 else None,
+            ai_stage_two_reason=s2.reason if s2 else None,
+
+            manual_status='n/a',
+            source_mode=source_mode,
+        )
+
+    @staticmethod
+    def _ai_call_rows(opportunity: MessageOpportunity, opportunity_id: Optional[int]) -> List[dict]:
+        return [
+            dict(opportunity_id=opportunity_id, **call.model_dump())
+            for validation in (opportunity.stage_one_validation, opportunity.stage_two_validation)
+            if validation
+            for call in validation.ai_calls
+        ]
+
+    async def save_ai_calls(self, opportunity: MessageOpportunity, db_opportunity: Optional[Opportunity]) -> int:
+        """
+        Записує облік викликів AI обох етапів у таблицю ai_calls.
+        """
+        calls = self._ai_call_rows(opportunity, db_opportunity.id if db_opportunity else None)
+        if calls:
+            await AICall.bulk_create([AICall(**call) for call in calls])
+        return len(calls)
+
+    async def save_unlinked_ai_calls(self, calls: Sequence[AICallRecord]) -> int:
+        """
+        Записує виклики AI, що не належать жодній можливості (напр. невдалий пакет Stage 1),
+        — за токени заплачено, тож вони мають бути у звіті витрат.
+        """
+        if calls:
+            await AICall.bulk_create([AICall(opportunity_id=None, **call.model_dump()) for call in calls])
+        return len(calls)
+
     async def save_opportunities_batch(
             self,
             opportunities: List[MessageOpportunity],
             bot_id: int,
             bot_name: str,
             source_mode: str,
-    ) -> int:
+    ) -> BatchSaveResult:
         """
-        Зберігає ПАКЕТ можливостей.
-        Примітка: для кращої продуктивності в майбутньому цей метод можна оптимізувати,
-        щоб він робив менше запитів до БД.
+        Зберігає ПАКЕТ можливостей set-based шляхом в одній транзакції:
+          1) унікальні акаунти/сервери/канали/автори — один INSERT ... ON CONFLICT(id) DO NOTHING на набір;
+          2) opportunities — один багаторядковий INSERT ... ON CONFLICT(message_id) DO NOTHING
+             RETURNING на чанк, тож одразу відомо, які рядки нові;
+          3) облік викликів AI — bulk insert з прив'язкою до нових рядків.
+
+        bot_id / bot_name використовуються для можливостей, у яких бот не заданий (backfill).
         """
-        saved_count = 0
+        # Дублікати всередині пакета відкидаємо одразу (лишаємо перший)
+        unique: Dict[int, MessageOpportunity] = {}
         for opp in opportunities:
-            saved = await self.save_opportunity(opp, bot_id, bot_name, source_mode)
-            if saved:
-                saved_count += 1
-        return saved_count
+            unique.setdefault(opp.message.message_id, opp)
+        if not unique:
+            return BatchSaveResult(saved=0, skipped=len(opportunities), saved_ids=set())
+        await self.warm_up()
+
+        accounts: Dict[int, str] = {}
+        servers: Dict[int, str] = {}
+        channels: Dict[int, tuple] = {}
+        authors: Dict[int, str] = {}
+        for opp in unique.values():
+            msg = opp.message
+            accounts.setdefault(opp.bot_id if opp.bot_id is not None else bot_id, opp.bot_name or bot_name)
+            server_id = msg.guild_id if msg.guild_id and msg.guild_name else None
+            if server_id:
+                servers.setdefault(server_id, msg.guild_name)
+            channels.setdefault(msg.channel_id, (msg.channel_name, server_id))
+            authors.setdefault(msg.author_id, msg.author_name)
+
+        # Уже відомі довідники не вставляємо зовсім
+        dimensions = {
+            DiscordAccount: [dict(id=k, name=v) for k, v in accounts.items()],
+            Server: [dict(id=k, name=v) for k, v in servers.items()],
+            Channel: [dict(id=k, name=name, server_id=srv) for k, (name, srv) in channels.items()],
+            Author: [dict(id=k, name=v) for k, v in authors.items()],
+        }
+        dimensions = {
+            model: [row for row in rows if not self._identity.contains(model, row["id"])]
+            for model, rows in dimensions.items()
+        }
+
+        now = timezone.now()
+        async with in_transaction() as conn:
+            for model, rows in dimensions.items():
+                await self._bulk_insert(conn, model, rows, "id")
+
+            rows = [
+                dict(
+                    server_id=opp.message.guild_id if opp.message.guild_id and opp.message.guild_name else None,
+                    channel_id=opp.message.channel_id,
+                    author_id=opp.message.author_id,
+                    discovered_by_id=opp.bot_id if opp.bot_id is not None else bot_id,
+                    processed_at=now,
+                    **self._opportunity_values(opp, source_mode),
+                )
+                for opp in unique.values()
+            ]
+            returned = await self._bulk_insert(conn, Opportunity, rows, "message_id", returning=("id", "message_id"))
+            inserted = {r["message_id"]: r["id"] for r in returned}
+
+            calls = [
+                call
+                for message_id, opp in unique.items()
+                for call in self._ai_call_rows(opp, inserted.get(message_id))
+            ]
+            await self._bulk_insert(conn, AICall, [dict(created_at=now, **call) for call in calls])
+
+        # У кеш — лише після коміту, щоб відкочена транзакція не лишила "фантомних" id
+        for model, rows in dimensions.items():
+            self._identity.add_many(model, (row["id"] for row in rows))
+
+        return BatchSaveResult(
+            saved=len(inserted),
+            skipped=len(opportunities) - len(inserted),
+            saved_ids=set(inserted),
+        )
+
+    @staticmethod
+    async def _bulk_insert(
+            conn: BaseDBAsyncClient,
+            model: Type[Model],
+            rows: List[dict],
+            conflict_column: Optional[str] = None,
+            returning: Sequence[str] = (),
+    ) -> List[dict]:
+        """
+        Багаторядковий INSERT чанками в межах ліміту параметрів.
+        З conflict_column — ON CONFLICT DO NOTHING; returning повертає колонки лише вставлених рядків.
+        Значення конвертує публічний Field.to_db_value (enum, JSON, datetime); bool і datetime
+        драйвери обох БД приймають як є.
+        """
+        if not rows:
+            return []
+        meta = model._meta
+        fields = [name for name in rows[0] if name in meta.fields_db_projection]
+        field_objects = [meta.fields_map[name] for name in fields]
+        columns = ", ".join(f'"{meta.fields_db_projection[name]}"' for name in fields)
+        suffix = f' ON CONFLICT ("{conflict_column}") DO NOTHING' if conflict_column else ""
+        if returning:
+            suffix += " RETURNING " + ", ".join(f'"{c}"' for c in returning)
+
+        chunk_size = max(1, _MAX_QUERY_PARAMS // len(fields))
+        result: List[dict] = []
+        for start in range(0, len(rows), chunk_size):
+            values, groups = [], []
+            for row in rows[start:start + chunk_size]:
+                first = len(values)
+                # Клас замість інстансу: auto_now_add не спрацьовує, значення задаємо явно
+                values.extend(field.to_db_value(row[field.model_field_name], model) for field in field_objects)
+                groups.append(f"({', '.join(placeholders(conn, len(fields), start=first + 1))})")
+
+            query = f'INSERT INTO "{meta.db_table}" ({columns}) VALUES {", ".join(groups)}{suffix}'
+            _, returned = await conn.execute_query(query, values)
+            if returning:
+                result.extend(dict(r) for r in returned)
+        return result
 
     async def get_latest_message_timestamp(self, channel_id: int) -> Optional[datetime]:
         """
@@ -98,12 +314,131 @@ class DatabaseStorage:
             return latest_opportunity.message_timestamp
         return None
 
-    async def get_existing_urls(self, message_urls: List[str]) -> set[str]:
+    async def get_channel_cursor(self, channel_id: int) -> Optional[int]:
+        """Snowflake, до якого (включно) канал уже повністю проглянуто backfill-ом."""
+        cursor = await ChannelCursor.get_or_none(channel_id=channel_id)
+        return cursor.last_message_id if cursor else None
+
+    async def save_channel_cursors(self, cursors: Dict[int, int]) -> None:
+        """Upsert курсорів {channel_id: last_message_id} одним запитом."""
+        if not cursors:
+            return
+        now = timezone.now()
+        await ChannelCursor.bulk_create(
+            [ChannelCursor(channel_id=k, last_message_id=v, updated_at=now) for k, v in cursors.items()],
+            on_conflict=["channel_id"],
+            update_fields=["last_message_id", "updated_at"],
+        )
+
+    # --- Прогони backfill ---
+
+    async def get_resumable_run(self, bot_id: int) -> Optional[BackfillRun]:
+        """Останній незавершений прогін акаунта (процес упав або був зупинений)."""
+        return await BackfillRun.filter(bot_id=bot_id, status="running").order_by("-id").first()
+
+    async def create_backfill_run(self, bot_id: int, history_days: int) -> BackfillRun:
+        """
+        Новий прогін. Незавершені попередні позначаються 'abandoned', а їхні незбережені
+        повідомлення переходять до нового — оплачена/завантажена робота не губиться.
+        """
+        async with in_transaction():
+            run = await BackfillRun.create(bot_id=bot_id, history_days=history_days)
+            stale = await BackfillRun.filter(bot_id=bot_id, status="running").exclude(id=run.id).values_list("id", flat=True)
+            if stale:
+                await BackfillPendingMessage.filter(run_id__in=stale).update(run_id=run.id)
+                await BackfillRun.filter(id__in=stale).update(status="abandoned", finished_at=timezone.now())
+        return run
+
+    async def finish_backfill_run(self, run_id: int) -> None:
+        await BackfillRun.filter(id=run_id).update(status="finished", finished_at=timezone.now())
+
+    async def get_finished_channels(self, run_id: int) -> Set[int]:
+        return set(await BackfillRunChannel.filter(run_id=run_id).values_list("channel_id", flat=True))
+
+    async def mark_channel_finished(self, run_id: int, channel_id: int) -> None:
+        await BackfillRunChannel.bulk_create(
+            [BackfillRunChannel(run_id=run_id, channel_id=channel_id)], ignore_conflicts=True
+        )
+
+    async def checkpoint_page(
+            self, run_id: int, channel_id: int, messages: Sequence[Message], cursor: int
+    ) -> None:
+        """
+        Чекпоінт сторінки однією транзакцією: повідомлення, що йдуть в AI, + курсор каналу.
+        Після нього сторінку не треба завантажувати знову навіть якщо процес впаде до збереження.
+        """
+        async with in_transaction():
+            if messages:
+                await BackfillPendingMessage.bulk_create(
+                    [
+                        BackfillPendingMessage(
+                            message_id=m.message_id, run_id=run_id, channel_id=channel_id,
+                            payload=m.model_dump(mode="json"),
+                        )
+                        for m in messages
+                    ],
+                    ignore_conflicts=True,
+                )
+            await self.save_channel_cursors({channel_id: cursor})
+
+    async def get_pending_messages(self, run_id: int) -> List[Message]:
+        rows = await BackfillPendingMessage.filter(run_id=run_id).order_by("message_id").values_list("payload", flat=True)
+        return [Message.model_validate(payload) for payload in rows]
+
+    async def complete_pending_messages(self, message_ids: Iterable[int]) -> None:
+        """Прибирає повідомлення з черги прогону після того, як їх збережено (або відсіяно)."""
+        for chunk in chunked(list(message_ids), EXISTENCE_CHUNK_SIZE):
+            await BackfillPendingMessage.filter(message_id__in=chunk).delete()
+
+    @staticmethod
+    async def _has_search_index(conn: BaseDBAsyncClient) -> bool:
+        if conn.capabilities.dialect != "sqlite":
+            return False
+        rows = await conn.execute_query_dict(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", [FTS_TABLE]
+        )
+        return bool(rows)
+
+    async def search_opportunities(self, text: str, limit: int = 50) -> List[dict]:
         """
-        Приймає список URL і повертає множину тих URL, які ВЖЕ існують у базі.
+        Повнотекстовий пошук по тексту повідомлень: [{id, rank, snippet}], найрелевантніші першими.
+        Збіги у сніпеті обгорнуті в [ ].
         """
-        if not message_urls:
-            return set()
+        query = to_fts_query(text)
+        conn = Opportunity._meta.db
+        if not query or not await self._has_search_index(conn):
+            return []
+        return await conn.execute_query_dict(SEARCH_SQL, [query, limit])
+
+    async def count_matches(self, text: str) -> int:
+        """Скільки повідомлень містять запит (без обмеження limit)."""
+        query = to_fts_query(text)
+        conn = Opportunity._meta.db
+        if not query or not await self._has_search_index(conn):
+            return 0
+        rows = await conn.execute_query_dict(COUNT_SQL, [query])
+        return rows[0]["matches"]
 
-        existing_records = await Opportunity.filter(message_url__in=message_urls).values_list('message_url', flat=True)
-        return set(existing_records)
\ No newline at end of file
+    async def rebuild_search_index(self) -> bool:
+        """Перебудовує FTS-індекс з нуля (після ручних правок БД або відновлення з бекапу)."""
+        conn = Opportunity._meta.db
+        if not await self._has_search_index(conn):
+            return False
+        for statement in FTS_REBUILD:
+            await conn.execute_query(statement)
+        return True
+
+    async def get_existing_message_ids(self, message_ids: Iterable[int]) -> Set[int]:
+        """
+        Приймає id повідомлень і повертає множину тих, що ВЖЕ існують у базі (або в архіві).
+        Запити йдуть чанками по unique-індексу message_id, тож розмір входу не обмежений.
+        """
+        existing: Set[int] = set()
+        for chunk in chunked(set(message_ids), EXISTENCE_CHUNK_SIZE):
+            existing.update(await Opportunity.filter(message_id__in=chunk).values_list("message_id", flat=True))
+            missing = [message_id for message_id in chunk if message_id not in existing]
+            if missing:
+                existing.update(
+                    await ArchivedMessage.filter(message_id__in=missing).values_list("message_id", flat=True)
+                )
+        return existing
\ No newline at end of file
@@ -30,6 +30,31 @@ class Message(BaseModel):
     timestamp: datetime
     jump_url: str
     keyword: Optional[str] = None
+    # Усі ключові слова, що спрацювали (keyword — перше з них)
+    keywords: List[str] = Field(default_factory=list)
+
+
+def message_id_from_url(jump_url: str) -> Optional[int]:
+    """Snowflake повідомлення з jump URL (https://discord.com/channels/<guild|@me>/<channel>/<message>)."""
+    tail = (jump_url or "").rstrip("/").rsplit("/", 1)[-1]
+    return int(tail) if tail.isdigit() else None
+
+
+class AICallRecord(BaseModel):
+    """
+    Облік одного виклику OpenAI (або частки пакетного виклику Stage 1).
+    """
+    stage: int
+    model: str
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    retries: int = 0
+    latency_ms: int = 0
+    cost_usd: float = 0.0
+    # Скільки повідомлень ділили цей виклик (пакетний Stage 1)
+    batch_size: int = 1
+    # Оплачений, але відкинутий результат (спекулятивний Stage 2 після JUNK у Stage 1)
+    discarded: bool = False
 
 
 class ValidationResult(BaseModel):
@@ -41,6 +66,8 @@ class ValidationResult(BaseModel):
     reason: Optional[str] = None
     lead_type: Optional[str] = None
     extracted_tech_stack: Optional[List[str]] = None
+    # Виклики AI, що дали цей результат (порожньо для кешу та stage zero)
+    ai_calls: List[AICallRecord] = Field(default_factory=list)
 
 
 class MessageOpportunity(BaseModel):
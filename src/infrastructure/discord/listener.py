@@ -1,6 +1,5 @@
 # src/infrastructure/discord/listener.py
 
-import asyncio
 from typing import Awaitable, Callable, List, Optional
 import discord
 import structlog
@@ -46,6 +45,17 @@ class Listener(commands.Bot):
             target_channels=(self._target_channels if not self._track_all else "ALL"),
         )
 
+    def update_channel_filter(self, track_all_channels: bool, target_channel_ids: Optional[List[int]] = None):
+        """Оновлює фільтр каналів без перепідключення (hot-reload конфігу)."""
+        self._target_channels = set(target_channel_ids or [])
+        self._track_all = track_all_channels
+        logger.info(
+            "Channel filter updated",
+            account=self._account_name,
+            track_all=self._track_all,
+            target_channels=(len(self._target_channels) if not self._track_all else "ALL"),
+        )
+
     async def on_ready(self):
         logger.info(
             "✅ Discord Listener is ready.",
@@ -72,8 +82,10 @@ class Listener(commands.Bot):
             log.debug("Empty content, skipping.")
             return
 
+        # Callback — це IngestionQueue.put: повертається одразу (або чекає місця
+        # у черзі при політиці 'block'), а обробку виконує пул воркерів.
+        await self._safe_pipeline_call(domain_msg)
         log.debug("Message queued for processing.")
-        asyncio.create_task(self._safe_pipeline_call(domain_msg))
 
     async def _safe_pipeline_call(self, domain_message: Message):
         log = logger.bind(msg_id=domain_message.message_id)
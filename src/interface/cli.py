@@ -16,9 +16,14 @@ PROJECT_ROOT_FOR_ENV = Path(__file__).resolve().parent.parent.parent
 load_dotenv(dotenv_path=PROJECT_ROOT_FOR_ENV / ".env")
 
 # Імпорти ваших bootstrap-утиліт і налаштувань
-from bootstrap import bootstrap_live_dependencies, bootstrap_backfill_service
+from bootstrap import (
+    bootstrap_live_dependencies, bootstrap_backfill_service, bootstrap_ingestion_queue, bootstrap_config_reloader,
+)
 from config import settings, configure_logging
 from config.settings import TORTOISE_CONFIG
+from database.archive import ArchiveStore
+from database.schema import ensure_schema, schema_status
+from database.storage import DatabaseStorage
 
 # Наш Listener-адаптер
 from infrastructure.discord.listener import Listener
@@ -26,6 +31,10 @@ from infrastructure.discord.listener import Listener
 # Сервіси для backfill, sync, export
 from application.services.sync_service import SyncService
 from application.services.export_service import ExportService
+from application.services.ai_cost_report_service import AICostReportService
+from application.services.retention_service import RetentionService
+from application.services.stage_zero_training_service import StageZeroTrainingService
+from application.utils import DiscordRateLimiter
 
 from utils import get_project_root
 
@@ -80,9 +89,14 @@ def live(
 
 # --- Інші команди ---
 @app.command()
-def backfill():
+def backfill(
+    resume: bool = typer.Option(
+        False, "--resume", help="Продовжити останній незавершений прогін: пропустити пройдені канали, "
+                                "повернути в AI незбережені повідомлення."
+    ),
+):
     """Запускає бота в режимі збору історії (backfill)."""
-    run_app("backfill", run_backfill_mode())
+    run_app("backfill", run_backfill_mode(resume))
 
 
 @app.command()
@@ -97,12 +111,103 @@ def export():
     run_app("export", run_export_mode())
 
 
+@app.command("train-stage-zero")
+def train_stage_zero():
+    """Навчає локальний stage-zero класифікатор на ручній сортировці та вердиктах AI."""
+    run_app("train-stage-zero", run_train_stage_zero_mode())
+
+
+@app.command("ai-costs")
+def ai_costs(
+    days: Optional[int] = typer.Option(None, "--days", "-d", help="Лише виклики за останні N днів."),
+    top: int = typer.Option(10, "--top", help="Скільки рядків показувати в розрізах."),
+):
+    """Реальні витрати на AI з таблиці ai_calls: моделі, вартість ліда, сервери, ключові слова."""
+    run_app("ai-costs", run_ai_costs_mode(days, top))
+
+
+@app.command("db-status")
+def db_status():
+    """Версія схеми БД (застосовані міграції) та плани виконання ключових запитів."""
+    run_app("db-status", run_db_status_mode())
+
+
+@app.command("archive")
+def archive(
+    dry_run: bool = typer.Option(False, "--dry-run", help="Лише порахувати, що буде заархівовано."),
+):
+    """Переносить холодні можливості в помісячні архівні файли за правилами database.retention."""
+    run_app("archive", run_archive_mode(dry_run))
+
+
+@app.command("archive-query")
+def archive_query(
+    sql: str = typer.Argument(..., help="SELECT над таблицями архіву (opportunities, ai_calls)."),
+    month: str = typer.Option("*", "--month", "-m", help="Шаблон місяців, напр. 2024-0* або 2024-03."),
+    limit: int = typer.Option(50, "--limit", "-n", help="Максимум рядків з кожного місяця (0 — без обмеження)."),
+):
+    """Read-only запит до заархівованих даних (кожен місяць — окремий файл)."""
+    configure_logging()
+    store = ArchiveStore(settings.database.retention.archive_dir)
+    total = 0
+    for archive_month, columns, rows in store.query(sql, pattern=month, limit=limit or None):
+        typer.echo(f"--- {archive_month} ({len(rows)} rows) ---")
+        typer.echo(" | ".join(columns))
+        for row in rows:
+            typer.echo(" | ".join("" if v is None else str(v) for v in row))
+        total += len(rows)
+    typer.echo(f"Total rows: {total}")
+
+
+@app.command("search")
+def search(
+    query: str = typer.Argument(..., help='Слова, "фраза в лапках" або префікс*.'),
+    limit: int = typer.Option(20, "--limit", "-n", help="Скільки найрелевантніших збігів показати."),
+):
+    """Повнотекстовий пошук (FTS5) по тексту збережених повідомлень."""
+    run_app("search", run_search_mode(query, limit))
+
+
+@app.command("search-rebuild")
+def search_rebuild():
+    """Перебудовує повнотекстовий індекс з нуля по поточному вмісту opportunities."""
+    run_app("search-rebuild", run_search_rebuild_mode())
+
+
+@app.command("bench-keywords")
+def bench_keywords(
+    messages: int = typer.Option(2000, "--messages", "-n", help="Кількість синтетичних повідомлень."),
+):
+    """Мікро-бенчмарк рушіїв ключових слів (regex vs Ахо-Корасік) на 10 / 1k / 10k слів."""
+    from interface.benchmarks import bench_keyword_engines
+
+    configure_logging()
+    for row in bench_keyword_engines(message_count=messages):
+        typer.echo(
+            f"{row['engine']:>13} | {row['keywords']:>6} kw | build {row['build_ms']:>8} ms"
+            f" | {row['us_per_message']:>8} µs/msg | hits {row['messages_with_hits']}"
+        )
+
+
+@app.command("bench-storage")
+def bench_storage(
+    sizes: str = typer.Option("1000,10000,100000", "--sizes", help="Розміри пакетів через кому."),
+):
+    """Бенчмарк пакетного збереження в БД (рядків/с) на тимчасовій SQLite-базі."""
+    from interface.benchmarks import bench_bulk_save
+
+    configure_logging()
+    rows = asyncio.run(bench_bulk_save([int(x) for x in sizes.split(",") if x.strip()]))
+    for row in rows:
+        typer.echo(f"{row['path']:>8} | {row['rows']:>7} rows | {row['seconds']:>8} s | {row['rows_per_sec']:>7} rows/s")
+
+
 # --- Загальна логіка з DB ---
 async def run_with_db(service_coro: Awaitable[None]):
     """Ініціює Tortoise, виконує корутину, закриває з'єднання."""
     try:
         await Tortoise.init(config=TORTOISE_CONFIG)
-        await Tortoise.generate_schemas()
+        await ensure_schema()
         # Гарантуємо, що в таблиці є Backfill-Client
         from database.models import DiscordAccount
         await DiscordAccount.get_or_create(id=0, defaults={"name": "Backfill-Client"})
@@ -138,57 +243,101 @@ async def run_live_mode(specific_account_name: Optional[str] = None):
             logger.error(f"Акаунт '{specific_account_name}' не знайдено.")
             return
 
-    pipeline, _ = bootstrap_live_dependencies()
+    pipeline, db_storage = bootstrap_live_dependencies()
+    queue = bootstrap_ingestion_queue(pipeline, db_storage)
+    reloader = bootstrap_config_reloader(pipeline)
     tasks = []
     for acc in accounts:
         client = Listener(
-            pipeline_callback    = pipeline.process_message,
+            pipeline_callback    = queue.put,
             track_all_channels   = settings.discord.track_all_channels,
             target_channel_ids   = settings.discord.channel_whitelist,
             account_name         = acc.name          # ← Оце обов’язково!
         )
+        reloader.subscribe(
+            lambda new, client=client: client.update_channel_filter(
+                new.discord.track_all_channels, new.discord.channel_whitelist
+            )
+        )
         token = acc.token.get_secret_value()
         tasks.append(run_client_simple(client, token, acc.name))
 
-    await run_with_db(asyncio.gather(*tasks))
+    await run_with_db(_run_live_clients(queue, reloader, pipeline.recorder, tasks))
+
 
+async def _run_live_clients(queue, reloader, recorder, client_coros):
+    """Запускає воркери черги та hot-reload конфігу на час роботи клієнтів і коректно зупиняє їх."""
+    queue.start()
+    reloader.start()
+    try:
+        await asyncio.gather(*client_coros)
+    finally:
+        await reloader.stop()
+        await queue.stop()
+        # Останнім — записувач: дописує те, що воркери встигли передати
+        await recorder.close()
 
-# --- BackfillClient залишається без змін ---
+
+# --- BackfillClient ---
 class BackfillClient(discord.Client):
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self._finished = asyncio.Event()
+    """Клієнт одного акаунта в backfill: лише логін і кеш гільдій; історію збирає BackfillService."""
+
+    def __init__(self, *args, account_name: str, **kwargs):
+        # Обмежувач акаунта читає заголовки всіх відповідей його HTTP-сесії
+        self.rate_limiter = DiscordRateLimiter.from_settings(settings.discord)
+        super().__init__(*args, http_trace=self.rate_limiter.trace_config(), **kwargs)
+        self.account_name = account_name
+        self.ready_event = asyncio.Event()
 
     async def on_ready(self):
-        logger.info("Backfill client is ready.", user=str(self.user))
-        try:
-            service = bootstrap_backfill_service(self)
-            await run_with_db(service.run())
-        except Exception:
-            logger.critical("Backfill service failed during execution", exc_info=True)
-        finally:
-            await self.close()
+        logger.info("Backfill client is ready.", user=str(self.user), account=self.account_name)
+        self.ready_event.set()
 
-    async def close(self):
-        if not self._finished.is_set():
-            self._finished.set()
-            await super().close()
 
-    async def wait_until_finished(self):
-        await self._finished.wait()
+# Скільки чекати на on_ready кожного акаунта, перш ніж працювати без нього
+BACKFILL_LOGIN_TIMEOUT_SECONDS = 60.0
 
 
-async def run_backfill_mode():
-    logger.info("Starting backfill client...")
-    if not settings.discord.accounts:
+async def _wait_backfill_client(client: BackfillClient, start_task: asyncio.Task) -> bool:
+    """True — клієнт готовий; False — логін упав (start_task завершився) або не вклався в таймаут."""
+    ready = asyncio.create_task(client.ready_event.wait())
+    try:
+        await asyncio.wait({ready, start_task}, timeout=BACKFILL_LOGIN_TIMEOUT_SECONDS,
+                           return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        ready.cancel()
+    if not client.ready_event.is_set():
+        logger.warning("Backfill account is not ready, skipping it.", account=client.account_name)
+        return False
+    return True
+
+
+async def run_backfill_mode(resume: bool = False):
+    logger.info("Starting backfill clients...")
+    accounts = settings.discord.accounts
+    if not accounts:
         logger.error("Немає акаунтів для запуску backfill.")
         return
-    first_token = settings.discord.accounts[0].token.get_secret_value()
-    client = BackfillClient(self_bot=True)
+
+    # Логінимо всі акаунти: канали, які бачить лише один із них, теж потрапляють у backfill
+    clients = [BackfillClient(self_bot=True, account_name=acc.name) for acc in accounts]
+    start_tasks = [
+        asyncio.create_task(run_client_simple(client, acc.token.get_secret_value(), acc.name))
+        for client, acc in zip(clients, accounts)
+    ]
     try:
-        await asyncio.gather(client.start(first_token), client.wait_until_finished())
-    except (KeyboardInterrupt, asyncio.CancelledError):
-        await client.close()
+        ready = await asyncio.gather(*(_wait_backfill_client(c, t) for c, t in zip(clients, start_tasks)))
+        ready_clients = [client for client, ok in zip(clients, ready) if ok]
+        if not ready_clients:
+            logger.error("Жоден акаунт не залогінився, backfill скасовано.")
+            return
+        logger.info("Backfill accounts ready", ready=len(ready_clients), configured=len(clients))
+        service = bootstrap_backfill_service(ready_clients, resume=resume)
+        await run_with_db(service.run())
+    finally:
+        for client in clients:
+            await client.close()
+        await asyncio.gather(*start_tasks, return_exceptions=True)
 
 
 # --- Sync і Export ---
@@ -202,5 +351,110 @@ async def run_export_mode():
     await run_with_db(service.run())
 
 
+async def run_train_stage_zero_mode():
+    service = StageZeroTrainingService()
+    await run_with_db(service.run())
+
+
+async def run_ai_costs_mode(days: Optional[int], top: int):
+    service = AICostReportService(days=days, top=top)
+    report = {}
+
+    async def _collect():
+        report.update(await service.run())
+
+    await run_with_db(_collect())
+    if not report:
+        return
+
+    totals = report["totals"]
+    cpl = f"${totals['cost_per_lead_usd']:.4f}" if totals["cost_per_lead_usd"] is not None else "n/a"
+    lpd = f"{totals['leads_per_usd']:.1f}" if totals["leads_per_usd"] is not None else "n/a"
+    typer.echo(f"Calls: {totals['calls']} | Cost: ${totals['cost_usd']:.4f} | Leads: {totals['leads']}"
+               f" | Cost per lead: {cpl} | Leads per $: {lpd}")
+    typer.echo(f"Discarded speculative Stage 2: ${totals['discarded_cost_usd']:.4f}")
+
+    typer.echo("\nBy stage / model:")
+    for row in report["by_model"]:
+        typer.echo(
+            f"  stage {row['stage']} {row['model']:<24} calls {row['calls']:>7} | in {row['prompt_tokens']:>10}"
+            f" | out {row['completion_tokens']:>9} | retries {row['retries']:>5}"
+            f" | avg {row['avg_latency_ms'] or 0:>7.0f} ms | ${row['cost_usd']:.4f}"
+            f" (discarded ${row['discarded_cost_usd']:.4f})"
+        )
+    for title, key in (("By server", "by_server"), ("By keyword", "by_keyword")):
+        typer.echo(f"\n{title}:")
+        for row in report[key]:
+            per_lead = f"${row['cost_usd'] / row['leads']:.4f}/lead" if row["leads"] else "no leads"
+            typer.echo(f"  {row['name'][:40]:<40} ${row['cost_usd']:.4f} | msgs {row['messages']:>6}"
+                       f" | leads {row['leads']:>4} | {per_lead}")
+
+
+async def run_db_status_mode():
+    # Не через run_with_db: ensure_schema() застосував би міграції, і "pending" завжди був би порожнім
+    try:
+        await Tortoise.init(config=TORTOISE_CONFIG)
+        status = await schema_status()
+    finally:
+        await Tortoise.close_connections()
+
+    typer.echo(f"Schema version: {status['version']} (latest {status['latest']})")
+    for row in status["applied"]:
+        typer.echo(f"  [{row['version']:>3}] {row['name']:<40} applied {row['applied_at']}")
+    for migration in status["pending"]:
+        typer.echo(f"  [{migration.version:>3}] {migration.name:<40} PENDING")
+
+    typer.echo("\nQuery plans:")
+    for name, plan in status["plans"].items():
+        typer.echo(f"  {name}:")
+        for line in plan:
+            typer.echo(f"    {line}")
+
+
+async def run_archive_mode(dry_run: bool):
+    service = RetentionService(settings.database.retention, dry_run=dry_run)
+    result = {}
+
+    async def _run():
+        result.update(await service.run())
+
+    await run_with_db(_run())
+    if not result:
+        return
+
+    typer.echo(f"{'Would archive' if dry_run else 'Archived'}: {result['archived']} opportunities")
+    for archive_month, count in result["by_month"].items():
+        typer.echo(f"  {archive_month}: {count}")
+
+
+async def run_search_mode(query: str, limit: int):
+    storage = DatabaseStorage()
+    found = {}
+
+    async def _collect():
+        found["total"] = await storage.count_matches(query)
+        found["hits"] = await storage.search_opportunities(query, limit=limit)
+
+    await run_with_db(_collect())
+    if not found:
+        return
+
+    typer.echo(f"Matches: {found['total']}")
+    for hit in found["hits"]:
+        typer.echo(f"  #{hit['id']:<8} {hit['rank']:>8.2f}  {hit['snippet']}")
+
+
+async def run_search_rebuild_mode():
+    storage = DatabaseStorage()
+
+    async def _rebuild():
+        if await storage.rebuild_search_index():
+            logger.info("Full-text index rebuilt.")
+        else:
+            logger.warning("Full-text index is not available for this database.")
+
+    await run_with_db(_rebuild())
+
+
 if __name__ == "__main__":
     app()
@@ -0,0 +1,28 @@
+# tests/conftest.py
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+# Код застосунку імпортується як пакети верхнього рівня з src/ (так само, як у CLI)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+
+@pytest.fixture
+def run_with_memory_db():
+    """Виконує корутинну функцію на чистій SQLite-базі в пам'яті зі схемою та міграціями."""
+    from tortoise import Tortoise
+    from database.schema import ensure_schema
+
+    def _run(test_coro_fn):
+        async def _main():
+            await Tortoise.init(db_url="sqlite://:memory:", modules={"models": ["database.models"]})
+            try:
+                await ensure_schema()
+                return await test_coro_fn()
+            finally:
+                await Tortoise.close_connections()
+        return asyncio.run(_main())
+
+    return _run
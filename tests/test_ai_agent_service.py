@@ -0,0 +1,71 @@
+# tests/test_ai_agent_service.py
+import asyncio
+from datetime import datetime, timezone
+
+import pytest
+
+from application.services import ai_agent_service
+from application.services.ai_agent_service import AIAgentService, StageOneBatchItem, StageOneBatchResult
+from domain.models import AICallRecord, Message
+
+BATCH_CALL = AICallRecord(stage=1, model="gpt-4o-mini", prompt_tokens=1000, completion_tokens=90, cost_usd=0.009)
+
+
+def _message(message_id):
+    return Message(
+        message_id=message_id, channel_id=1, channel_name="c", guild_id=None, guild_name=None,
+        author_id=1, author_name="a", content=f"text {message_id}", timestamp=datetime.now(timezone.utc),
+        jump_url=f"https://discord.com/channels/@me/1/{message_id}",
+    )
+
+
+def _verdict(message_id):
+    return StageOneBatchItem(message_id=str(message_id), verdict="POTENTIAL", confidence=0.9, reason="r")
+
+
+@pytest.fixture
+def agent(monkeypatch):
+    monkeypatch.setattr(ai_agent_service, "aclient", object())
+    unlinked = []
+
+    async def sink(calls):
+        unlinked.extend(calls)
+
+    service = AIAgentService(unlinked_calls_sink=sink)
+    service.unlinked = unlinked
+    return service
+
+
+def _answer(agent, items):
+    async def fake_completion(log, stage, calls, **kwargs):
+        calls.append(BATCH_CALL)
+        return StageOneBatchResult(results=items)
+    agent._create_completion = fake_completion
+
+
+def test_batch_without_matching_verdicts_is_recorded_unlinked(agent):
+    _answer(agent, [_verdict(999)])  # id, якого не було в пакеті
+    results = asyncio.run(agent._validate_stage_one_batch([_message(1), _message(2), _message(3)]))
+    assert results == {}
+    assert agent.unlinked == [BATCH_CALL]
+
+
+def test_partial_batch_spreads_whole_cost_over_verdicts(agent):
+    _answer(agent, [_verdict(1), _verdict(3)])
+    results = asyncio.run(agent._validate_stage_one_batch([_message(1), _message(2), _message(3)]))
+    assert set(results) == {1, 3}
+    shares = [call for result in results.values() for call in result.ai_calls]
+    assert sum(c.prompt_tokens for c in shares) == BATCH_CALL.prompt_tokens
+    assert sum(c.completion_tokens for c in shares) == BATCH_CALL.completion_tokens
+    assert sum(c.cost_usd for c in shares) == pytest.approx(BATCH_CALL.cost_usd)
+    assert agent.unlinked == []
+
+
+def test_failed_batch_is_recorded_unlinked(agent):
+    async def failing_completion(log, stage, calls, **kwargs):
+        calls.append(BATCH_CALL)
+        raise RuntimeError("unparsable")
+    agent._create_completion = failing_completion
+    with pytest.raises(RuntimeError):
+        asyncio.run(agent._validate_stage_one_batch([_message(1), _message(2)]))
+    assert agent.unlinked == [BATCH_CALL]
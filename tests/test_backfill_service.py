@@ -0,0 +1,63 @@
+# tests/test_backfill_service.py
+import asyncio
+import types
+from datetime import datetime, timedelta, timezone
+
+from discord.utils import time_snowflake
+
+from application.services.backfill_service import BackfillAccount, BackfillService
+from application.utils import DiscordRateLimiter
+
+
+class _Channel:
+    id = 42
+    name = "general"
+
+    def __init__(self):
+        self.requested_after = []
+
+    async def history(self, limit, after, oldest_first):
+        self.requested_after.append(after.id)
+        return
+        yield
+
+
+class _Storage:
+    def __init__(self, cursor=None, last_seen=None):
+        self._cursor, self._last_seen = cursor, last_seen
+
+    async def get_channel_cursor(self, channel_id):
+        return self._cursor
+
+    async def get_latest_message_timestamp(self, channel_id):
+        return self._last_seen
+
+    async def mark_channel_finished(self, run_id, channel_id):
+        pass
+
+
+def _history_start(storage, cutoff):
+    channel = _Channel()
+    client = types.SimpleNamespace(user=types.SimpleNamespace(id=1))
+    account = BackfillAccount(client=client, name="a", rate_limiter=DiscordRateLimiter(1000))
+    service = BackfillService(accounts=[account], pipeline=None, db_storage=storage)
+    asyncio.run(service._stream_and_process_channel(account, channel, cutoff))
+    return channel.requested_after[0]
+
+
+def test_stale_cursor_is_clamped_to_history_window():
+    cutoff = datetime.now(timezone.utc) - timedelta(days=7)
+    stale = time_snowflake(datetime.now(timezone.utc) - timedelta(days=300), high=True)
+    assert _history_start(_Storage(cursor=stale), cutoff) == time_snowflake(cutoff, high=True)
+
+
+def test_recent_cursor_is_kept():
+    cutoff = datetime.now(timezone.utc) - timedelta(days=7)
+    recent = time_snowflake(datetime.now(timezone.utc) - timedelta(days=1), high=True)
+    assert _history_start(_Storage(cursor=recent), cutoff) == recent
+
+
+def test_old_last_seen_message_is_clamped_too():
+    cutoff = datetime.now(timezone.utc) - timedelta(days=7)
+    storage = _Storage(last_seen=datetime.now(timezone.utc) - timedelta(days=90))
+    assert _history_start(storage, cutoff) == time_snowflake(cutoff, high=True)
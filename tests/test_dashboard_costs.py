@@ -0,0 +1,21 @@
+# tests/test_dashboard_costs.py
+import pandas as pd
+import pytest
+
+from dashboard.constants import COST_PER_AI_REQUEST_USD
+from dashboard.costs import with_estimated_costs
+
+
+def test_estimate_applies_only_to_rows_without_ai_calls():
+    df = pd.DataFrame({
+        "id": [1, 2, 3],
+        "ai_calls": [0, 2, None],
+        "ai_cost_usd": [0.0, 0.004, None],
+    })
+    out = with_estimated_costs(df)
+    assert out["cost_estimated"].tolist() == [True, False, True]
+    assert out["ai_cost_usd"].tolist() == pytest.approx([COST_PER_AI_REQUEST_USD, 0.004, COST_PER_AI_REQUEST_USD])
+    assert out["ai_calls"].tolist() == [1, 2, 1]
+    assert out["ai_cost_usd"].sum() == pytest.approx(0.004 + 2 * COST_PER_AI_REQUEST_USD)
+    # вхідний DataFrame не змінюється
+    assert df["ai_cost_usd"].tolist()[0] == 0.0
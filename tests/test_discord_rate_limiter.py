@@ -0,0 +1,179 @@
+# tests/test_discord_rate_limiter.py
+import asyncio
+from types import SimpleNamespace
+
+import aiohttp
+import discord
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from application.utils import DiscordRateLimiter, route_bucket
+
+HISTORY = ("GET /channels/{channel_id}/messages", 1)
+OTHER = ("GET /channels/{channel_id}/messages", 2)
+
+
+def _http_error(status: int, headers=None, payload=None) -> discord.HTTPException:
+    response = SimpleNamespace(status=status, reason="error", headers=headers or {})
+    return discord.HTTPException(response, payload or {"message": "error"})
+
+
+def _limiter(**kwargs) -> DiscordRateLimiter:
+    kwargs.setdefault("requests_per_second", 0)
+    kwargs.setdefault("backoff_base_seconds", 0.01)
+    kwargs.setdefault("backoff_max_seconds", 0.01)
+    return DiscordRateLimiter(**kwargs)
+
+
+async def _elapsed(coro) -> float:
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    await coro
+    return loop.time() - start
+
+
+def test_route_bucket_parses_channel_routes():
+    assert route_bucket("get", "/api/v9/channels/1/messages") == HISTORY
+    assert route_bucket("GET", "/channels/5") == ("GET /channels/{channel_id}", 5)
+    assert route_bucket("GET", "/api/v9/users/@me") is None
+
+
+def test_blocked_bucket_does_not_stall_other_buckets():
+    async def main():
+        limiter = _limiter()
+        limiter.update_from_headers(HISTORY, {"X-RateLimit-Remaining": "0", "X-RateLimit-Reset-After": "0.2"})
+        other = await _elapsed(limiter.acquire(OTHER))
+        blocked = await _elapsed(limiter.acquire(HISTORY))
+        return other, blocked
+
+    other, blocked = asyncio.run(main())
+    assert other < 0.05
+    assert blocked >= 0.18
+
+
+def test_remaining_requests_do_not_block():
+    async def main():
+        limiter = _limiter()
+        limiter.update_from_headers(HISTORY, {"X-RateLimit-Remaining": "3", "X-RateLimit-Reset-After": "5"})
+        return await _elapsed(limiter.acquire(HISTORY))
+
+    assert asyncio.run(main()) < 0.05
+
+
+def test_global_ceiling_spaces_requests_across_buckets():
+    async def main():
+        limiter = _limiter(requests_per_second=20)
+        keys = [("GET /channels/{channel_id}/messages", i) for i in range(5)]
+        return await _elapsed(asyncio.gather(*(limiter.acquire(k) for k in keys)))
+
+    # 5 слотів по 50 мс: перший одразу, останній — через ~200 мс
+    assert asyncio.run(main()) >= 0.18
+
+
+def test_global_429_blocks_every_bucket():
+    async def main():
+        limiter = _limiter()
+        retry_after, is_global = limiter._retry_after(
+            _http_error(429, {"X-RateLimit-Global": "true"}, {"message": "slow", "retry_after": 0.2})
+        )
+        limiter.block(HISTORY, retry_after, is_global)
+        return is_global, await _elapsed(limiter.acquire(OTHER))
+
+    is_global, other = asyncio.run(main())
+    assert is_global
+    assert other >= 0.18
+
+
+def test_429_is_retried_and_counted():
+    async def main():
+        limiter = _limiter()
+        calls = 0
+
+        async def request():
+            nonlocal calls
+            calls += 1
+            if calls == 1:
+                raise _http_error(429, payload={"message": "slow", "retry_after": 0.01})
+            return "ok"
+
+        return await limiter.call(HISTORY, request), calls, limiter.stats()
+
+    result, calls, stats = asyncio.run(main())
+    assert (result, calls) == ("ok", 2)
+    assert stats["discord_rate_limited"] == 1
+    assert stats["discord_retries"] == 1
+
+
+def test_429_waits_retry_after_before_retrying():
+    async def main():
+        limiter = _limiter()
+        attempts = []
+
+        async def request():
+            attempts.append(asyncio.get_running_loop().time())
+            if len(attempts) == 1:
+                raise _http_error(429, {"Retry-After": "0.2"})
+            return "ok"
+
+        await limiter.call(HISTORY, request)
+        return attempts[1] - attempts[0]
+
+    assert asyncio.run(main()) >= 0.18
+
+
+def test_server_errors_are_retried_until_max_retries():
+    async def main():
+        limiter = _limiter(max_retries=2)
+        calls = 0
+
+        async def request():
+            nonlocal calls
+            calls += 1
+            raise _http_error(503)
+
+        with pytest.raises(discord.HTTPException):
+            await limiter.call(HISTORY, request)
+        return calls, limiter.stats()
+
+    calls, stats = asyncio.run(main())
+    assert calls == 3
+    assert stats["discord_retries"] == 2
+
+
+def test_client_errors_are_not_retried():
+    async def main():
+        limiter = _limiter()
+        calls = 0
+
+        async def request():
+            nonlocal calls
+            calls += 1
+            raise _http_error(404)
+
+        with pytest.raises(discord.HTTPException):
+            await limiter.call(HISTORY, request)
+        return calls
+
+    assert asyncio.run(main()) == 1
+
+
+def test_trace_config_feeds_successful_response_headers():
+    async def handler(_request):
+        return web.json_response([], headers={"X-RateLimit-Remaining": "0", "X-RateLimit-Reset-After": "0.2"})
+
+    async def main():
+        app = web.Application()
+        app.router.add_get("/api/v9/channels/1/messages", handler)
+        limiter = _limiter()
+        async with TestServer(app) as server:
+            async with aiohttp.ClientSession(trace_configs=[limiter.trace_config()]) as session:
+                async with session.get(server.make_url("/api/v9/channels/1/messages?limit=100")) as response:
+                    assert response.status == 200
+        other = await _elapsed(limiter.acquire(OTHER))
+        blocked = await _elapsed(limiter.acquire(HISTORY))
+        return other, blocked
+
+    other, blocked = asyncio.run(main())
+    assert other < 0.05
+    assert blocked >= 0.15
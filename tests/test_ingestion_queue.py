@@ -0,0 +1,87 @@
+# tests/test_ingestion_queue.py
+import asyncio
+from datetime import datetime, timezone
+
+from application.ingestion_queue import IngestionQueue
+from config.settings import IngestionSettings
+from domain.models import Message
+
+
+def _message(message_id):
+    return Message(
+        message_id=message_id, channel_id=1, channel_name="c", guild_id=None, guild_name=None,
+        author_id=1, author_name="a", content="x", timestamp=datetime.now(timezone.utc),
+        jump_url=f"https://discord.com/channels/@me/1/{message_id}",
+    )
+
+
+def test_block_policy_bounds_waiting_producers_under_flood(tmp_path):
+    config = IngestionSettings(queue_size=10, workers=2, overflow_policy='block', max_blocked_producers=50,
+                               spill_path=tmp_path / "queue.jsonl", stats_interval_seconds=0)
+    flood = 5_000
+
+    async def scenario():
+        gate = asyncio.Event()
+        processed = []
+
+        async def handler(message, **_):
+            await gate.wait()
+            processed.append(message.message_id)
+
+        queue = IngestionQueue(handler, config)
+        queue.start()
+        # Як у discord.py: кожна подія — окрема задача продюсера
+        producers = [asyncio.create_task(queue.put(_message(i), 0, "bot", "live")) for i in range(flood)]
+        await asyncio.sleep(0.05)
+
+        stats = queue.stats()
+        waiting = sum(not p.done() for p in producers)
+        gate.set()
+        await asyncio.gather(*producers)
+        while len(processed) < flood:
+            await asyncio.sleep(0.01)
+        await queue.stop()
+        return stats, waiting, processed
+
+    stats, waiting, processed = asyncio.run(scenario())
+    # У пам'яті: не більше черги, воркерів і max_blocked_producers; решта — на диску
+    assert waiting <= config.max_blocked_producers
+    assert stats["blocked_producers"] <= config.max_blocked_producers
+    assert stats["depth"] <= config.queue_size
+    assert stats["in_flight"] <= config.workers
+    assert stats["depth"] + stats["in_flight"] + stats["blocked_producers"] + stats["spill_pending"] == flood
+    # Нічого не загублено і не оброблено двічі
+    assert sorted(processed) == list(range(flood))
+    assert not (tmp_path / "queue.jsonl").exists()
+
+
+def test_spill_survives_restart_without_replay_or_reorder(tmp_path):
+    config = IngestionSettings(queue_size=3, workers=1, overflow_policy='spill',
+                               spill_path=tmp_path / "queue.jsonl", stats_interval_seconds=0)
+
+    async def scenario():
+        processed = []
+        gate = asyncio.Event()
+
+        async def slow(message, **_):
+            processed.append(message.message_id)
+            if len(processed) >= 3:
+                await gate.wait()
+
+        queue = IngestionQueue(slow, config)
+        queue.start()
+        for i in range(1, 11):
+            await queue.put(_message(i), 0, "bot", "live")
+        await asyncio.sleep(0.05)
+        await queue.stop()
+
+        async def fast(message, **_):
+            processed.append(message.message_id)
+
+        queue = IngestionQueue(fast, config)
+        queue.start()
+        await asyncio.sleep(0.1)
+        await queue.stop()
+        return processed
+
+    assert asyncio.run(scenario()) == list(range(1, 11))
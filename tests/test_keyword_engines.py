@@ -0,0 +1,82 @@
+# tests/test_keyword_engines.py
+import random
+
+import pytest
+
+from application.services.keyword_engines import (
+    AhoCorasickKeywordEngine,
+    KeywordMatch,
+    RegexKeywordEngine,
+    build_keyword_engine,
+)
+
+KEYWORDS = ["react", "python", "розробник", "Django", "help"]
+TEXTS = [
+    "Need a React developer and python help",
+    "reactjs, pythonic, helpful — не ключові слова",
+    "Шукаю РОЗРОБНИКА? ні, шукаю розробник на Django!",
+    "help_me react_native react-native (react) REACT.",
+    "",
+]
+
+
+@pytest.mark.parametrize("text", TEXTS)
+def test_engines_agree_on_non_overlapping_keywords(text):
+    assert AhoCorasickKeywordEngine(KEYWORDS).find_all(text) == RegexKeywordEngine(KEYWORDS).find_all(text)
+
+
+def test_engines_agree_on_random_texts():
+    rng = random.Random(42)
+    vocabulary = KEYWORDS + ["reactor", "pyth", "developer", "розробники", "Help!", "_help", "дjango", "-", "..."]
+    regex, aho = RegexKeywordEngine(KEYWORDS), AhoCorasickKeywordEngine(KEYWORDS)
+    for _ in range(500):
+        text = "".join(rng.choice(vocabulary) + rng.choice([" ", "", ",", "\n"]) for _ in range(12))
+        assert aho.find_all(text) == regex.find_all(text), text
+
+
+def test_overlapping_keywords_are_all_reported():
+    keywords = ["react", "react native", "native"]
+    text = "Senior React Native dev"
+
+    aho = AhoCorasickKeywordEngine(keywords).find_all(text)
+    regex = RegexKeywordEngine(keywords).find_all(text)
+
+    assert aho == [
+        KeywordMatch("react native", 7, 19),
+        KeywordMatch("react", 7, 12),
+        KeywordMatch("native", 13, 19),
+    ]
+    # регулярка бачить лише неперекривні збіги — підмножину автомата
+    assert set(regex) <= set(aho)
+
+
+def test_word_boundaries_follow_regex_semantics():
+    engine = AhoCorasickKeywordEngine(["go", "c++"])
+
+    assert engine.find_all("go, golang, ago, go_lang, ok go") == [
+        KeywordMatch("go", 0, 2), KeywordMatch("go", 29, 31),
+    ]
+    # межа потрібна лише біля "словесного" краю ключового слова
+    assert engine.find_all("c++ and abc++") == [KeywordMatch("c++", 0, 3)]
+
+
+def test_case_folding_keeps_positions_and_canonical_keyword():
+    engine = AhoCorasickKeywordEngine(["Розробник", "react"])
+    # 'İ'.lower() має два символи — позиції після нього не мають зсуватися
+    text = "İİ REACT та РОЗРОБНИК"
+
+    matches = engine.find_all(text)
+
+    assert [(m.keyword, text[m.start:m.end]) for m in matches] == [("react", "REACT"), ("Розробник", "РОЗРОБНИК")]
+
+
+def test_duplicate_and_blank_keywords_are_ignored():
+    engine = AhoCorasickKeywordEngine(["React", "react", " ", ""])
+
+    assert engine.find_all("react") == [KeywordMatch("React", 0, 5)]
+
+
+def test_build_keyword_engine_rejects_unknown_names():
+    assert isinstance(build_keyword_engine("aho_corasick", ["a"]), AhoCorasickKeywordEngine)
+    with pytest.raises(ValueError):
+        build_keyword_engine("trie", ["a"])
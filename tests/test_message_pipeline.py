@@ -0,0 +1,96 @@
+# tests/test_message_pipeline.py
+import asyncio
+from datetime import datetime, timezone
+
+from application.message_pipeline import MessagePipeline
+from application.services.speculative_stage_two import SpeculationPolicy
+from config.settings import SpeculativeSettings
+from domain.models import AICallRecord, Message, ValidationResult, ValidationStatus
+
+
+class _Recorder:
+    def __init__(self):
+        self.unlinked = []
+
+    async def record_unlinked_ai_calls(self, calls):
+        self.unlinked.extend(calls)
+
+    def stats(self):
+        return {}
+
+
+def _message(message_id=1):
+    return Message(
+        message_id=message_id, channel_id=10, channel_name="c", guild_id=None, guild_name=None,
+        author_id=5, author_name="a", content="need a react developer", timestamp=datetime.now(timezone.utc),
+        jump_url=f"https://discord.com/channels/@me/10/{message_id}", keyword="react", keywords=["react"],
+    )
+
+
+def _pipeline(stage_one_status):
+    recorder = _Recorder()
+    pipeline = MessagePipeline(recorder)
+    pipeline._speculation = SpeculationPolicy(SpeculativeSettings(enabled=True, strong_keywords=["react"]))
+    pipeline._speculation._warmed_up = True
+
+    async def stage_one(message):
+        await asyncio.sleep(0.01)
+        return ValidationResult(status=stage_one_status, reason="s1")
+
+    async def stage_two(message):
+        await asyncio.sleep(0.05)
+        call = AICallRecord(stage=2, model="gpt-4o", prompt_tokens=900, completion_tokens=40, cost_usd=0.01)
+        return ValidationResult(status=ValidationStatus.RELEVANT, reason="s2", ai_calls=[call])
+
+    pipeline._run_stage_one = stage_one
+    pipeline._run_stage_two = stage_two
+    return pipeline, recorder
+
+
+def test_discarded_speculative_stage_two_is_recorded_as_discarded():
+    async def scenario():
+        pipeline, recorder = _pipeline(ValidationStatus.UNRELEVANT)
+        opportunity = await pipeline._validate_live(_message())
+        # Вердикт не чекає на відкинутий Stage 2...
+        assert opportunity.stage_two_validation is None
+        assert recorder.unlinked == []
+        # ...а його витрати потрапляють в облік, щойно прийде відповідь
+        await asyncio.gather(*pipeline._discarded_tasks)
+        return recorder.unlinked
+
+    unlinked = asyncio.run(scenario())
+    assert len(unlinked) == 1
+    assert unlinked[0].discarded and unlinked[0].stage == 2 and unlinked[0].prompt_tokens == 900
+
+
+def test_used_speculative_stage_two_is_not_recorded_separately():
+    async def scenario():
+        pipeline, recorder = _pipeline(ValidationStatus.POSSIBLY_RELEVANT)
+        opportunity = await pipeline._validate_live(_message())
+        return opportunity, recorder.unlinked, pipeline._discarded_tasks
+
+    opportunity, unlinked, pending = asyncio.run(scenario())
+    assert opportunity.stage_two_validation.status == ValidationStatus.RELEVANT
+    assert not opportunity.stage_two_validation.ai_calls[0].discarded
+    assert unlinked == [] and not pending
+
+
+def test_stats_include_deduplicator_counters():
+    async def scenario():
+        pipeline, _ = _pipeline(ValidationStatus.UNRELEVANT)
+
+        async def validate(message, live=False):
+            await asyncio.sleep(0.01)
+            return None
+
+        pipeline.validate_and_get_opportunity = validate
+        message = _message()
+        # два акаунти одночасно + повтор уже обробленого повідомлення
+        await asyncio.gather(*(pipeline.process_message(message, bot_id, f"bot{bot_id}", "live") for bot_id in (1, 2)))
+        await pipeline.process_message(message, 3, "bot3", "live")
+        return pipeline.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["dedupe_unique"] == 1
+    assert stats["dedupe_coalesced"] == 1
+    assert stats["dedupe_recent_duplicates"] == 1
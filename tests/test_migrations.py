@@ -0,0 +1,84 @@
+# tests/test_migrations.py
+import asyncio
+import random
+
+from tortoise import Tortoise
+
+from database.migrations import LATEST_VERSION, MIGRATIONS, VERSION_TABLE, apply_migrations
+from database.schema import ensure_schema, schema_status
+from database.storage import DatabaseStorage
+from interface.benchmarks import _synthetic_opportunities
+
+
+def _conn():
+    return Tortoise.get_connection("default")
+
+
+async def _versions():
+    rows = await _conn().execute_query_dict(f"SELECT version, applied_at FROM {VERSION_TABLE} ORDER BY version")
+    return [(row["version"], row["applied_at"]) for row in rows]
+
+
+async def _table_exists(name):
+    rows = await _conn().execute_query_dict("SELECT 1 FROM sqlite_master WHERE name = ?", [name])
+    return bool(rows)
+
+
+def test_fresh_database_records_every_migration(run_with_memory_db):
+    async def scenario():
+        return await _versions()
+
+    versions = run_with_memory_db(scenario)
+    assert [version for version, _ in versions] == [m.version for m in MIGRATIONS]
+    assert LATEST_VERSION == MIGRATIONS[-1].version
+
+
+def test_migrations_are_idempotent(run_with_memory_db):
+    async def scenario():
+        before = await _versions()
+        again = await ensure_schema()
+        # кілька процесів одночасно — кожна міграція все одно записана один раз
+        concurrent = await asyncio.gather(*(apply_migrations() for _ in range(3)))
+        return before, again, concurrent, await _versions()
+
+    before, again, concurrent, after = run_with_memory_db(scenario)
+    assert again == LATEST_VERSION
+    assert concurrent == [LATEST_VERSION] * 3
+    assert after == before
+
+
+def test_reapplied_migration_backfills_message_id(run_with_memory_db):
+    async def scenario():
+        opportunities = _synthetic_opportunities(3, random.Random(1))
+        await DatabaseStorage().save_opportunities_batch(opportunities, 1, "bot", "backfill")
+        # Стан БД до міграції 3: колонки message_id ще нема
+        await _conn().execute_query("DROP INDEX uq_opportunities_message_id")
+        await _conn().execute_query("ALTER TABLE opportunities DROP COLUMN message_id")
+        await _conn().execute_query(f"DELETE FROM {VERSION_TABLE} WHERE version = 3")
+
+        status = await schema_status()
+        await apply_migrations()
+        rows = await _conn().execute_query_dict("SELECT message_id FROM opportunities ORDER BY message_id")
+        return status, opportunities, [row["message_id"] for row in rows], await _versions()
+
+    status, opportunities, message_ids, versions = run_with_memory_db(scenario)
+    assert [m.version for m in status["pending"]] == [3]
+    assert status["version"] == LATEST_VERSION
+    assert message_ids == sorted(o.message.message_id for o in opportunities)
+    assert [version for version, _ in versions] == [m.version for m in MIGRATIONS]
+
+
+def test_schema_status_is_read_only():
+    async def scenario():
+        await Tortoise.init(db_url="sqlite://:memory:", modules={"models": ["database.models"]})
+        try:
+            status = await schema_status()
+            return status, await _table_exists(VERSION_TABLE)
+        finally:
+            await Tortoise.close_connections()
+
+    status, version_table = asyncio.run(scenario())
+    assert status["version"] == 0
+    assert [m.version for m in status["pending"]] == [m.version for m in MIGRATIONS]
+    assert all(plan[0].startswith("unavailable") for plan in status["plans"].values())
+    assert not version_table
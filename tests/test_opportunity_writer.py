@@ -0,0 +1,106 @@
+# tests/test_opportunity_writer.py
+import asyncio
+import random
+
+from database.models import Opportunity
+from database.opportunity_writer import OpportunityWriter
+from database.storage import BatchSaveResult, DatabaseStorage
+from interface.benchmarks import _synthetic_opportunities
+
+
+def _opportunities(count, offset=0):
+    return _synthetic_opportunities(count, random.Random(3), offset=offset)
+
+
+class _Storage:
+    """Фейкове сховище: пакетний запис може впасти, поодинокий — відхилити окремі рядки."""
+
+    def __init__(self, fail_batches=False, rejected=()):
+        self.fail_batches = fail_batches
+        self.rejected = set(rejected)
+        self.batches = []
+        self.single = []
+
+    async def save_opportunities_batch(self, opportunities, bot_id, bot_name, source_mode):
+        self.batches.append((source_mode, [o.message.message_id for o in opportunities]))
+        if self.fail_batches:
+            raise RuntimeError("database is locked")
+        ids = {o.message.message_id for o in opportunities}
+        return BatchSaveResult(saved=len(ids), skipped=len(opportunities) - len(ids), saved_ids=ids)
+
+    async def save_opportunity(self, opportunity, source_mode):
+        self.single.append(opportunity.message.message_id)
+        return None if opportunity.message.message_id in self.rejected else object()
+
+
+async def _submit_all(writer, opportunities, source_mode="live"):
+    results = await asyncio.gather(*(writer.submit(opp, source_mode) for opp in opportunities))
+    await writer.stop()
+    return results
+
+
+def test_concurrent_submits_are_group_committed():
+    storage = _Storage()
+    writer = OpportunityWriter(storage, batch_size=4, batch_wait_ms=50)
+
+    results = asyncio.run(_submit_all(writer, _opportunities(10)))
+
+    assert results == [True] * 10
+    assert [len(ids) for _, ids in storage.batches] == [4, 4, 2]
+    assert writer.stats()["writer_commits"] == 3
+    assert writer.stats()["writer_rows_saved"] == 10
+    assert storage.single == []
+
+
+def test_duplicate_in_batch_is_new_only_once():
+    storage = _Storage()
+    writer = OpportunityWriter(storage, batch_size=10, batch_wait_ms=50)
+    [opportunity] = _opportunities(1)
+
+    results = asyncio.run(_submit_all(writer, [opportunity, opportunity]))
+
+    assert results == [True, False]
+
+
+def test_source_modes_are_committed_separately():
+    storage = _Storage()
+    writer = OpportunityWriter(storage, batch_size=10, batch_wait_ms=50)
+    live, backfill = _opportunities(2), _opportunities(1, offset=2)
+
+    async def scenario():
+        results = await asyncio.gather(
+            *(writer.submit(opp, "live") for opp in live), writer.submit(backfill[0], "backfill"),
+        )
+        await writer.stop()
+        return results
+
+    assert asyncio.run(scenario()) == [True, True, True]
+    assert sorted(mode for mode, _ in storage.batches) == ["backfill", "live"]
+
+
+def test_failed_group_commit_falls_back_to_one_by_one():
+    opportunities = _opportunities(3)
+    rejected = opportunities[1].message.message_id
+    storage = _Storage(fail_batches=True, rejected={rejected})
+    writer = OpportunityWriter(storage, batch_size=10, batch_wait_ms=50)
+
+    results = asyncio.run(_submit_all(writer, opportunities))
+
+    assert results == [True, False, True]
+    assert storage.single == [o.message.message_id for o in opportunities]
+    assert writer.stats()["writer_fallbacks"] == 3
+    assert writer.stats()["writer_commits"] == 0
+
+
+def test_stop_drains_queued_items_into_the_database(run_with_memory_db):
+    async def scenario():
+        writer = OpportunityWriter(DatabaseStorage(), batch_size=50, batch_wait_ms=1000)
+        submits = [asyncio.create_task(writer.submit(opp, "live")) for opp in _opportunities(5)]
+        await asyncio.sleep(0)
+        # stop() не чекає на batch_wait: усе, що вже в черзі, пишеться одразу
+        await writer.stop()
+        return await asyncio.gather(*submits), await Opportunity.all().count()
+
+    results, stored = run_with_memory_db(scenario)
+    assert results == [True] * 5
+    assert stored == 5
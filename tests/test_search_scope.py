@@ -0,0 +1,72 @@
+# tests/test_search_scope.py
+import sqlite3
+from datetime import date
+
+import pytest
+
+from database.search import FTS_SCHEMA, SearchScope, scoped_count_sql, scoped_search_sql, to_fts_query
+
+ROWS = [
+    # id, текст, час, бот, сервер, manual, stage1, stage2
+    (1, "need a react developer", "2024-01-01 10:00:00+00:00", 1, 1, "n/a", "RELEVANT", "RELEVANT"),
+    (2, "react developer wanted", "2024-01-02 23:59:59+00:00", 2, 1, "n/a", None, None),
+    (3, "looking for react help", "2024-01-03 00:00:00+00:00", 1, 2, "approved", "RELEVANT", "POSSIBLY_RELEVANT"),
+    (4, "react is fun", "2024-01-03 12:00:00+00:00", 1, 2, "N/A", "unrelevant", None),
+    (5, "hiring a python developer", "2024-01-02 12:00:00+00:00", 1, 1, "n/a", "RELEVANT", "RELEVANT"),
+]
+
+
+@pytest.fixture
+def conn():
+    conn = sqlite3.connect(":memory:")
+    conn.executescript("""
+        CREATE TABLE discordaccount (id INTEGER PRIMARY KEY, name TEXT);
+        CREATE TABLE server (id INTEGER PRIMARY KEY, name TEXT);
+        CREATE TABLE opportunities (
+            id INTEGER PRIMARY KEY, message_content TEXT, message_timestamp TEXT,
+            discovered_by_id INT, server_id INT, manual_status TEXT,
+            ai_stage_one_status TEXT, ai_stage_two_status TEXT
+        );
+        INSERT INTO discordaccount VALUES (1, 'bot-a'), (2, 'bot-b');
+        INSERT INTO server VALUES (1, 'alpha'), (2, 'beta');
+    """)
+    for stmt in FTS_SCHEMA:
+        conn.execute(stmt)
+    conn.executemany("INSERT INTO opportunities VALUES (?, ?, ?, ?, ?, ?, ?, ?)", ROWS)
+    yield conn
+    conn.close()
+
+
+def _search(conn, text, scope, limit=100):
+    query = to_fts_query(text)
+    ids = [row[0] for row in conn.execute(*scoped_search_sql(query, scope, limit))]
+    count = conn.execute(*scoped_count_sql(query, scope)).fetchone()[0]
+    return ids, count
+
+
+@pytest.mark.parametrize("scope, expected", [
+    (SearchScope(), {1, 2, 3, 4}),
+    (SearchScope(date_from=date(2024, 1, 2), date_to=date(2024, 1, 2)), {2}),
+    (SearchScope(bot_name="bot-a"), {1, 3, 4}),
+    (SearchScope(server_name="beta"), {3, 4}),
+    (SearchScope(manual_status="n/a"), {1, 2, 4}),
+    (SearchScope(stage_one_passed=True), {1, 2, 3}),
+    (SearchScope(stage_two_statuses=("RELEVANT", "POSSIBLY_RELEVANT")), {1, 3}),
+    (SearchScope(bot_name="bot-a", manual_status="n/a", stage_one_passed=True), {1}),
+])
+def test_filters_are_applied_in_sql(conn, scope, expected):
+    ids, count = _search(conn, "react", scope)
+
+    assert set(ids) == expected
+    assert count == len(expected)
+
+
+def test_limit_caps_hits_but_not_count(conn):
+    ids, count = _search(conn, "react", SearchScope(), limit=2)
+
+    assert len(ids) == 2
+    assert count == 4
+
+
+def test_scope_is_hashable_for_cache_key():
+    assert hash(SearchScope(stage_two_statuses=("RELEVANT",))) == hash(SearchScope(stage_two_statuses=("RELEVANT",)))
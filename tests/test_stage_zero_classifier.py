@@ -0,0 +1,66 @@
+# tests/test_stage_zero_classifier.py
+import random
+
+import numpy as np
+import pytest
+
+from application.services.stage_zero_classifier import StageZeroClassifier
+from config.settings import StageZeroSettings
+
+
+@pytest.mark.parametrize("recall_floor", [0.5, 0.8, 0.9, 0.98, 1.0])
+def test_threshold_is_tightest_that_keeps_recall_floor(recall_floor):
+    probs = np.random.default_rng(0).random(101)
+
+    threshold = StageZeroClassifier.threshold_for_recall(probs, recall_floor)
+
+    assert threshold in probs
+    assert (probs >= threshold).mean() >= recall_floor
+    # наступне значення вгору вже порушило б гарантію recall
+    higher = probs[probs > threshold]
+    if higher.size:
+        assert (probs >= higher.min()).mean() < recall_floor
+
+
+def test_full_recall_keeps_every_positive():
+    probs = np.array([0.3, 0.05, 0.9])
+
+    assert StageZeroClassifier.threshold_for_recall(probs, 1.0) == pytest.approx(0.05)
+
+
+def test_no_validation_positives_skips_nothing():
+    model = StageZeroClassifier(np.zeros(16, dtype=np.float32), -5.0, np.empty(0), recall_floor=0.98)
+
+    assert model.threshold == 0.0
+    assert not model.is_junk("anything")
+    assert model.stats() == {"stage_zero_skipped": 0, "stage_zero_passed": 1}
+
+
+def _dataset(rng, size=400):
+    leads = ["need a react developer", "hiring python dev", "looking for a freelancer", "paid gig for designer"]
+    junk = ["good morning everyone", "lol nice meme", "who is playing tonight", "check my stream"]
+    texts, labels = [], []
+    for _ in range(size):
+        label = int(rng.random() < 0.3)
+        texts.append(f"{rng.choice(leads if label else junk)} {rng.choice(['pls', 'asap', 'thanks', ''])}")
+        labels.append(label)
+    return texts, labels
+
+
+def test_trained_threshold_meets_recall_floor_on_validation(tmp_path):
+    config = StageZeroSettings(n_features=2 ** 12, epochs=3, recall_floor=0.95)
+    texts, labels = _dataset(random.Random(1))
+
+    model = StageZeroClassifier.train(texts, labels, config)
+
+    assert model.meta["validation_recall"] >= config.recall_floor
+    assert model.is_junk("lol nice meme thanks")
+    assert not model.is_junk("need a react developer asap")
+
+    # Поріг перераховується з валідаційних ймовірностей під поточний recall_floor
+    path = tmp_path / "stage_zero.npz"
+    model.save(path)
+    same = StageZeroClassifier.load(path, recall_floor=0.95)
+    strict = StageZeroClassifier.load(path, recall_floor=1.0)
+    assert same.threshold == pytest.approx(model.threshold)
+    assert strict.threshold <= model.threshold
@@ -0,0 +1,62 @@
+# tests/test_storage.py
+import asyncio
+import random
+from types import SimpleNamespace
+
+from database.models import AICall, Author, Opportunity
+from database.storage import DatabaseStorage
+from domain.models import ValidationStatus
+from interface.benchmarks import _synthetic_opportunities
+
+
+def _opportunities(count, offset=0):
+    return _synthetic_opportunities(count, random.Random(7), offset=offset)
+
+
+def test_batch_skips_existing_and_in_batch_duplicates(run_with_memory_db):
+    async def scenario():
+        storage = DatabaseStorage()
+        first = await storage.save_opportunities_batch(_opportunities(3), 1, "bot", "backfill")
+        # 2 вже є в БД, 1 новий і його ж дублікат всередині пакета
+        batch = _opportunities(2, offset=1) + _opportunities(1, offset=3) * 2
+        second = await storage.save_opportunities_batch(batch, 1, "bot", "backfill")
+        return first, second, await Opportunity.all().count(), await AICall.all().count()
+
+    first, second, opportunities, calls = run_with_memory_db(scenario)
+    assert (first.saved, first.skipped) == (3, 0)
+    assert (second.saved, second.skipped) == (1, 3)
+    assert second.saved_ids == {10 ** 17 + 3}
+    assert opportunities == 4
+    # облік AI пропущених дублікатів з БД зберігається без прив'язки; дубль у пакеті відкидається одразу
+    assert calls == 3 + 3
+
+
+def test_batch_values_round_trip(run_with_memory_db):
+    async def scenario():
+        storage = DatabaseStorage()
+        [opportunity] = _opportunities(1)
+        await storage.save_opportunities_batch([opportunity], 1, "bot", "backfill")
+        return opportunity, await Opportunity.get(message_id=opportunity.message.message_id)
+
+    opportunity, row = run_with_memory_db(scenario)
+    assert row.ai_stage_one_status == ValidationStatus.UNRELEVANT
+    assert row.message_timestamp == opportunity.message.timestamp
+    assert row.keyword_hits == ["help"]
+
+
+def test_bulk_insert_numbers_postgres_placeholders():
+    executed = []
+
+    async def execute_query(query, values):
+        executed.append((query, values))
+        return len(values), [{"id": i, "message_id": i} for i in range(2)]
+
+    conn = SimpleNamespace(capabilities=SimpleNamespace(dialect="postgres"), execute_query=execute_query)
+    rows = [dict(id=1, name="a"), dict(id=2, name="b")]
+
+    returned = asyncio.run(DatabaseStorage._bulk_insert(conn, Author, rows, "id", returning=("id",)))
+
+    [(query, values)] = executed
+    assert 'VALUES ($1, $2), ($3, $4) ON CONFLICT ("id") DO NOTHING RETURNING "id"' in query
+    assert values == [1, "a", 2, "b"]
+    assert len(returned) == 2